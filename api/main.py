@@ -9,6 +9,7 @@ import uvicorn
 from config.settings import settings
 from api.database.database import init_db, engine
 from api.database import models
+from core.concurrency import get_concurrency
 
 # Importa rotas
 from api.routes import jobs, videos, results, processing, websocket
@@ -64,7 +65,7 @@ async def root():
 @app.get("/health")
 async def health():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {"status": "healthy", "llm_concurrency": get_concurrency().snapshot()}
 
 
 if __name__ == "__main__":
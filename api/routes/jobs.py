@@ -9,6 +9,7 @@ from api.database.models import ProcessingJob, JobStatus
 from api.models.job import JobCreate, JobResponse, JobUpdate
 from datetime import datetime
 from api.services.job_service import JobService
+from core.usage import get_usage_store
 
 router = APIRouter()
 
@@ -96,3 +97,25 @@ async def get_job_progress(
         "failed_videos": job.failed_videos
     }
 
+
+
+@router.get("/{job_id}/usage")
+async def get_job_usage(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """Uso do LLM de um job: totais e quebras por etapa, modelo e vídeo."""
+    service = JobService(db)
+    job = service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    store = get_usage_store()
+    totals = store.summary(job_id=job_id)
+    return {
+        "job_id": job.id,
+        "totals": totals[0] if totals else {},
+        "by_stage": store.summary("stage", job_id=job_id),
+        "by_model": store.summary("model", job_id=job_id),
+        "by_video": store.summary("video_id", job_id=job_id),
+    }
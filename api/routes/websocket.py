@@ -8,6 +8,7 @@ from api.database.models import ProcessingJob
 from typing import Dict, Set
 import json
 import asyncio
+from core.events import read_events
 
 router = APIRouter()
 
@@ -79,9 +80,20 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
             db.close()
         
         # Mantém conexão aberta e envia atualizações periódicas
+        events_offset = 0
+        tick = 0
         while True:
-            await asyncio.sleep(2)  # Atualiza a cada 2 segundos
-            
+            await asyncio.sleep(0.5)
+            tick += 1
+
+            # Eventos dos workers (etapas e texto gerado em streaming) assim que chegam
+            events, events_offset = read_events(job_id, events_offset)
+            for event in events:
+                await websocket.send_json(event)
+
+            if tick % 4:
+                continue  # Estado do job no banco: a cada 2 segundos
+
             from api.database.database import SessionLocal
             db = SessionLocal()
             job = db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
@@ -14,6 +14,8 @@ from core import (
     process_prd_framework,
     ProgressManager
 )
+from core.concurrency import get_concurrency
+from core.usage import video_scope
 
 # Carrega as variáveis do .env
 load_dotenv()
@@ -303,8 +305,10 @@ def process_multiple_videos(video_urls, preferred_languages=None, prompt_type="c
             break
         except Exception as e:
             if "429" in str(e):
-                cprint("⚠️ Cota estourada (429). Aguardando 60 segundos...", "red", attrs=["bold"])
-                time.sleep(60)
+                # O controlador de concorrência já reduziu a janela; espera só o recuo em curso
+                window = get_concurrency().snapshot()
+                cprint(f"⚠️ Cota estourada (429). Janela de concorrência: {window['limit']} (recuo de {window['paused_for_s']}s)", "red", attrs=["bold"])
+                get_concurrency().wait_until_ready()
 
             cprint(f"\n❌ Erro ao processar vídeo {idx}: {e}", "red", attrs=["bold"])
             stats["failed"] += 1
@@ -313,11 +317,6 @@ def process_multiple_videos(video_urls, preferred_languages=None, prompt_type="c
                 "index": idx,
                 "error": str(e)
             })
-        
-        # Pausa entre vídeos (exceto no último)
-        if idx < total_videos:
-            cprint(f"\n⏳ Aguardando 30 segundos antes do próximo vídeo para evitar Rate Limit...", "blue")
-            time.sleep(30)
     
     # Mostra estatísticas finais
     cprint("\n" + "="*60, "cyan")
@@ -447,36 +446,47 @@ def process_single_video(video_url, preferred_languages=None, prompt_type="copyw
             return False
 
     try:
-        if prompt_type == "framework":
-            # Usa processador especial de framework
-            from core.framework_processor import process_transcription_framework
-            output_path = process_transcription_framework(transcription_path, output_language)
-            cprint(f"\n✅ Framework completo gerado!", "green", attrs=["bold"])
-            cprint(f"   Arquivo: {output_path}", "white")
-        elif prompt_type == "agent_builder":
-            # Usa processador especial de agent builder
-            from core.agent_builder_processor import process_transcription_agent_builder
-            output_path = process_transcription_agent_builder(transcription_path, output_language)
-            cprint(f"\n✅ Base de conhecimento para agente gerada!", "green", attrs=["bold"])
-            cprint(f"   Arquivo TXT: {output_path}", "white")
-            cprint(f"   Arquivo JSON: {output_path.replace('.txt', '.json')}", "white")
-        elif prompt_type == "prd":
-            # Usa processador de PRD
-            from core.prd_processor import process_prd_framework
-            output_path = process_prd_framework(transcription_path, output_language)
-            cprint(f"\n✅ PRD BMAD completo gerado!", "green", attrs=["bold"])
-            cprint(f"   Arquivo: {output_path}", "white")
-        else:
-            # Usa processador normal (chunks)
-            process_transcription(transcription_path, prompt_type, output_language)
-            cprint(f"\n✅ Processamento concluído!", "green", attrs=["bold"])
-
-            # Mostra onde o arquivo foi salvo
-            output_dir = os.path.join('data', 'processed')
-            base_name = os.path.basename(transcription_path).replace('.txt', '')
-            output_file = os.path.join(output_dir, f"{base_name}_{prompt_type}_{output_language}_processed.txt")
-            if os.path.exists(output_file):
-                cprint(f"   Arquivo: {output_file}", "white")
+        # Uso do LLM (tokens, latência, custo) registrado por vídeo
+        with video_scope(video_id):
+            if prompt_type == "framework":
+                # Usa processador especial de framework
+                from core.framework_processor import process_transcription_framework
+                output_path = process_transcription_framework(transcription_path, output_language)
+                if output_path is None:
+                    cprint("\n❌ Framework não gerado", "red", attrs=["bold"])
+                    return False
+                cprint(f"\n✅ Framework completo gerado!", "green", attrs=["bold"])
+                cprint(f"   Arquivo: {output_path}", "white")
+            elif prompt_type == "agent_builder":
+                # Usa processador especial de agent builder
+                from core.agent_builder_processor import process_transcription_agent_builder
+                output_path = process_transcription_agent_builder(transcription_path, output_language)
+                if output_path is None:
+                    cprint("\n❌ Base de conhecimento não gerada", "red", attrs=["bold"])
+                    return False
+                cprint(f"\n✅ Base de conhecimento para agente gerada!", "green", attrs=["bold"])
+                cprint(f"   Arquivo TXT: {output_path}", "white")
+                cprint(f"   Arquivo JSON: {output_path.replace('.txt', '.json')}", "white")
+            elif prompt_type == "prd":
+                # Usa processador de PRD
+                from core.prd_processor import process_prd_framework
+                output_path = process_prd_framework(transcription_path, output_language)
+                if output_path is None:
+                    cprint("\n❌ PRD não gerado", "red", attrs=["bold"])
+                    return False
+                cprint(f"\n✅ PRD BMAD completo gerado!", "green", attrs=["bold"])
+                cprint(f"   Arquivo: {output_path}", "white")
+            else:
+                # Usa processador normal (chunks)
+                process_transcription(transcription_path, prompt_type, output_language)
+                cprint(f"\n✅ Processamento concluído!", "green", attrs=["bold"])
+
+                # Mostra onde o arquivo foi salvo
+                output_dir = os.path.join('data', 'processed')
+                base_name = os.path.basename(transcription_path).replace('.txt', '')
+                output_file = os.path.join(output_dir, f"{base_name}_{prompt_type}_{output_language}_processed.txt")
+                if os.path.exists(output_file):
+                    cprint(f"   Arquivo: {output_file}", "white")
         
         if not video_number:  # Só mostra mensagem final se for vídeo único
             cprint("\n" + "="*60, "green")
@@ -702,7 +712,9 @@ def process_single_document(source, prompt_type, output_language, doc_number=Non
         if prompt_type == "framework":
             # Processa com framework
             output_path = os.path.join(output_dir, f"{base_name}_framework_{output_language}.txt")
-            process_transcription_framework(temp_file, output_language)
+            if process_transcription_framework(temp_file, output_language) is None:
+                cprint("\n❌ Framework não gerado", "red", attrs=["bold"])
+                return False
 
             # Move arquivo gerado para o local correto
             framework_output = os.path.join('data', 'processed', f"{base_name}_extracted_framework_{output_language}.txt")
@@ -716,7 +728,9 @@ def process_single_document(source, prompt_type, output_language, doc_number=Non
         elif prompt_type == "agent_builder":
             # Processa com agent builder
             output_path = os.path.join(output_dir, f"{base_name}_agent_builder_{output_language}.txt")
-            process_transcription_agent_builder(temp_file, output_language)
+            if process_transcription_agent_builder(temp_file, output_language) is None:
+                cprint("\n❌ Base de conhecimento não gerada", "red", attrs=["bold"])
+                return False
 
             # Move arquivo gerado para o local correto
             agent_output = os.path.join('data', 'processed', f"{base_name}_extracted_agent_builder_{output_language}.txt")
@@ -735,7 +749,9 @@ def process_single_document(source, prompt_type, output_language, doc_number=Non
         elif prompt_type == "prd":
             # Processa com PRD Processor
             output_path = os.path.join(output_dir, f"PRD_{base_name}_{output_language}.txt")
-            process_prd_framework(temp_file, output_language)
+            if process_prd_framework(temp_file, output_language) is None:
+                cprint("\n❌ PRD não gerado", "red", attrs=["bold"])
+                return False
 
             cprint(f"\n✅ PRD BMAD completo gerado!", "green", attrs=["bold"])
         else:  # FAQ
@@ -832,46 +848,93 @@ def process_all_transcriptions(prompt_type="copywriting", output_language="pt"):
             cprint("Processamento cancelado.", "red")
             return
 
+    from core.near_dedup import near_dup_enabled, find_duplicate_transcript, register_transcript
+    from core.processing import processed_output_path
+    use_near_dup = near_dup_enabled()
+    near_dup_namespace = f"doc:{prompt_type}:{output_language}"
+    near_dup_signatures = {}
+
+    # Modo lote: transcrições curtas vão juntas numa única requisição (faq/copywriting)
+    from core.packing import packing_enabled, TranscriptPacker
+    packer = None
+    if prompt_type not in ["framework", "agent_builder", "prd"] and packing_enabled():
+        def register_packed(path):
+            signature = near_dup_signatures.pop(path, None)
+            if signature is not None:
+                register_transcript(path, near_dup_namespace, signature)
+        packer = TranscriptPacker(prompt_type, output_language, on_done=register_packed)
+
     for idx, transcription_file in enumerate(transcription_files, 1):
         # Pega o caminho completo do arquivo
         file_path = os.path.join(transcriptions_dir, transcription_file)
 
         cprint(f"\n[{idx}/{len(transcription_files)}] Processando: {transcription_file}", "yellow")
+
+        # Transcrição quase idêntica a outra já processada (aula republicada, etc.)
+        if use_near_dup:
+            duplicate_of, score, doc_signature = find_duplicate_transcript(file_path, near_dup_namespace)
+            if duplicate_of:
+                cprint(f"⏭️  Quase idêntica a {duplicate_of} ({score:.0%}) - pulando", "blue")
+                continue
+
         try:
-            if prompt_type == "framework":
-                # Usa processador especial de framework
-                from core.framework_processor import process_transcription_framework
-                output_path = process_transcription_framework(file_path, output_language)
-                cprint(f"✅ Framework completo gerado: {output_path}", "green", attrs=["bold"])
-            elif prompt_type == "agent_builder":
-                # Usa processador especial de agent builder
-                from core.agent_builder_processor import process_transcription_agent_builder
-                output_path = process_transcription_agent_builder(file_path, output_language)
-                cprint(f"✅ Base de conhecimento gerada: {output_path}", "green", attrs=["bold"])
-            elif prompt_type == "prd":
-                # Usa processador de PRD
-                from core.prd_processor import process_prd_framework
-                output_path = process_prd_framework(file_path, output_language)
-                cprint(f"✅ PRD BMAD completo gerado: {output_path}", "green", attrs=["bold"])
-            else:
-                # Usa processador normal (chunks)
-                process_transcription(file_path, prompt_type, output_language)
-                cprint(f"✅ Processamento concluído", "green")
-            
-            # ESPERE 30 SEGUNDOS entre cada vídeo para não estourar a cota gratuita
-            if idx < len(transcription_files):
-                cprint(f"⏳ Aguardando 30 segundos para evitar Rate Limit...", "blue")
-                time.sleep(30)
+            if packer:
+                if use_near_dup:
+                    near_dup_signatures[file_path] = doc_signature
+                if packer.add(file_path):
+                    cprint("📦 Transcrição curta adicionada ao lote", "blue")
+                    continue
+                near_dup_signatures.pop(file_path, None)
+
+            with video_scope(os.path.splitext(transcription_file)[0]):
+                if prompt_type == "framework":
+                    # Usa processador especial de framework
+                    from core.framework_processor import process_transcription_framework
+                    output_path = process_transcription_framework(file_path, output_language)
+                    if output_path is None:
+                        cprint("❌ Framework não gerado", "red", attrs=["bold"])
+                        continue
+                    cprint(f"✅ Framework completo gerado: {output_path}", "green", attrs=["bold"])
+                elif prompt_type == "agent_builder":
+                    # Usa processador especial de agent builder
+                    from core.agent_builder_processor import process_transcription_agent_builder
+                    output_path = process_transcription_agent_builder(file_path, output_language)
+                    if output_path is None:
+                        cprint("❌ Base de conhecimento não gerada", "red", attrs=["bold"])
+                        continue
+                    cprint(f"✅ Base de conhecimento gerada: {output_path}", "green", attrs=["bold"])
+                elif prompt_type == "prd":
+                    # Usa processador de PRD
+                    from core.prd_processor import process_prd_framework
+                    output_path = process_prd_framework(file_path, output_language)
+                    if output_path is None:
+                        cprint("❌ PRD não gerado", "red", attrs=["bold"])
+                        continue
+                    cprint(f"✅ PRD BMAD completo gerado: {output_path}", "green", attrs=["bold"])
+                else:
+                    # Usa processador normal (chunks)
+                    process_transcription(file_path, prompt_type, output_language)
+                    output_path = processed_output_path(file_path, prompt_type, output_language)
+                    cprint(f"✅ Processamento concluído", "green")
+
+            # Só entra no índice quem gerou saída: senão as quase idênticas seriam puladas sem resultado
+            if use_near_dup and os.path.exists(output_path):
+                register_transcript(file_path, near_dup_namespace, doc_signature)
 
         except Exception as e:
             if "429" in str(e):
-                cprint("⚠️ Cota estourada (429). Aguardando 60 segundos...", "red", attrs=["bold"])
-                time.sleep(60)
+                window = get_concurrency().snapshot()
+                cprint(f"⚠️ Cota estourada (429). Janela de concorrência: {window['limit']} (recuo de {window['paused_for_s']}s)", "red", attrs=["bold"])
+                get_concurrency().wait_until_ready()
             else:
                 cprint(f"❌ Erro ao processar: {e}", "red")
                 import traceback
                 traceback.print_exc()
 
+    if packer:
+        packer.flush()
+        cprint(f"📦 Modo lote: {packer.requests} requisição(ões) para as transcrições curtas", "cyan")
+
 
 def process_n8n_workflows(output_language="pt"):
     """
@@ -897,7 +960,10 @@ def process_n8n_workflows(output_language="pt"):
     try:
         cprint(f"\n🚀 Iniciando análise do workflow...", "yellow")
         output_path = process_n8n_framework(file_path, output_language)
-        
+        if output_path is None:
+            cprint("\n❌ Análise do workflow não gerada", "red", attrs=["bold"])
+            return
+
         cprint(f"\n✅ Análise concluída com sucesso!", "green", attrs=["bold"])
         cprint(f"   Arquivo gerado: {output_path}", "white")
         
@@ -984,7 +1050,8 @@ def main():
     print("[2] Gemini 2.5 Flash-Lite (Otimizado para Custo)")
     print("[3] Gemini 2.5 Pro (Raciocínio Complexo)")
     print("[4] Gemini 3 Pro (Mais Inteligente - Preview)")
-    model_choice = input(colored("Digite sua escolha (1, 2, 3 ou 4): ", "magenta", attrs=["bold"])).strip()
+    print("[5] Automático (Lite nas extrações, Flash nas dimensões, Pro na síntese)")
+    model_choice = input(colored("Digite sua escolha (1, 2, 3, 4 ou 5): ", "magenta", attrs=["bold"])).strip()
 
     if model_choice == '1':
         os.environ["LLM_MODEL"] = "gemini-2.5-flash"
@@ -1002,6 +1069,10 @@ def main():
         os.environ["LLM_MODEL"] = "gemini-3-pro"
         update_env_model("gemini-3-pro")
         cprint("✅ Modelo selecionado: Gemini 3 Pro", "green")
+    elif model_choice == '5':
+        os.environ["LLM_MODEL"] = "auto"
+        update_env_model("auto")
+        cprint("✅ Roteamento automático de modelos por etapa ativado", "green")
     else:
         cprint("Escolha inválida. Usando 'gemini-2.5-flash' como padrão.", "yellow")
         os.environ["LLM_MODEL"] = "gemini-2.5-flash"
@@ -7,39 +7,103 @@ import os
 import time
 import json
 from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
-import google.generativeai as genai
-from google.api_core.exceptions import DeadlineExceeded
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+
+from core.llm_backend import get_backend, estimate_tokens
+from core.concurrency import QuotaRetry
+from core.model_router import route_model
+from core.caption_cleanup import read_transcription
+from core.stage_scheduler import Stage, StageResult, StageScheduler
+from core.checkpoint import StageCheckpoint
+from core.streaming import stream_generate
+from core.prompt_registry import get_prompt_registry
+from core.map_reduce import MapReducer, use_map_reduce, with_chunk_note, build_reduce_prompt
+from core.retrieval import TranscriptRetriever, retrieval_enabled, with_excerpt_note
+from core.structured import single_call_enabled, build_single_call_prompt, generate_sections
+from core.usage import models_scope, stage_scope
+from core.events import publish
+from core.block_schemas import (
+    structured_blocks_enabled, block_item_type, block_generation_config, block_response_schema,
+    with_structured_note, parse_block_response, parse_block_data, render_block, single_call_description
+)
 
 load_dotenv()
 
-# Configura Gemini
-genai.configure(api_key=os.environ["API_KEY"])
-
-# Importa funções de modelo do framework_processor para reutilizar
-from core.framework_processor import get_model
-
 
 class AgentBuilderProcessor:
     """
     Processa transcrições para criar bases de conhecimento para agentes de IA.
     Extrai conhecimento em blocos estruturados otimizados para RAG.
+
+    Os blocos são extraídos em paralelo (sob o rate limiter global) e cada bloco
+    concluído vai para um checkpoint; a síntese roda ao final. Uma nova execução
+    com a mesma entrada retoma apenas os blocos que faltam.
     """
 
+    # Blocos de extração: (número, nome, descrição)
+    BLOCKS = [
+        (1, "ONTOLOGIA DO DOMÍNIO", "Glossário de termos, hierarquia de conceitos e relações"),
+        (2, "BASE DE CONHECIMENTO FACTUAL", "Fatos, afirmações, números, métricas e fórmulas"),
+        (3, "PROCEDIMENTOS E INSTRUÇÕES", "Processos passo a passo, árvores de decisão e checklists"),
+        (4, "EXEMPLOS E CASOS", "Casos de estudo, histórias e comparações"),
+        (5, "PERGUNTAS E RESPOSTAS", "Q&A extraídos e objeções com respostas"),
+        (6, "CONTEXTO E METADADOS", "Informações da fonte, resumo e mapa de tópicos"),
+        (7, "INSTRUÇÕES PARA O AGENTE", "Persona, regras de engajamento e conexões")
+    ]
+
+    PROMPT_TEMPLATE = "agent_builder.txt"
+
+    # Instruções finais pedidas na chamada única (SINGLE_CALL_MODE)
+    SYNTHESIS_DESCRIPTION = (
+        "INSTRUÇÕES FINAIS PARA O AGENTE com base em todos os blocos: SYSTEM PROMPT SUGERIDO (200-400 palavras), "
+        "REGRAS DE RESPOSTA (10-15), ÍNDICE DE CONHECIMENTO, EXEMPLOS DE INTERAÇÃO (5-10) e CHECKLIST DE VALIDAÇÃO"
+    )
+
+    # Perfil de consulta de cada bloco no modo de recuperação (RETRIEVAL_MODE);
+    # contexto/resumo (6) e instruções do agente (7) recebem o conteúdo inteiro
+    RETRIEVAL_KEYWORDS = {
+        1: "conceito termo significa definição chamado tipo categoria parte "
+           "concept term means definition called type category part",
+        2: "__num__ __num__ fato dado número percentual métrica fórmula estudo pesquisa "
+           "fact data number percent metric formula study research",
+        3: "passo etapa processo primeiro depois então se checklist como fazer "
+           "step process first then if checklist how to",
+        4: "exemplo caso história cliente aluno aconteceu comparação "
+           "example case story client student happened comparison",
+        5: "pergunta dúvida resposta objeção porque mas será como "
+           "question doubt answer objection why but how",
+    }
+
     def __init__(self, transcription_text, output_language="pt", source_name=""):
         self.transcription = transcription_text
         self.output_language = output_language
         self.source_name = source_name
         self.blocks = {}
         self.synthesis = None
+        self.stage_timings = {}
+        # Etapa → modelos que responderam (ver core/usage.py)
+        self.stage_models = {}
+        self.prompt_version = get_prompt_registry().version(self.PROMPT_TEMPLATE)
+        self.checkpoint = StageCheckpoint(
+            "agent_builder", transcription_text, output_language, version=self.prompt_version
+        )
+        # Entradas acima do limiar de tokens são processadas em modo map-reduce
+        self.map_reducer = (
+            MapReducer(transcription_text, mode="agent_builder") if use_map_reduce(transcription_text) else None
+        )
+        # Modo de recuperação: cada bloco com perfil recebe só os trechos relevantes
+        self.retriever = TranscriptRetriever(transcription_text) if retrieval_enabled(transcription_text) else None
+        # Entradas curtas: tudo numa chamada só (as seções inválidas voltam para as etapas)
+        self.single_call = self.map_reducer is None and single_call_enabled(transcription_text)
+        self.single_call_sections = None
 
     def load_agent_builder_prompt(self):
-        """Carrega o prompt completo de agent builder."""
-        prompt_path = os.path.join('config', 'prompts', 'agent_builder.txt')
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        """Carrega o prompt completo de agent builder (via registro de prompts)."""
+        return get_prompt_registry().text(self.PROMPT_TEMPLATE)
 
-    def create_block_prompt(self, block_number, block_name, block_description):
+    def create_block_prompt(self, block_number, block_name, block_description, content=None):
         """
         Cria um prompt focado em um bloco específico da extração.
 
@@ -47,24 +111,15 @@ class AgentBuilderProcessor:
             block_number: Número do bloco (1-7)
             block_name: Nome do bloco
             block_description: Descrição do que extrair
+            content: Conteúdo a analisar (padrão: transcrição completa)
         """
-        base_prompt = self.load_agent_builder_prompt()
+        content = self.transcription if content is None else content
 
-        # Extrai a seção relevante do prompt
-        block_marker = f"## BLOCO {block_number}:"
-        next_block_marker = f"## BLOCO {block_number + 1}:"
-
-        start = base_prompt.find(block_marker)
-        if block_number < 7:
-            end = base_prompt.find(next_block_marker)
-        else:
-            end = base_prompt.find("# INSTRUÇÕES DE FORMATAÇÃO")
-
-        if start == -1:
+        # Seção do bloco já indexada pelo registro de prompts
+        block_content = get_prompt_registry().section(self.PROMPT_TEMPLATE, block_number)
+        if block_content is None:
             # Se não encontrar o bloco específico, usa descrição manual
             block_content = block_description
-        else:
-            block_content = base_prompt[start:end if end != -1 else None]
 
         focused_prompt = f"""
 Você é um Arquiteto de Conhecimento especializado em criar bases de dados para agentes de IA.
@@ -90,7 +145,7 @@ Você é um Arquiteto de Conhecimento especializado em criar bases de dados para
 
 **CONTEÚDO PARA ANÁLISE**:
 
-{self.transcription}
+{content}
 
 ---
 
@@ -104,29 +159,32 @@ Você é um Arquiteto de Conhecimento especializado em criar bases de dados para
         """
         print(f"\n🔍 Processando Bloco {block_number}: {block_name}")
 
-        prompt = self.create_block_prompt(block_number, block_name, block_description)
-
         max_retries = 3
-        for attempt in range(max_retries):
+        quota = QuotaRetry()
+        attempt = 0
+        while True:
             try:
-                current_model = get_model()
-                chat = current_model.start_chat(history=[])
-                response = chat.send_message(prompt)
-
-                result = response.text.strip()
+                result, items = self.extract_block(block_number, block_name, block_description)
                 self.blocks[block_number] = {
                     "name": block_name,
                     "content": result,
                     "timestamp": datetime.now().isoformat()
                 }
+                if items is not None:
+                    self.blocks[block_number]["items"] = items
 
                 print(f"✅ Bloco {block_number} concluído ({len(result)} caracteres)")
                 return result
 
+            except ResourceExhausted:
+                # Erro 429: o recuo é aplicado pelo controlador de concorrência no backend;
+                # só desiste depois das tentativas e de um período de cota inteiro
+                if quota.exhausted() and attempt >= max_retries - 1:
+                    raise
+                print(f"⏳ Cota excedida (429) - tentativa {attempt + 1}")
             except DeadlineExceeded:
                 if attempt < max_retries - 1:
                     print(f"⏳ Timeout - tentativa {attempt + 1}/{max_retries}")
-                    time.sleep(5)
                 else:
                     raise
             except Exception as e:
@@ -135,6 +193,149 @@ Você é um Arquiteto de Conhecimento especializado em criar bases de dados para
                     time.sleep(5)
                 else:
                     raise
+            attempt += 1
+
+    def route(self, stage, prompt):
+        """Modelo da etapa pelo roteador (None = LLM_MODEL, se o roteamento estiver desligado)."""
+        return route_model("agent_builder", stage, estimate_tokens(prompt))
+
+    def generate_stage(self, stage_id, prompt, route_stage):
+        """Gera a etapa em streaming, com o parcial ao lado do checkpoint."""
+        return stream_generate(
+            prompt, self.checkpoint.partial_path(stage_id), stage_id, model=self.route(route_stage, prompt)
+        ).strip()
+
+    def generate_block(self, block_number, prompt):
+        """
+        Gera um bloco de uma chamada só: com itens tipados (response_schema) nos
+        blocos que têm esquema, senão em texto livre via streaming.
+
+        Returns:
+            (texto do bloco, itens ou None)
+        """
+        stage_id = f"block_{block_number}"
+        if not (structured_blocks_enabled() and block_item_type(block_number)):
+            return self.generate_stage(stage_id, prompt, "block"), None
+
+        publish("stage_started", stage=stage_id, resumed_chars=0)
+        response = get_backend().generate(
+            with_structured_note(prompt, block_number),
+            model=self.route("block", prompt),
+            generation_config=block_generation_config(block_number)
+        )
+        publish("stage_completed", stage=stage_id, chars=len(response.text))
+
+        parsed = parse_block_response(response.text, block_number)
+        if parsed is None:
+            print(f"⚠️  Bloco {block_number}: resposta estruturada inválida - gerando em texto livre")
+            return self.generate_stage(stage_id, prompt, "block"), None
+        items, notes = parsed
+        return render_block(block_number, items, notes), items
+
+    def extract_block(self, block_number, block_name, block_description):
+        """
+        Extrai um bloco: uma chamada com o conteúdo inteiro ou, para entradas
+        grandes, map-reduce sobre os chunks (com cache intermediário). No modo
+        de recuperação, uma chamada só com os trechos relevantes para o bloco.
+
+        Returns:
+            (texto do bloco, itens tipados ou None) - map-reduce gera só texto
+        """
+        keywords = self.RETRIEVAL_KEYWORDS.get(block_number)
+        if self.retriever is not None and keywords:
+            section = get_prompt_registry().section(self.PROMPT_TEMPLATE, block_number) or block_description
+            query = " ".join([block_name, block_name, block_description, keywords, keywords, section])
+            excerpts = self.retriever.context_for(query, label=f"Bloco {block_number}")
+            prompt = with_excerpt_note(
+                self.create_block_prompt(block_number, block_name, block_description, content=excerpts)
+            )
+            return self.generate_block(block_number, prompt)
+
+        if self.map_reducer is None:
+            prompt = self.create_block_prompt(block_number, block_name, block_description)
+            return self.generate_block(block_number, prompt)
+
+        section = get_prompt_registry().section(self.PROMPT_TEMPLATE, block_number) or block_description
+        title = f"BLOCO {block_number}: {block_name}"
+        return self.map_reducer.run(
+            lambda chunk, index, total: with_chunk_note(
+                self.create_block_prompt(block_number, block_name, block_description, content=chunk), index, total
+            ),
+            lambda partials, level: build_reduce_prompt(title, section, partials, self.output_language),
+            label=f"Bloco {block_number}"
+        ), None
+
+    def create_single_call_prompt(self, sections):
+        """Prompt da chamada única: prompt completo do agent builder + seções JSON esperadas."""
+        instructions = f"""{self.load_agent_builder_prompt()}
+
+**IDIOMA DE SAÍDA**: {"Português Brasileiro" if self.output_language == "pt" else "English"}
+
+**REGRAS CRÍTICAS**: Preserve informação completa, mantenha citações, números e termos técnicos exatos e NUNCA invente - se não está no conteúdo, marque como [NÃO MENCIONADO]. Cada bloco segue a estrutura YAML-like do prompt."""
+        return build_single_call_prompt(instructions, sections, self.transcription)
+
+    def run_single_call(self):
+        """
+        Extrai os blocos que faltam e as instruções do agente numa única chamada
+        com resposta JSON. Os blocos válidos vão para o checkpoint; os inválidos
+        (e a síntese, se inválida) ficam para o DAG normal. Blocos com esquema
+        vêm com itens tipados, como em generate_block.
+        """
+        structured = structured_blocks_enabled()
+        sections = {}
+        schemas = {}
+        for num, name, desc in self.BLOCKS:
+            if self.checkpoint.get(f"block_{num}") is not None:
+                continue
+            sections[f"block_{num}"] = f"BLOCO {num}: {name} - {desc}"
+            if structured and block_item_type(num):
+                sections[f"block_{num}"] = single_call_description(num, sections[f"block_{num}"])
+                schemas[f"block_{num}"] = block_response_schema(num)
+        if not sections:
+            return
+        sections["agent_instructions"] = self.SYNTHESIS_DESCRIPTION
+
+        prompt = self.create_single_call_prompt(sections)
+        print(f"\n⚡ Chamada única: {len(sections)} seções em uma requisição (~{estimate_tokens(prompt)} tokens)")
+        timing = StageResult("single_call", started_at=datetime.now().isoformat())
+        start = time.monotonic()
+        try:
+            with stage_scope("single_call"):
+                results = generate_sections(prompt, sections, model=self.route("single", prompt), schemas=schemas)
+            timing.status = "done"
+        except RuntimeError:
+            raise
+        except Exception as e:
+            print(f"⚠️  Chamada única falhou ({e}); seguindo com as etapas separadas")
+            results = {}
+            timing.status, timing.error = "failed", e
+        timing.duration = time.monotonic() - start
+        self.stage_timings["single_call"] = self.stage_timing(timing)
+
+        for num, name, desc in self.BLOCKS:
+            content = results.get(f"block_{num}")
+            if content is None:
+                continue
+            items = None
+            if isinstance(content, dict):
+                parsed = parse_block_data(content, num)
+                if parsed is None:
+                    print(f"⚠️  Bloco {num}: itens inválidos na chamada única (será refeito individualmente)")
+                    del results[f"block_{num}"]
+                    continue
+                items, notes = parsed
+                content = render_block(num, items, notes)
+            self.blocks[num] = {
+                "name": name,
+                "content": content,
+                "timestamp": datetime.now().isoformat()
+            }
+            if items is not None:
+                self.blocks[num]["items"] = items
+            self.checkpoint.save_stage(f"block_{num}", self.blocks[num])
+        self.synthesis = results.get("agent_instructions")
+        self.single_call_sections = sorted(results)
+        print(f"✅ Chamada única: {len(results)}/{len(sections)} seções válidas")
 
     def synthesize_knowledge_base(self):
         """
@@ -194,18 +395,13 @@ Você é um Arquiteto de Agentes de IA. Sua tarefa é criar as INSTRUÇÕES FINA
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                current_model = get_model()
-                chat = current_model.start_chat(history=[])
-                response = chat.send_message(synthesis_prompt)
-
-                self.synthesis = response.text.strip()
+                self.synthesis = self.generate_stage("synthesis", synthesis_prompt, "synthesis")
                 print(f"✅ Instruções do agente concluídas ({len(self.synthesis)} caracteres)")
                 return self.synthesis
 
             except DeadlineExceeded:
                 if attempt < max_retries - 1:
                     print(f"⏳ Timeout - tentativa {attempt + 1}/{max_retries}")
-                    time.sleep(5)
                 else:
                     raise
 
@@ -249,7 +445,7 @@ Você é um Arquiteto de Agentes de IA. Sua tarefa é criar as INSTRUÇÕES FINA
 - **Total de blocos processados**: {len(self.blocks)}
 - **Blocos disponíveis**: {', '.join([f"{k}: {v['name']}" for k, v in sorted(self.blocks.items())])}
 - **Timestamp**: {datetime.now().isoformat()}
-- **Modelo utilizado**: {os.environ.get("LLM_MODEL", "gemini-1.5-flash-002")}
+- **Modelo utilizado**: {self.models_used()}
 
 ---
 
@@ -269,16 +465,23 @@ Você é um Arquiteto de Agentes de IA. Sua tarefa é criar as INSTRUÇÕES FINA
                 "source": self.source_name,
                 "generated_at": datetime.now().isoformat(),
                 "language": self.output_language,
-                "model": os.environ.get("LLM_MODEL", "gemini-1.5-flash-002"),
+                "model": self.models_used(),
                 "content_size": len(self.transcription),
-                "type": "agent_knowledge_base"
+                "type": "agent_knowledge_base",
+                "prompt_version": self.prompt_version,
+                "map_reduce_chunks": len(self.map_reducer.chunks) if self.map_reducer else None,
+                "retrieval_passages": len(self.retriever.index.passages) if self.retriever else None,
+                "single_call_sections": self.single_call_sections,
+                "stage_timings": self.stage_timings
             },
             "agent_instructions": self.synthesis,
             "knowledge_blocks": {
                 str(k): {
                     "name": v["name"],
                     "content": v["content"],
-                    "extracted_at": v["timestamp"]
+                    "extracted_at": v["timestamp"],
+                    # Itens tipados (blocos 1-5 com resposta estruturada): o consolidador usa direto
+                    **({"item_type": block_item_type(k), "items": v["items"]} if v.get("items") is not None else {})
                 }
                 for k, v in self.blocks.items()
             }
@@ -291,9 +494,64 @@ Você é um Arquiteto de Agentes de IA. Sua tarefa é criar as INSTRUÇÕES FINA
 
         return output_path
 
+    def run_synthesis_stage(self):
+        """Etapa de síntese: em caso de erro, salva a base sem instruções finais."""
+        try:
+            return self.synthesize_knowledge_base()
+        except RuntimeError:
+            raise
+        except Exception as e:
+            print(f"❌ Erro na síntese: {e}")
+            self.synthesis = "[Síntese não gerada devido a erro]"
+            return self.synthesis
+
+    def build_stages(self):
+        """
+        Monta o DAG: os 7 blocos em paralelo e a síntese depois de todos.
+        Blocos já presentes no checkpoint são restaurados e não rodam de novo.
+        """
+        stages = []
+        for num, name, desc in self.BLOCKS:
+            saved = self.checkpoint.get(f"block_{num}")
+            if saved is not None:
+                self.blocks[num] = saved
+                print(f"♻️  Bloco {num} restaurado do checkpoint")
+                continue
+            stages.append(Stage(f"block_{num}", partial(self.process_block, num, name, desc)))
+        # Instruções já obtidas na chamada única não são refeitas
+        if self.synthesis is None:
+            stages.append(Stage(
+                "synthesis",
+                self.run_synthesis_stage,
+                depends_on=tuple(stage.stage_id for stage in stages)
+            ))
+        return stages
+
+    def on_stage_done(self, result):
+        """Registra o tempo da etapa e grava no checkpoint os blocos concluídos."""
+        self.stage_timings[result.stage_id] = self.stage_timing(result)
+        if result.status == "failed" and not isinstance(result.error, RuntimeError):
+            print(f"❌ Erro ao processar {result.stage_id}: {result.error}")
+        if result.status == "done" and result.stage_id.startswith("block_"):
+            num = int(result.stage_id.split("_", 1)[1])
+            self.checkpoint.save_stage(result.stage_id, self.blocks[num])
+
+    def stage_timing(self, result):
+        """Tempo da etapa e os modelos que responderam as suas chamadas."""
+        return {**result.timing(), "models": sorted(self.stage_models.get(result.stage_id, ()))}
+
+    def models_used(self):
+        """Modelos que de fato responderam (o LLM_MODEL pode ser "auto" com o roteador)."""
+        models = sorted({model for stage_models in self.stage_models.values() for model in stage_models})
+        return ", ".join(models) or "não registrado (etapas restauradas do checkpoint)"
+
     def process_complete_knowledge_base(self, output_path):
         """
         Executa o processamento completo em todas as etapas.
+
+        Returns:
+            str: Caminho da base salva, ou None se o processamento foi abortado
+            ou algum bloco falhou
         """
         print("=" * 80)
         print("🚀 INICIANDO EXTRAÇÃO PARA AGENT BUILDER")
@@ -303,38 +561,34 @@ Você é um Arquiteto de Agentes de IA. Sua tarefa é criar as INSTRUÇÕES FINA
         print(f"📏 Tamanho: {len(self.transcription)} caracteres")
         print("=" * 80)
 
-        # Define os 7 blocos de extração
-        blocks_to_process = [
-            (1, "ONTOLOGIA DO DOMÍNIO", "Glossário de termos, hierarquia de conceitos e relações"),
-            (2, "BASE DE CONHECIMENTO FACTUAL", "Fatos, afirmações, números, métricas e fórmulas"),
-            (3, "PROCEDIMENTOS E INSTRUÇÕES", "Processos passo a passo, árvores de decisão e checklists"),
-            (4, "EXEMPLOS E CASOS", "Casos de estudo, histórias e comparações"),
-            (5, "PERGUNTAS E RESPOSTAS", "Q&A extraídos e objeções com respostas"),
-            (6, "CONTEXTO E METADADOS", "Informações da fonte, resumo e mapa de tópicos"),
-            (7, "INSTRUÇÕES PARA O AGENTE", "Persona, regras de engajamento e conexões")
-        ]
-
-        # Processa cada bloco
-        for block_num, block_name, block_desc in blocks_to_process:
-            try:
-                self.process_block(block_num, block_name, block_desc)
-                # Rate limiting
-                if block_num < 7:
-                    print("⏳ Aguardando 20s antes do próximo bloco...")
-                    time.sleep(20)
-            except Exception as e:
-                print(f"❌ Erro ao processar bloco {block_num}: {e}")
-                continue
-
-        # Sintetiza instruções do agente
+        scheduler = StageScheduler(on_stage_done=self.on_stage_done)
+        start = time.monotonic()
         try:
-            self.synthesize_knowledge_base()
-        except Exception as e:
-            print(f"❌ Erro na síntese: {e}")
-            self.synthesis = "[Síntese não gerada devido a erro]"
+            with models_scope(self.stage_models):
+                if self.single_call:
+                    self.run_single_call()
+                results = scheduler.run(self.build_stages())
+        except RuntimeError as e:
+            print(f"🛑 Processamento ABORTADO: {e}")
+            print("⚠️  Verifique sua API KEY no arquivo .env")
+            print(f"💾 Blocos concluídos preservados em: {self.checkpoint.path}")
+            return None
+
+        print(f"\n⏱️  Tempo total das etapas: {time.monotonic() - start:.1f}s")
+        for stage_id, result in results.items():
+            print(f"   • {stage_id}: {result.duration:.1f}s ({result.status})")
+
+        # Bloco com falha: nada é salvo (uma base incompleta bloquearia a próxima
+        # execução pelo "já existe") e o checkpoint fica para refazer só o que falhou
+        failed = [stage_id for stage_id, result in results.items() if result.status == "failed"]
+        if failed:
+            print(f"❌ Blocos com falha: {', '.join(failed)}")
+            print(f"💾 Blocos concluídos preservados em: {self.checkpoint.path}")
+            return None
 
         # Salva resultado
         self.save_knowledge_base(output_path)
+        self.checkpoint.clear()
 
         print("\n" + "=" * 80)
         print("✅ BASE DE CONHECIMENTO PARA AGENTE CRIADA COM SUCESSO!")
@@ -352,11 +606,10 @@ def process_transcription_agent_builder(input_file, output_language="pt"):
         output_language: Idioma de saída ('pt' ou 'en')
 
     Returns:
-        str: Caminho do arquivo de saída
+        str: Caminho do arquivo de saída, ou None se o processamento foi abortado
     """
-    # Lê transcrição
-    with open(input_file, 'r', encoding='utf-8') as f:
-        transcription = f.read()
+    # Lê transcrição (legendas passam pela limpeza, com cache)
+    transcription = read_transcription(input_file)
 
     # Cria nome de saída
     output_dir = os.path.join('data', 'processed')
@@ -372,6 +625,4 @@ def process_transcription_agent_builder(input_file, output_language="pt"):
 
     # Processa
     processor = AgentBuilderProcessor(transcription, output_language, base_name)
-    processor.process_complete_knowledge_base(output_path)
-
-    return output_path
+    return processor.process_complete_knowledge_base(output_path)
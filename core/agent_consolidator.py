@@ -8,27 +8,99 @@ import sys
 import json
 import re
 import shutil
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 from dotenv import load_dotenv
 
+from core.block_parser import parse_block
+from core.chunk_manifest import atomic_write_text
+from core.consolidation_manifest import ConsolidationManifest, bytes_hash, incremental_enabled
+from core.item_dedup import ITEM_TEXT, dedupe_items, item_dedup_enabled, item_dedup_threshold
+from core.kb_export import EXPORT_DIRNAME, EXPORT_MANIFEST, export_formats, export_knowledge_base, export_shard_items
+from core.excel_stream import (
+    BOLD, EXCEL_AVAILABLE, HEADER, StreamSheet, create_workbook, measure_widths, write_table
+)
+
 load_dotenv()
 
 # Fix encoding para Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
-# Tenta importar openpyxl para Excel
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.utils import get_column_letter
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
+# Excel em streaming (openpyxl opcional)
+if not EXCEL_AVAILABLE:
     print("⚠️  openpyxl não instalado. Planilhas serão geradas em CSV.")
 
 
+# Listas de itens consolidadas (mesmas chaves de consolidated_data)
+ITEM_TYPES = ("qa_items", "facts", "procedures", "glossary", "examples")
+
+# Versão das regras de extração: mudar invalida o manifesto de consolidação
+# (2: entradas **Termo:** após outros registros e limites nos itens tipados)
+EXTRACTOR_VERSION = 2
+
+# Carimbo (no diretório do projeto) com a impressão digital das fontes das saídas atuais
+OUTPUT_STAMP = ".consolidation_stamp"
+
+# Abaixo disso, subir o pool de processos custa mais do que extrair em série
+POOL_MIN_FILES = 8
+
+
+def consolidation_workers() -> int:
+    """Processos da extração (CONSOLIDATION_WORKERS; 0 = um por núcleo, 1 = em série)."""
+    workers = int(os.environ.get("CONSOLIDATION_WORKERS", "0"))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _cell_text(value) -> str:
+    """Valor de célula: listas (ex.: tags dos itens tipados) viram texto separado por vírgulas."""
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def _source_text(item: Dict) -> str:
+    """Fonte(s) do item: itens unidos na deduplicação trazem a lista em `sources`."""
+    return _cell_text(item.get('sources') or item.get('source', ''))
+
+
+def _copy_if_changed(src: str, dest: str) -> bool:
+    """Copia preservando o mtime; pula se o destino já tem o mesmo tamanho e mtime."""
+    if os.path.exists(dest):
+        src_stat, dest_stat = os.stat(src), os.stat(dest)
+        if src_stat.st_size == dest_stat.st_size and src_stat.st_mtime == dest_stat.st_mtime:
+            return False
+    shutil.copy2(src, dest)
+    return True
+
+
+def _read_stamp(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _extract_source_file(json_path: str) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+    """
+    Lê e extrai um JSON do Agent Builder (no processo principal ou num worker do pool).
+
+    Returns:
+        (extração, hash do arquivo, erro) - erro é None quando deu certo
+    """
+    try:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        extracted = AgentConsolidator("worker").extract_json_data(json.loads(raw), json_path)
+        return extracted, bytes_hash(raw), None
+    except Exception as e:
+        return None, None, str(e)
+
+
 class AgentConsolidator:
     """
     Consolida múltiplos arquivos Agent Builder em uma estrutura unificada.
@@ -39,6 +111,7 @@ class AgentConsolidator:
         self.output_language = output_language
         self.json_files: List[str] = []
         self.txt_files: List[str] = []
+        self.manifest: Optional[ConsolidationManifest] = None
         self.consolidated_data = {
             "metadata": {
                 "project_name": project_name,
@@ -89,95 +162,65 @@ class AgentConsolidator:
 
         self.json_files = sorted(json_files)
         self.txt_files = sorted(txt_files)
+        if incremental_enabled():
+            self.manifest = ConsolidationManifest(source_dir, EXTRACTOR_VERSION)
 
         print(f"📁 Encontrados: {len(self.json_files)} JSONs e {len(self.txt_files)} TXTs")
         return self.json_files, self.txt_files
 
-    def extract_qa_from_content(self, content: str, source_name: str) -> List[Dict]:
+    def extract_qa_from_content(self, content: str, source_name: str, parsed: Optional[Dict] = None) -> List[Dict]:
         """
         Extrai pares de Q&A do conteúdo de um bloco.
-        Usa múltiplos padrões para capturar diferentes formatos.
+        Aceita os formatos qa_id/pergunta/resposta, pergunta:/resposta:, **Q1:**/**A:**
+        e * **Pergunta:**/* **Resposta:** (leitura única, ver core/block_parser.py).
         """
+        parsed = parsed if parsed is not None else parse_block(content)
         qa_items = []
-
-        # Padrão 1: Formato qa_id estruturado
-        qa_pattern = r'qa_id:\s*(\w+)\s*\n.*?pergunta:\s*(.+?)(?:\n|$).*?(?:variacoes:.*?\n)?.*?resposta:\s*(.+?)(?=\nqa_id:|\nqa_\d+:|$)'
-
-        # Padrão 2: Formato pergunta/resposta simples
-        simple_pattern = r'(?:pergunta|question|q):\s*(.+?)\n.*?(?:resposta|answer|a):\s*(.+?)(?=\n(?:pergunta|question|q):|\n##|\n---|\Z)'
-
-        # Padrão 3: Formato numerado
-        numbered_pattern = r'\*\*(?:Q|Pergunta)\s*\d*[:.]\*\*\s*(.+?)\n.*?\*\*(?:A|Resposta)[:.]\*\*\s*(.+?)(?=\n\*\*(?:Q|Pergunta)|\n##|\Z)'
-
-        # Padrão 4: Formato com asteriscos
-        asterisk_pattern = r'\*\s*\*\*(?:Pergunta|Question)[:.]\*\*\s*(.+?)\n.*?\*\s*\*\*(?:Resposta|Answer)[:.]\*\*\s*(.+?)(?=\n\*\s*\*\*(?:Pergunta|Question)|\n##|\Z)'
-
         found_items = set()  # Para evitar duplicatas
 
-        for pattern in [qa_pattern, simple_pattern, numbered_pattern, asterisk_pattern]:
-            matches = re.findall(pattern, content, re.DOTALL | re.IGNORECASE)
-            for match in matches:
-                if len(match) >= 2:
-                    # Extrai pergunta e resposta
-                    if len(match) == 3:
-                        qa_id, question, answer = match
-                    else:
-                        question, answer = match[0], match[1]
-                        qa_id = f"QA_{len(qa_items) + 1}"
-
-                    # Limpa e valida
-                    question = question.strip()[:500]
-                    answer = answer.strip()[:2000]
-
-                    # Evita duplicatas
-                    key = (question[:100], answer[:100])
-                    if key not in found_items and len(question) > 10 and len(answer) > 20:
-                        found_items.add(key)
-                        qa_items.append({
-                            "id": qa_id,
-                            "question": question,
-                            "answer": answer,
-                            "source": source_name,
-                            "type": "qa"
-                        })
+        for item in parsed['qa_items']:
+            # Limpa e valida
+            question = item['question'][:500]
+            answer = item['answer'][:2000]
+
+            # Evita duplicatas
+            key = (question[:100], answer[:100])
+            if key not in found_items and len(question) > 10 and len(answer) > 20:
+                found_items.add(key)
+                qa_items.append({
+                    "id": item.get('id') or f"QA_{len(qa_items) + 1}",
+                    "question": question,
+                    "answer": answer,
+                    "source": source_name,
+                    "type": "qa"
+                })
 
         return qa_items
 
-    def extract_facts_from_content(self, content: str, source_name: str) -> List[Dict]:
+    def extract_facts_from_content(self, content: str, source_name: str, parsed: Optional[Dict] = None) -> List[Dict]:
         """
         Extrai fatos e afirmações do conteúdo.
         """
+        parsed = parsed if parsed is not None else parse_block(content)
         facts = []
-
-        # Padrão para fatos estruturados
-        fact_pattern = r'fato_id:\s*(\w+)\s*\n.*?afirmacao:\s*(.+?)(?:\n|$).*?tipo:\s*(\w+)'
-
-        # Padrão para métricas
-        metric_pattern = r'metrica:\s*(.+?)\n.*?valor:\s*(.+?)(?:\n|$)'
-
-        # Padrão para bullets de fatos
-        bullet_pattern = r'[-*]\s*\*\*(.+?):\*\*\s*(.+?)(?=\n[-*]|\n##|\Z)'
-
         found_items = set()
 
-        # Extrai fatos estruturados
-        for match in re.findall(fact_pattern, content, re.DOTALL | re.IGNORECASE):
-            fact_id, statement, fact_type = match
-            statement = statement.strip()[:1000]
+        # Fatos estruturados
+        for item in parsed['facts']:
+            statement = item['statement'][:1000]
             key = statement[:100]
             if key not in found_items and len(statement) > 20:
                 found_items.add(key)
                 facts.append({
-                    "id": fact_id,
+                    "id": item['id'],
                     "statement": statement,
-                    "type": fact_type.strip(),
+                    "type": item['type'],
                     "source": source_name
                 })
 
-        # Extrai métricas
-        for match in re.findall(metric_pattern, content, re.DOTALL | re.IGNORECASE):
-            metric_name, value = match
-            statement = f"{metric_name.strip()}: {value.strip()}"
+        # Métricas
+        for item in parsed['metrics']:
+            statement = f"{item['name']}: {item['value']}"
             key = statement[:100]
             if key not in found_items:
                 found_items.add(key)
@@ -190,126 +233,142 @@ class AgentConsolidator:
 
         return facts
 
-    def extract_procedures_from_content(self, content: str, source_name: str) -> List[Dict]:
+    def extract_procedures_from_content(self, content: str, source_name: str, parsed: Optional[Dict] = None) -> List[Dict]:
         """
         Extrai procedimentos e processos do conteúdo.
         """
+        parsed = parsed if parsed is not None else parse_block(content)
         procedures = []
-
-        # Padrão para processos estruturados
-        process_pattern = r'processo_id:\s*(\w+)\s*\n.*?nome:\s*(.+?)(?:\n|$).*?objetivo:\s*(.+?)(?:\n|$).*?passos:(.*?)(?=processo_id:|\Z)'
-
-        # Padrão para passos numerados
-        steps_pattern = r'(\d+)\.\s*(.+?)(?=\n\d+\.|\n##|\Z)'
-
         found_items = set()
 
-        for match in re.findall(process_pattern, content, re.DOTALL | re.IGNORECASE):
-            proc_id, name, objective, steps_text = match
-            name = name.strip()[:200]
-            objective = objective.strip()[:500]
-
-            # Extrai passos
-            steps = []
-            for step_match in re.findall(steps_pattern, steps_text, re.DOTALL):
-                step_num, step_text = step_match
-                steps.append(f"{step_num}. {step_text.strip()[:300]}")
-
+        for item in parsed['procedures']:
+            name = item['name'][:200]
             key = name[:50]
             if key not in found_items:
                 found_items.add(key)
                 procedures.append({
-                    "id": proc_id,
+                    "id": item['id'],
                     "name": name,
-                    "objective": objective,
-                    "steps": steps[:20],  # Limita a 20 passos
+                    "objective": item['objective'][:500],
+                    "steps": [step[:300] for step in item['steps'][:20]],  # Limita a 20 passos
                     "source": source_name
                 })
 
         return procedures
 
-    def extract_glossary_from_content(self, content: str, source_name: str) -> List[Dict]:
+    def extract_glossary_from_content(self, content: str, source_name: str, parsed: Optional[Dict] = None) -> List[Dict]:
         """
-        Extrai termos do glossário do conteúdo.
+        Extrai termos do glossário do conteúdo (termo:/definicao: e **Termo:** definição).
         """
+        parsed = parsed if parsed is not None else parse_block(content)
         glossary = []
-
-        # Padrão para termos estruturados
-        term_pattern = r'termo:\s*(.+?)(?:\n|$).*?definicao:\s*(.+?)(?=\ntermo:|\n##|\Z)'
-
-        # Padrão alternativo
-        alt_pattern = r'\*\*(.+?):\*\*\s*(.+?)(?=\n\*\*|\n##|\Z)'
-
         found_items = set()
 
-        for pattern in [term_pattern, alt_pattern]:
-            for match in re.findall(pattern, content, re.DOTALL | re.IGNORECASE):
-                term, definition = match
-                term = term.strip()[:100]
-                definition = definition.strip()[:500]
-
-                key = term.lower()
-                if key not in found_items and len(term) > 2 and len(definition) > 10:
-                    found_items.add(key)
-                    glossary.append({
-                        "term": term,
-                        "definition": definition,
-                        "source": source_name
-                    })
+        for item in parsed['glossary']:
+            term = item['term'][:100]
+            definition = item['definition'][:500]
+
+            key = term.lower()
+            if key not in found_items and len(term) > 2 and len(definition) > 10:
+                found_items.add(key)
+                glossary.append({
+                    "term": term,
+                    "definition": definition,
+                    "source": source_name
+                })
 
         return glossary
 
-    def extract_examples_from_content(self, content: str, source_name: str) -> List[Dict]:
+    def extract_examples_from_content(self, content: str, source_name: str, parsed: Optional[Dict] = None) -> List[Dict]:
         """
         Extrai exemplos e casos do conteúdo.
         """
+        parsed = parsed if parsed is not None else parse_block(content)
         examples = []
-
-        # Padrão para casos estruturados
-        case_pattern = r'caso_id:\s*(\w+)\s*\n.*?titulo:\s*(.+?)(?:\n|$).*?(?:contexto|situacao).*?:\s*(.+?)(?=\ncaso_id:|\n##|\Z)'
-
         found_items = set()
 
-        for match in re.findall(case_pattern, content, re.DOTALL | re.IGNORECASE):
-            case_id, title, context = match
-            title = title.strip()[:200]
-            context = context.strip()[:1000]
-
+        for item in parsed['examples']:
+            title = item['title'][:200]
             key = title[:50]
             if key not in found_items:
                 found_items.add(key)
                 examples.append({
-                    "id": case_id,
+                    "id": item['id'],
                     "title": title,
-                    "context": context,
+                    "context": item['context'][:1000],
                     "source": source_name
                 })
 
         return examples
 
-    def process_json_file(self, json_path: str) -> Dict:
+    def typed_items(self, item_type: str, items: List[Dict], source_name: str) -> List[Dict]:
         """
-        Processa um arquivo JSON do Agent Builder e extrai dados estruturados.
+        Itens já estruturados (JSON do Agent Builder) com a fonte anotada.
+        Aplica os mesmos cortes, tamanhos mínimos e chaves de duplicata dos
+        extratores de texto; os demais campos tipados (tags, variações...) ficam.
         """
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        typed = []
+        found_items = set()
 
-        source_name = data.get('metadata', {}).get('source', os.path.basename(json_path))
+        for raw in items:
+            item = {**raw, "source": source_name}
+            if item_type == "qa_items":
+                item['question'] = raw.get('question', '')[:500]
+                item['answer'] = raw.get('answer', '')[:2000]
+                item['type'] = "qa"
+                key = (item['question'][:100], item['answer'][:100])
+                valid = len(item['question']) > 10 and len(item['answer']) > 20
+            elif item_type == "facts":
+                item['statement'] = raw.get('statement', '')[:1000]
+                key = item['statement'][:100]
+                valid = len(item['statement']) > 20
+            elif item_type == "procedures":
+                item['name'] = raw.get('name', '')[:200]
+                item['objective'] = raw.get('objective', '')[:500]
+                item['steps'] = [step[:300] for step in raw.get('steps', [])[:20]]
+                key = item['name'][:50]
+                valid = True
+            elif item_type == "glossary":
+                item['term'] = raw.get('term', '')[:100]
+                item['definition'] = raw.get('definition', '')[:500]
+                key = item['term'].lower()
+                valid = len(item['term']) > 2 and len(item['definition']) > 10
+            else:
+                item['title'] = raw.get('title', '')[:200]
+                item['context'] = raw.get('context', '')[:1000]
+                key = item['title'][:50]
+                valid = True
+
+            if valid and key not in found_items:
+                found_items.add(key)
+                typed.append(item)
 
-        # Adiciona à lista de fontes
-        self.consolidated_data['metadata']['sources'].append({
-            "name": source_name,
-            "file": os.path.basename(json_path),
-            "generated_at": data.get('metadata', {}).get('generated_at', '')
-        })
+        return typed
+
+    def extract_json_data(self, data: Dict, json_path: str) -> Dict:
+        """
+        Extrai de um JSON do Agent Builder a fonte, as instruções do agente e os
+        itens por tipo (o que fica salvo no manifesto de consolidação).
+        """
+        source_name = data.get('metadata', {}).get('source', os.path.basename(json_path))
+        extracted = {
+            "source": {
+                "name": source_name,
+                "file": os.path.basename(json_path),
+                "generated_at": data.get('metadata', {}).get('generated_at', '')
+            },
+            "agent_instructions": None,
+            "items": {item_type: [] for item_type in ITEM_TYPES}
+        }
+        items = extracted['items']
 
         # Extrai instruções do agente
         agent_instructions = data.get('agent_instructions', '')
         if agent_instructions:
-            self.consolidated_data['agent_instructions'].append({
+            extracted['agent_instructions'] = {
                 "source": source_name,
                 "instructions": agent_instructions
-            })
+            }
 
         # Processa cada bloco de conhecimento
         knowledge_blocks = data.get('knowledge_blocks', {})
@@ -318,45 +377,146 @@ class AgentConsolidator:
             block_name = block_data.get('name', '')
             block_content = block_data.get('content', '')
 
+            # Blocos com itens tipados (resposta estruturada): junta direto, sem regex
+            item_type = block_data.get('item_type')
+            if item_type in items and isinstance(block_data.get('items'), list):
+                items[item_type].extend(self.typed_items(item_type, block_data['items'], source_name))
+                continue
+
+            # Texto livre: uma leitura do bloco serve a todos os extratores abaixo
+            parsed = parse_block(block_content)
+
             # Bloco 1: Ontologia (Glossário)
             if 'ONTOLOGIA' in block_name.upper() or block_num == '1':
-                glossary = self.extract_glossary_from_content(block_content, source_name)
-                self.consolidated_data['glossary'].extend(glossary)
+                items['glossary'].extend(self.extract_glossary_from_content(block_content, source_name, parsed))
 
             # Bloco 2: Fatos
             if 'FACTUAL' in block_name.upper() or 'CONHECIMENTO' in block_name.upper() or block_num == '2':
-                facts = self.extract_facts_from_content(block_content, source_name)
-                self.consolidated_data['facts'].extend(facts)
+                items['facts'].extend(self.extract_facts_from_content(block_content, source_name, parsed))
 
             # Bloco 3: Procedimentos
             if 'PROCEDIMENTO' in block_name.upper() or 'INSTRUC' in block_name.upper() or block_num == '3':
-                procedures = self.extract_procedures_from_content(block_content, source_name)
-                self.consolidated_data['procedures'].extend(procedures)
+                items['procedures'].extend(self.extract_procedures_from_content(block_content, source_name, parsed))
 
             # Bloco 4: Exemplos
             if 'EXEMPLO' in block_name.upper() or 'CASO' in block_name.upper() or block_num == '4':
-                examples = self.extract_examples_from_content(block_content, source_name)
-                self.consolidated_data['examples'].extend(examples)
+                items['examples'].extend(self.extract_examples_from_content(block_content, source_name, parsed))
 
             # Bloco 5: Q&A
             if 'PERGUNTA' in block_name.upper() or 'Q&A' in block_name.upper() or 'RESPOSTA' in block_name.upper() or block_num == '5':
-                qa_items = self.extract_qa_from_content(block_content, source_name)
-                self.consolidated_data['qa_items'].extend(qa_items)
+                items['qa_items'].extend(self.extract_qa_from_content(block_content, source_name, parsed))
+
+        return extracted
+
+    def add_extracted(self, extracted: Dict):
+        """Acrescenta a extração de uma fonte (lida agora ou vinda do manifesto) aos dados consolidados."""
+        self.consolidated_data['metadata']['sources'].append(extracted['source'])
+        if extracted['agent_instructions']:
+            self.consolidated_data['agent_instructions'].append(extracted['agent_instructions'])
+        for item_type, items in extracted['items'].items():
+            self.consolidated_data[item_type].extend(items)
+
+    def process_json_file(self, json_path: str) -> Dict:
+        """
+        Processa um arquivo JSON do Agent Builder e extrai dados estruturados.
+        """
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+
+        extracted = self.extract_json_data(data, json_path)
+        self.add_extracted(extracted)
+        if self.manifest is not None:
+            self.manifest.record(json_path, extracted, bytes_hash(raw))
 
         return data
 
+    def extract_files(self, paths: List[str]) -> List[Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+        """
+        Extrai os arquivos num pool de processos (CONSOLIDATION_WORKERS), ou em
+        série se houver poucos arquivos ou um worker só.
+
+        Returns:
+            Um (extração, hash, erro) por arquivo, na mesma ordem de `paths`
+        """
+        workers = min(consolidation_workers(), len(paths))
+        if workers > 1 and len(paths) >= POOL_MIN_FILES:
+            print(f"  ⚙️  Extraindo {len(paths)} fonte(s) em {workers} processos")
+            chunksize = max(1, len(paths) // (workers * 4))
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # map devolve na ordem de entrada
+                    return list(executor.map(_extract_source_file, paths, chunksize=chunksize))
+            except (OSError, BrokenProcessPool) as e:
+                print(f"⚠️  Pool de processos indisponível ({e}); extraindo em série")
+
+        results = []
+        for json_path in paths:
+            print(f"  📄 Processando: {os.path.basename(json_path)}")
+            results.append(_extract_source_file(json_path))
+        return results
+
+    def deduplicate_items(self):
+        """Une Q&As e fatos repetidos ou parafraseados entre fontes (core/item_dedup.py)."""
+        threshold = item_dedup_threshold()
+        labels = {"qa_items": "Q&As", "facts": "Fatos"}
+        reports = {}
+        print(f"\n🧬 Deduplicando itens entre fontes (similaridade >= {threshold})...")
+        for item_type in ITEM_TEXT:
+            items, report = dedupe_items(item_type, self.consolidated_data[item_type], threshold)
+            self.consolidated_data[item_type] = items
+            reports[item_type] = report
+            print(
+                f"   {labels[item_type]}: {report['before']} → {report['after']} "
+                f"({report['ratio']:.1%} removidos: {report['exact']} idênticos, {report['near']} similares)"
+            )
+        self.consolidated_data['metadata']['dedup'] = reports
+
     def consolidate_all(self) -> Dict:
         """
         Processa todos os arquivos JSON descobertos e consolida os dados.
         """
         print("\n📊 Consolidando bases de conhecimento...")
 
+        # Fontes sem mudanças desde a última consolidação: itens do manifesto
+        extracted_by_path = {}
+        pending = []
         for json_path in self.json_files:
-            try:
-                print(f"  📄 Processando: {os.path.basename(json_path)}")
-                self.process_json_file(json_path)
-            except Exception as e:
-                print(f"  ⚠️  Erro ao processar {json_path}: {e}")
+            cached = None
+            if self.manifest is not None:
+                try:
+                    cached = self.manifest.lookup(json_path)
+                except OSError as e:
+                    print(f"  ⚠️  Erro ao processar {json_path}: {e}")
+                    continue
+            if cached is not None:
+                extracted_by_path[json_path] = cached
+            else:
+                pending.append(json_path)
+        reused = len(extracted_by_path)
+
+        parsed = 0
+        for json_path, (extracted, digest, error) in zip(pending, self.extract_files(pending)):
+            if error is not None:
+                print(f"  ⚠️  Erro ao processar {json_path}: {error}")
+                continue
+            extracted_by_path[json_path] = extracted
+            parsed += 1
+            if self.manifest is not None:
+                self.manifest.record(json_path, extracted, digest)
+
+        # Ordem estável (a das fontes), independente de qual worker terminou primeiro
+        for json_path in self.json_files:
+            if json_path in extracted_by_path:
+                self.add_extracted(extracted_by_path[json_path])
+
+        if self.manifest is not None:
+            removed = self.manifest.prune(self.json_files)
+            self.manifest.save()
+            print(f"  ♻️  Manifesto: {reused} fonte(s) reaproveitada(s), {parsed} lida(s), {len(removed)} removida(s)")
+
+        if item_dedup_enabled():
+            self.deduplicate_items()
 
         # Estatísticas
         stats = {
@@ -463,158 +623,95 @@ Sua base de conhecimento foi construída a partir de {len(self.consolidated_data
     def create_mega_excel(self, output_path: str) -> str:
         """
         Cria uma mega planilha Excel com todas as informações consolidadas.
+        Escrita em streaming (core/excel_stream.py): a memória não cresce com o número de linhas.
         """
         if not EXCEL_AVAILABLE:
             return self.create_mega_csv(output_path.replace('.xlsx', '.csv'))
 
-        wb = Workbook()
-
-        # Estilos
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        cell_alignment = Alignment(vertical="top", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        def style_header(ws, headers):
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = thin_border
-
-        def auto_width(ws):
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = min(len(str(cell.value)), 80)
-                    except:
-                        pass
-                ws.column_dimensions[column_letter].width = max_length + 2
+        wb = create_workbook()
+        data = self.consolidated_data
 
         # Aba 1: Q&A (Principal para RAG)
-        ws_qa = wb.active
-        ws_qa.title = "Q&A"
-        headers_qa = ["ID", "Pergunta", "Resposta", "Fonte", "Tags"]
-        style_header(ws_qa, headers_qa)
-
-        for row, item in enumerate(self.consolidated_data['qa_items'], 2):
-            ws_qa.cell(row=row, column=1, value=item.get('id', f'QA_{row-1}'))
-            ws_qa.cell(row=row, column=2, value=item.get('question', ''))
-            ws_qa.cell(row=row, column=3, value=item.get('answer', ''))
-            ws_qa.cell(row=row, column=4, value=item.get('source', ''))
-            ws_qa.cell(row=row, column=5, value=item.get('tags', ''))
-            for col in range(1, 6):
-                ws_qa.cell(row=row, column=col).alignment = cell_alignment
-                ws_qa.cell(row=row, column=col).border = thin_border
-
-        auto_width(ws_qa)
+        write_table(wb, "Q&A", ["ID", "Pergunta", "Resposta", "Fonte", "Tags"], lambda: (
+            [
+                item.get('id', f'QA_{index}'),
+                item.get('question', ''),
+                item.get('answer', ''),
+                _source_text(item),
+                _cell_text(item.get('tags', ''))
+            ]
+            for index, item in enumerate(data['qa_items'], 1)
+        ))
 
         # Aba 2: Fatos
-        ws_facts = wb.create_sheet("Fatos")
-        headers_facts = ["ID", "Afirmação", "Tipo", "Fonte"]
-        style_header(ws_facts, headers_facts)
-
-        for row, item in enumerate(self.consolidated_data['facts'], 2):
-            ws_facts.cell(row=row, column=1, value=item.get('id', f'F_{row-1}'))
-            ws_facts.cell(row=row, column=2, value=item.get('statement', ''))
-            ws_facts.cell(row=row, column=3, value=item.get('type', ''))
-            ws_facts.cell(row=row, column=4, value=item.get('source', ''))
-            for col in range(1, 5):
-                ws_facts.cell(row=row, column=col).alignment = cell_alignment
-                ws_facts.cell(row=row, column=col).border = thin_border
-
-        auto_width(ws_facts)
+        write_table(wb, "Fatos", ["ID", "Afirmação", "Tipo", "Fonte"], lambda: (
+            [
+                item.get('id', f'F_{index}'),
+                item.get('statement', ''),
+                item.get('type', ''),
+                _source_text(item)
+            ]
+            for index, item in enumerate(data['facts'], 1)
+        ))
 
         # Aba 3: Procedimentos
-        ws_proc = wb.create_sheet("Procedimentos")
-        headers_proc = ["ID", "Nome", "Objetivo", "Passos", "Fonte"]
-        style_header(ws_proc, headers_proc)
-
-        for row, item in enumerate(self.consolidated_data['procedures'], 2):
-            steps_text = "\n".join(item.get('steps', []))
-            ws_proc.cell(row=row, column=1, value=item.get('id', f'P_{row-1}'))
-            ws_proc.cell(row=row, column=2, value=item.get('name', ''))
-            ws_proc.cell(row=row, column=3, value=item.get('objective', ''))
-            ws_proc.cell(row=row, column=4, value=steps_text)
-            ws_proc.cell(row=row, column=5, value=item.get('source', ''))
-            for col in range(1, 6):
-                ws_proc.cell(row=row, column=col).alignment = cell_alignment
-                ws_proc.cell(row=row, column=col).border = thin_border
-
-        auto_width(ws_proc)
+        write_table(wb, "Procedimentos", ["ID", "Nome", "Objetivo", "Passos", "Fonte"], lambda: (
+            [
+                item.get('id', f'P_{index}'),
+                item.get('name', ''),
+                item.get('objective', ''),
+                "\n".join(item.get('steps', [])),
+                _source_text(item)
+            ]
+            for index, item in enumerate(data['procedures'], 1)
+        ))
 
         # Aba 4: Glossário
-        ws_gloss = wb.create_sheet("Glossário")
-        headers_gloss = ["Termo", "Definição", "Fonte"]
-        style_header(ws_gloss, headers_gloss)
-
-        for row, item in enumerate(self.consolidated_data['glossary'], 2):
-            ws_gloss.cell(row=row, column=1, value=item.get('term', ''))
-            ws_gloss.cell(row=row, column=2, value=item.get('definition', ''))
-            ws_gloss.cell(row=row, column=3, value=item.get('source', ''))
-            for col in range(1, 4):
-                ws_gloss.cell(row=row, column=col).alignment = cell_alignment
-                ws_gloss.cell(row=row, column=col).border = thin_border
-
-        auto_width(ws_gloss)
+        write_table(wb, "Glossário", ["Termo", "Definição", "Fonte"], lambda: (
+            [item.get('term', ''), item.get('definition', ''), _source_text(item)]
+            for item in data['glossary']
+        ))
 
         # Aba 5: Exemplos
-        ws_ex = wb.create_sheet("Exemplos")
-        headers_ex = ["ID", "Título", "Contexto", "Fonte"]
-        style_header(ws_ex, headers_ex)
-
-        for row, item in enumerate(self.consolidated_data['examples'], 2):
-            ws_ex.cell(row=row, column=1, value=item.get('id', f'E_{row-1}'))
-            ws_ex.cell(row=row, column=2, value=item.get('title', ''))
-            ws_ex.cell(row=row, column=3, value=item.get('context', ''))
-            ws_ex.cell(row=row, column=4, value=item.get('source', ''))
-            for col in range(1, 5):
-                ws_ex.cell(row=row, column=col).alignment = cell_alignment
-                ws_ex.cell(row=row, column=col).border = thin_border
-
-        auto_width(ws_ex)
+        write_table(wb, "Exemplos", ["ID", "Título", "Contexto", "Fonte"], lambda: (
+            [
+                item.get('id', f'E_{index}'),
+                item.get('title', ''),
+                item.get('context', ''),
+                _source_text(item)
+            ]
+            for index, item in enumerate(data['examples'], 1)
+        ))
 
         # Aba 6: Metadados
-        ws_meta = wb.create_sheet("Metadados")
         headers_meta = ["Propriedade", "Valor"]
-        style_header(ws_meta, headers_meta)
-
         meta_rows = [
             ("Projeto", self.project_name),
             ("Data de Criação", datetime.now().strftime("%d/%m/%Y %H:%M")),
             ("Idioma", self.output_language),
-            ("Total de Fontes", len(self.consolidated_data['metadata']['sources'])),
-            ("Total de Q&As", len(self.consolidated_data['qa_items'])),
-            ("Total de Fatos", len(self.consolidated_data['facts'])),
-            ("Total de Procedimentos", len(self.consolidated_data['procedures'])),
-            ("Total de Termos", len(self.consolidated_data['glossary'])),
-            ("Total de Exemplos", len(self.consolidated_data['examples'])),
+            ("Total de Fontes", str(len(data['metadata']['sources']))),
+            ("Total de Q&As", str(len(data['qa_items']))),
+            ("Total de Fatos", str(len(data['facts']))),
+            ("Total de Procedimentos", str(len(data['procedures']))),
+            ("Total de Termos", str(len(data['glossary']))),
+            ("Total de Exemplos", str(len(data['examples']))),
         ]
+        sources_header = "FONTES PROCESSADAS"
 
-        for row, (prop, val) in enumerate(meta_rows, 2):
-            ws_meta.cell(row=row, column=1, value=prop)
-            ws_meta.cell(row=row, column=2, value=str(val))
-
-        # Lista de fontes
-        row_offset = len(meta_rows) + 3
-        ws_meta.cell(row=row_offset, column=1, value="FONTES PROCESSADAS")
-        ws_meta.cell(row=row_offset, column=1).font = Font(bold=True)
+        def source_rows():
+            return ([source.get('name', ''), source.get('file', '')] for source in data['metadata']['sources'])
 
-        for idx, source in enumerate(self.consolidated_data['metadata']['sources'], 1):
-            ws_meta.cell(row=row_offset + idx, column=1, value=source.get('name', ''))
-            ws_meta.cell(row=row_offset + idx, column=2, value=source.get('file', ''))
+        widths = measure_widths(headers_meta, itertools.chain(meta_rows, [[sources_header]], source_rows()))
+        ws_meta = StreamSheet(wb, "Metadados", widths)
+        ws_meta.append(headers_meta, style=HEADER)
+        for row in meta_rows:
+            ws_meta.append(row)
 
-        auto_width(ws_meta)
+        # Lista de fontes
+        ws_meta.append([])
+        ws_meta.append([sources_header], style=BOLD)
+        for row in source_rows():
+            ws_meta.append(row)
 
         # Salva
         wb.save(output_path)
@@ -636,8 +733,8 @@ Sua base de conhecimento foi construída a partir de {len(self.consolidated_data
                     item.get('id', ''),
                     item.get('question', ''),
                     item.get('answer', ''),
-                    item.get('source', ''),
-                    item.get('tags', '')
+                    _source_text(item),
+                    _cell_text(item.get('tags', ''))
                 ])
 
         print(f"  📄 CSV de Q&As salvo: {qa_path}")
@@ -653,6 +750,9 @@ Sua base de conhecimento foi construída a partir de {len(self.consolidated_data
         │   └── knowledge_base.xlsx
         ├── system_prompt/
         │   └── system_prompt.txt
+        ├── export/
+        │   ├── manifest.json
+        │   └── [itens por tipo em .jsonl/.parquet]
         ├── json/
         │   └── [arquivos json originais]
         └── txt/
@@ -675,35 +775,71 @@ Sua base de conhecimento foi construída a partir de {len(self.consolidated_data
 
         print(f"\n📁 Organizando outputs em: {project_dir}")
 
-        # 1. Gera e salva mega planilha
         excel_path = os.path.join(dirs['mega_planilha'], f"knowledge_base_{self.project_name}.xlsx")
-        self.create_mega_excel(excel_path)
-        print(f"  ✅ Mega planilha: {excel_path}")
-
-        # 2. Gera e salva System Prompt
-        system_prompt = self.generate_consolidated_system_prompt()
+        # Sem openpyxl a planilha sai em CSV (create_mega_csv): o de Q&As é o que sempre existe
+        sheet_path = excel_path if EXCEL_AVAILABLE else excel_path.replace('.xlsx', '_qa.csv')
         prompt_path = os.path.join(dirs['system_prompt'], f"system_prompt_{self.project_name}.txt")
-        with open(prompt_path, 'w', encoding='utf-8') as f:
-            f.write(system_prompt)
-        print(f"  ✅ System Prompt: {prompt_path}")
-
-        # 3. Copia JSONs
-        for json_file in self.json_files:
-            dest = os.path.join(dirs['json'], os.path.basename(json_file))
-            shutil.copy2(json_file, dest)
-        print(f"  ✅ JSONs copiados: {len(self.json_files)} arquivos")
-
-        # 4. Copia TXTs
-        for txt_file in self.txt_files:
-            dest = os.path.join(dirs['txt'], os.path.basename(txt_file))
-            shutil.copy2(txt_file, dest)
-        print(f"  ✅ TXTs copiados: {len(self.txt_files)} arquivos")
-
-        # 5. Salva JSON consolidado
         consolidated_json_path = os.path.join(project_dir, f"consolidated_data_{self.project_name}.json")
-        with open(consolidated_json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.consolidated_data, f, ensure_ascii=False, indent=2)
-        print(f"  ✅ JSON consolidado: {consolidated_json_path}")
+        export_dir = os.path.join(project_dir, EXPORT_DIRNAME)
+        formats = export_formats()
+
+        # Saídas já geradas com exatamente as mesmas fontes: nada a refazer
+        stamp_path = os.path.join(project_dir, OUTPUT_STAMP)
+        settings = (
+            f"dedup={item_dedup_enabled()}:{item_dedup_threshold()};export={','.join(formats)}"
+            f":{export_shard_items()};language={self.output_language}"
+        )
+        fingerprint = self.manifest.fingerprint(self.json_files, settings) if self.manifest is not None else None
+        up_to_date = (
+            fingerprint is not None
+            and _read_stamp(stamp_path) == fingerprint
+            and os.path.exists(sheet_path)
+            and os.path.exists(prompt_path)
+            and os.path.exists(consolidated_json_path)
+            and (not formats or os.path.exists(os.path.join(export_dir, EXPORT_MANIFEST)))
+        )
+
+        if up_to_date:
+            print("  ⏭️  Nenhuma fonte nova, alterada ou removida: planilha, System Prompt e JSON consolidado mantidos")
+        else:
+            # Sem carimbo enquanto as saídas são refeitas (uma interrupção aqui força refazer na próxima)
+            if os.path.exists(stamp_path):
+                os.remove(stamp_path)
+
+            # 1. Gera e salva mega planilha
+            self.create_mega_excel(excel_path)
+            print(f"  ✅ Mega planilha: {excel_path}")
+
+            # 2. Gera e salva System Prompt
+            system_prompt = self.generate_consolidated_system_prompt()
+            with open(prompt_path, 'w', encoding='utf-8') as f:
+                f.write(system_prompt)
+            print(f"  ✅ System Prompt: {prompt_path}")
+
+        # 3. Copia JSONs (só os novos ou alterados)
+        copied = sum(_copy_if_changed(json_file, os.path.join(dirs['json'], os.path.basename(json_file)))
+                     for json_file in self.json_files)
+        print(f"  ✅ JSONs copiados: {copied} de {len(self.json_files)} arquivos")
+
+        # 4. Copia TXTs (só os novos ou alterados)
+        copied = sum(_copy_if_changed(txt_file, os.path.join(dirs['txt'], os.path.basename(txt_file)))
+                     for txt_file in self.txt_files)
+        print(f"  ✅ TXTs copiados: {copied} de {len(self.txt_files)} arquivos")
+
+        if not up_to_date:
+            # 5. Salva JSON consolidado
+            with open(consolidated_json_path, 'w', encoding='utf-8') as f:
+                json.dump(self.consolidated_data, f, ensure_ascii=False, indent=2)
+            print(f"  ✅ JSON consolidado: {consolidated_json_path}")
+
+            # 6. Exporta os itens por tipo (JSONL/Parquet, gravados item a item)
+            if formats:
+                export = export_knowledge_base(self.consolidated_data, export_dir, ITEM_TYPES, formats, self.project_name)
+                files = sum(len(info['files']) for info in export['item_types'].values())
+                print(f"  ✅ Exportação ({', '.join(export['formats'])}): {export_dir} ({files} arquivos)")
+
+            if fingerprint is not None:
+                atomic_write_text(stamp_path, fingerprint)
 
         return project_dir
 
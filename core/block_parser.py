@@ -0,0 +1,271 @@
+"""
+Leitor de blocos do Agent Builder em uma única passada, linha a linha.
+
+Os extratores do AgentConsolidator usavam, para cada tipo de item, várias
+expressões regulares com `re.DOTALL` e quantificadores preguiçosos aninhados
+sobre o bloco inteiro; em blocos grandes (ou com um campo sem o par esperado,
+ex.: "pergunta:" sem "resposta:") cada início de item varria o resto do texto e
+o tempo ficava quadrático.
+
+Aqui o bloco é lido uma vez, linha a linha, por uma máquina de estados: cada
+linha é classificada em tempo proporcional ao seu tamanho (sem regex: apenas
+`find`/`strip` com limites fixos) como início de item (`qa_id:`, `pergunta:`,
+`fato_id:`, `metrica:`, `processo_id:`, `caso_id:`, `termo:`, `**Termo:**`),
+campo do item atual, passo numerado ou continuação do campo atual. Assim o tempo
+total é linear no tamanho do bloco, e todos os tipos saem da mesma leitura.
+
+Benchmark contra as regex antigas: scripts/bench_block_parser.py
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Tamanho máximo de uma chave ("qa_id", "Pergunta 1", ...): limita a busca por ':'
+MAX_KEY_LENGTH = 40
+
+# Campos de cada tipo de item: chave no texto → campo (None = campo conhecido, ignorado)
+FIELDS = {
+    "qa": {
+        "qa_id": "id", "qa_": "id",
+        "pergunta": "question", "question": "question", "q": "question",
+        "resposta": "answer", "answer": "answer", "a": "answer", "r": "answer",
+        "variacoes": None, "citacao_suporte": None, "conceitos_relacionados": None,
+        "categoria": None, "tags": None,
+    },
+    "fact": {
+        "fato_id": "id", "afirmacao": "statement", "tipo": "type",
+        "evidencia": None, "confianca": None, "fonte_contexto": None, "tags": None,
+    },
+    "metric": {
+        "metrica": "name", "valor": "value", "unidade": None, "contexto": None, "fonte": None,
+    },
+    "procedure": {
+        "processo_id": "id", "nome": "name", "objetivo": "objective", "passos": "steps",
+        "prerequisitos": None, "verificacao": None, "erros_comuns": None, "tags": None,
+    },
+    "case": {
+        "caso_id": "id", "titulo": "title",
+        "contexto_inicial": "context", "contexto": "context", "situacao": "context",
+        "tipo": None, "intervencao": None, "resultado": None, "licao_principal": None,
+        "citacao_relevante": None, "tags": None,
+    },
+    "term": {
+        "termo": "term", "definicao": "definition", "contexto": None, "relacionados": None, "exemplo": None,
+    },
+    "bold": {},
+}
+
+# Chaves que abrem um item; as primárias (IDs) sempre abrem um item novo
+STARTERS = {
+    "qa_id": "qa", "qa_": "qa", "pergunta": "qa", "question": "qa", "q": "qa",
+    "fato_id": "fact", "metrica": "metric", "processo_id": "procedure", "caso_id": "case", "termo": "term",
+}
+PRIMARY_STARTERS = {"qa_id", "qa_", "fato_id", "metrica", "processo_id", "caso_id", "termo"}
+
+# Campos que continuam nas linhas seguintes (os demais ficam só na linha da chave)
+MULTILINE_FIELDS = {"answer", "definition", "context", "steps"}
+
+# Campos obrigatórios de cada tipo para o item ser aproveitado
+REQUIRED = {
+    "qa": ("question", "answer"),
+    "fact": ("id", "statement", "type"),
+    "metric": ("name", "value"),
+    "procedure": ("id", "name", "objective", "steps"),
+    "case": ("id", "title", "context"),
+    "term": ("term", "definition"),
+    "bold": ("term", "definition"),
+}
+
+OUTPUT_LISTS = {
+    "qa": "qa_items",
+    "fact": "facts",
+    "metric": "metrics",
+    "procedure": "procedures",
+    "case": "examples",
+    "term": "glossary",
+    "bold": "glossary",
+}
+
+
+class _Record:
+    __slots__ = ("kind", "indent", "values", "field")
+
+    def __init__(self, kind: str, indent: int):
+        self.kind = kind
+        self.indent = indent
+        self.values: Dict[str, List[str]] = {}
+        self.field: Optional[str] = None
+
+    def set(self, field: Optional[str], value: str):
+        self.field = field
+        if field is None:
+            return
+        if field == "steps":
+            self.values["steps"] = []
+            if value:
+                self.add_step_line(value)
+        else:
+            self.values[field] = [value] if value else []
+
+    def add_step_line(self, text: str):
+        steps = self.values["steps"]
+        numbered = _numbered(text)
+        if numbered is not None:
+            steps.append([f"{numbered[0]}. {numbered[1]}"])
+        elif steps:
+            steps[-1].append(text)
+
+    def continue_field(self, text: str):
+        if self.field == "steps":
+            self.add_step_line(text)
+        elif self.field in MULTILINE_FIELDS:
+            self.values[self.field].append(text)
+
+    def build(self) -> Optional[Dict]:
+        item = {}
+        for field, lines in self.values.items():
+            if field == "steps":
+                item["steps"] = ["\n".join(step).strip() for step in lines]
+            else:
+                item[field] = "\n".join(lines).strip()
+        if self.kind == "fact" and item.get("type"):
+            item["type"] = _first_word(item["type"])
+        if any(field not in item or (field != "steps" and not item[field]) for field in REQUIRED[self.kind]):
+            return None
+        return item
+
+
+def _first_word(text: str) -> str:
+    """Primeira sequência de letras/dígitos/_ (ex.: 'definicao | principio' → 'definicao')."""
+    end = 0
+    while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+        end += 1
+    return text[:end]
+
+
+def _numbered(text: str) -> Optional[Tuple[str, str]]:
+    """('3', 'texto') para uma linha '3. texto'; None caso contrário."""
+    end = 0
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    if end == 0 or end >= len(text) or text[end] != ".":
+        return None
+    return text[:end], text[end + 1:].strip()
+
+
+def split_key(line: str) -> Tuple[Optional[str], str, str, bool]:
+    """
+    Separa uma linha (já sem espaços nas pontas) em chave e valor.
+
+    Aceita 'chave: valor', '- chave: valor', '**Chave:** valor', '**Chave**: valor',
+    '**Q1.** valor' e '* **Pergunta:** valor'. A chave volta normalizada
+    (minúsculas, sem número no fim: 'Pergunta 1' → 'pergunta').
+
+    Returns:
+        (chave ou None, valor, rótulo original, se era negrito)
+    """
+    text = line
+    while text[:2] in ("- ", "* ", "+ "):
+        text = text[2:].lstrip()
+
+    bold = text.startswith("**")
+    if bold:
+        end = text.find("**", 2, 2 + MAX_KEY_LENGTH + 2)
+        if end == -1:
+            return None, "", "", False
+        label = text[2:end].strip()
+        rest = text[end + 2:]
+        if label[-1:] in (":", "."):
+            label = label[:-1].rstrip()
+        elif rest.lstrip().startswith(":"):
+            rest = rest.lstrip()[1:]
+        else:
+            return None, "", "", False
+    else:
+        colon = text.find(":", 0, MAX_KEY_LENGTH + 1)
+        if colon <= 0:
+            return None, "", "", False
+        label = text[:colon].strip()
+        rest = text[colon + 1:]
+        if not label.replace("_", "").isalnum():
+            return None, "", "", False
+
+    key = label.lower().rstrip("0123456789").rstrip()
+    if not key:
+        return None, "", "", False
+    return key, rest.strip(), label, bold
+
+
+def _starts_record(current: Optional[_Record], key: str) -> bool:
+    kind = STARTERS.get(key)
+    if kind is None:
+        return False
+    if current is None or current.kind != kind:
+        return True
+    if key in PRIMARY_STARTERS:
+        return bool(current.values)
+    return FIELDS[kind][key] in current.values
+
+
+def parse_block(content: str) -> Dict[str, List[Dict]]:
+    """
+    Lê o bloco uma vez e devolve todos os itens encontrados, por tipo.
+
+    Returns:
+        {"qa_items": [...], "facts": [...], "metrics": [...], "procedures": [...],
+         "glossary": [...], "examples": [...]} - campos crus (sem fonte/limites);
+        os filtros de tamanho e duplicatas ficam com o consolidador
+    """
+    result = {name: [] for name in set(OUTPUT_LISTS.values())}
+    current: Optional[_Record] = None
+
+    def close():
+        if current is not None:
+            item = current.build()
+            if item is not None:
+                result[OUTPUT_LISTS[current.kind]].append(item)
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith("##") or line.startswith("---") or line.startswith("```"):
+            # Seções, separadores e cercas de código encerram o item atual
+            close()
+            current = None
+            continue
+
+        indent = len(raw_line) - len(raw_line.lstrip())
+        if current is not None and indent > current.indent and current.field in MULTILINE_FIELDS:
+            # Linhas mais indentadas pertencem ao campo aberto (sub-itens, detalhes de passos)
+            current.continue_field(line)
+            continue
+
+        key, value, label, bold = split_key(line)
+        if key is None:
+            if current is not None:
+                current.continue_field(line)
+            continue
+
+        if _starts_record(current, key):
+            close()
+            current = _Record(STARTERS[key], indent)
+            current.set(FIELDS[current.kind][key], label if key == "qa_" else value)
+        elif current is not None and key in FIELDS[current.kind]:
+            current.set(FIELDS[current.kind][key], value)
+        elif bold and (
+            current is None
+            or current.kind in ("bold", "term")
+            or current.field not in MULTILINE_FIELDS
+            or indent < current.indent
+        ):
+            # '**Termo:** definição' fora de outro item (ou depois de um termo, ou de um
+            # campo de linha única): entrada de glossário
+            close()
+            current = _Record("bold", indent)
+            current.values["term"] = [label]
+            current.set("definition", value)
+        elif current is not None:
+            current.continue_field(line)
+
+    close()
+    return result
@@ -0,0 +1,258 @@
+"""
+Esquemas JSON dos blocos do Agent Builder com itens tipados.
+
+Os blocos 1-5 (glossário, fatos, procedimentos, casos e Q&A) são pedidos ao
+modelo com `response_schema`: a resposta traz a lista de itens já estruturada
+(mesmos campos que o AgentConsolidator usa) e um campo `notes` com as demais
+seções do bloco (hierarquia, relações, métricas, árvores de decisão...). Os
+itens vão direto para o JSON de saída (`knowledge_blocks[n].items`); o texto do
+bloco (TXT e síntese) é montado a partir deles no formato YAML-like do prompt.
+
+Na chamada única (core/structured.py), cada bloco com esquema é uma seção com o
+mesmo objeto {items, notes}.
+
+Blocos sem esquema (6 e 7) e saídas de map-reduce continuam em texto livre.
+
+Configuração via .env:
+    AGENT_STRUCTURED_BLOCKS=true
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from core.structured import parse_json_object
+
+
+def _string(description: str) -> Dict:
+    return {"type": "string", "description": description}
+
+
+def _string_list(description: str) -> Dict:
+    return {"type": "array", "items": {"type": "string"}, "description": description}
+
+
+GLOSSARY_ITEM = {
+    "type": "object",
+    "properties": {
+        "term": _string("Nome exato do termo"),
+        "definition": _string("Definição precisa dada pelo autor"),
+        "context": _string("Quando/como usar este termo"),
+        "related": _string_list("Outros termos conectados"),
+        "example": _string("Exemplo literal do autor"),
+    },
+    "required": ["term", "definition"],
+}
+
+FACT_ITEM = {
+    "type": "object",
+    "properties": {
+        "id": _string("Identificador (F001, F002...; métricas: M001...)"),
+        "statement": _string("Afirmação exata ou muito próxima do original (métricas: 'nome: valor unidade')"),
+        "type": _string("definicao | principio | regra | observacao | estatistica | opiniao | metrica"),
+        "evidence": _string("Dados, exemplos ou argumentos que suportam"),
+        "confidence": _string("alta | media | baixa"),
+        "tags": _string_list("Palavras-chave"),
+    },
+    "required": ["id", "statement", "type"],
+}
+
+PROCEDURE_ITEM = {
+    "type": "object",
+    "properties": {
+        "id": _string("Identificador (P001, P002...)"),
+        "name": _string("Nome do processo"),
+        "objective": _string("O que se alcança"),
+        "prerequisites": _string("O que precisa estar pronto"),
+        "steps": _string_list("Passos em ordem, cada um com a ação e os detalhes"),
+        "verification": _string("Como saber se funcionou"),
+        "common_errors": _string("O que pode dar errado"),
+        "tags": _string_list("Palavras-chave"),
+    },
+    "required": ["id", "name", "objective", "steps"],
+}
+
+EXAMPLE_ITEM = {
+    "type": "object",
+    "properties": {
+        "id": _string("Identificador (C001, C002...)"),
+        "title": _string("Nome descritivo"),
+        "type": _string("sucesso | fracasso | comparativo | hipotetico"),
+        "context": _string("Situação inicial, problema e recursos disponíveis"),
+        "intervention": _string("O que foi feito, em ordem"),
+        "result": _string("O que aconteceu, com métricas e tempo se houver"),
+        "lesson": _string("O que isso ensina"),
+        "tags": _string_list("Palavras-chave"),
+    },
+    "required": ["id", "title", "context"],
+}
+
+QA_ITEM = {
+    "type": "object",
+    "properties": {
+        "id": _string("Identificador (QA001, QA002...)"),
+        "question": _string("Pergunta natural que alguém faria"),
+        "variations": _string_list("Outras formas de fazer a mesma pergunta"),
+        "answer": _string("Resposta completa baseada no conteúdo (100-300 palavras)"),
+        "supporting_quote": _string("Trecho relevante do autor"),
+        "category": _string("conceitual | procedimental | estrategico | comparativo"),
+        "tags": _string_list("Palavras-chave"),
+    },
+    "required": ["id", "question", "answer"],
+}
+
+# Bloco → (lista do AgentConsolidator, esquema do item)
+BLOCK_ITEMS = {
+    1: ("glossary", GLOSSARY_ITEM),
+    2: ("facts", FACT_ITEM),
+    3: ("procedures", PROCEDURE_ITEM),
+    4: ("examples", EXAMPLE_ITEM),
+    5: ("qa_items", QA_ITEM),
+}
+
+NOTES_DESCRIPTION = (
+    "Demais seções do bloco que não são itens da lista (hierarquia de conceitos, relações, "
+    "fórmulas, árvores de decisão, checklists, comparações), no formato YAML-like do prompt"
+)
+
+STRUCTURED_NOTE = """
+**FORMATO DA RESPOSTA**: responda com um objeto JSON. Em `items`, um objeto por {label} extraído (todos os campos preenchidos com o que está no conteúdo; NUNCA invente). Em `notes`, as demais seções do bloco.
+"""
+
+ITEM_LABELS = {
+    "glossary": "termo do glossário",
+    "facts": "fato ou métrica",
+    "procedures": "procedimento",
+    "examples": "caso ou exemplo",
+    "qa_items": "par de pergunta e resposta",
+}
+
+
+def structured_blocks_enabled() -> bool:
+    return os.environ.get("AGENT_STRUCTURED_BLOCKS", "true").strip().lower() in ("1", "true", "yes", "sim")
+
+
+def block_item_type(block_number: int) -> Optional[str]:
+    """Tipo de item do bloco (chave do consolidador), ou None se o bloco é texto livre."""
+    entry = BLOCK_ITEMS.get(block_number)
+    return entry[0] if entry else None
+
+
+def block_response_schema(block_number: int) -> Dict:
+    """Objeto do bloco: lista de itens tipados + notas."""
+    _, item_schema = BLOCK_ITEMS[block_number]
+    return {
+        "type": "object",
+        "properties": {
+            "items": {"type": "array", "items": item_schema},
+            "notes": _string(NOTES_DESCRIPTION),
+        },
+        "required": ["items", "notes"],
+    }
+
+
+def block_generation_config(block_number: int) -> Dict:
+    """Resposta JSON do bloco: lista de itens tipados + notas."""
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": block_response_schema(block_number),
+    }
+
+
+def single_call_description(block_number: int, description: str) -> str:
+    """Descrição da seção do bloco na chamada única (objeto em vez de texto)."""
+    label = ITEM_LABELS[block_item_type(block_number)]
+    return f"{description} (objeto JSON: em `items`, um objeto por {label}; em `notes`, as demais seções do bloco)"
+
+
+def with_structured_note(prompt: str, block_number: int) -> str:
+    """Acrescenta ao prompt do bloco as instruções do formato JSON."""
+    return prompt + STRUCTURED_NOTE.format(label=ITEM_LABELS[block_item_type(block_number)])
+
+
+def _clean_item(raw, item_schema) -> Optional[Dict]:
+    """Item com os tipos do esquema, ou None se faltar um campo obrigatório."""
+    if not isinstance(raw, dict):
+        return None
+    item = {}
+    for name, prop in item_schema["properties"].items():
+        value = raw.get(name)
+        if prop["type"] == "array":
+            values = value if isinstance(value, list) else []
+            item[name] = [str(v).strip() for v in values if str(v).strip()]
+        elif value is not None and not isinstance(value, (dict, list)):
+            item[name] = str(value).strip()
+        else:
+            item[name] = ""
+    if any(not item[name] for name in item_schema["required"]):
+        return None
+    return item
+
+
+def parse_block_response(text: str, block_number: int) -> Optional[Tuple[List[Dict], str]]:
+    """
+    Itens válidos e notas da resposta JSON de um bloco.
+
+    Returns:
+        (itens, notas), ou None se a resposta não for um JSON com `items`
+    """
+    return parse_block_data(parse_json_object(text), block_number)
+
+
+def parse_block_data(data: Optional[Dict], block_number: int) -> Optional[Tuple[List[Dict], str]]:
+    """Itens válidos e notas do objeto de um bloco (resposta do bloco ou seção da chamada única)."""
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        return None
+    _, item_schema = BLOCK_ITEMS[block_number]
+    items = [item for item in (_clean_item(raw, item_schema) for raw in data["items"]) if item]
+    dropped = len(data["items"]) - len(items)
+    if dropped:
+        print(f"⚠️  Bloco {block_number}: {dropped} item(ns) sem campos obrigatórios descartado(s)")
+    notes = data.get("notes") if isinstance(data.get("notes"), str) else ""
+    return items, notes.strip()
+
+
+def _yaml_lines(fields: List[Tuple[str, object]]) -> List[str]:
+    lines = []
+    for label, value in fields:
+        if not value:
+            continue
+        if isinstance(value, list):
+            lines.append(f"{label}:")
+            lines.extend(f"  - {entry}" for entry in value)
+        else:
+            lines.append(f"{label}: {value}")
+    return lines
+
+
+def render_block(block_number: int, items: List[Dict], notes: str = "") -> str:
+    """
+    Texto YAML-like do bloco (mesmas chaves do prompt: termo/definicao, fato_id,
+    processo_id, caso_id, qa_id...), para o TXT, a síntese e leitores antigos.
+    """
+    item_type = block_item_type(block_number)
+    entries = []
+    for item in items:
+        if item_type == "glossary":
+            fields = [("termo", item["term"]), ("definicao", item["definition"]), ("contexto", item["context"]),
+                      ("relacionados", item["related"]), ("exemplo", item["example"])]
+        elif item_type == "facts":
+            fields = [("fato_id", item["id"]), ("afirmacao", item["statement"]), ("tipo", item["type"]),
+                      ("evidencia", item["evidence"]), ("confianca", item["confidence"]), ("tags", item["tags"])]
+        elif item_type == "procedures":
+            steps = [f"{index}. {step}" for index, step in enumerate(item["steps"], 1)]
+            fields = [("processo_id", item["id"]), ("nome", item["name"]), ("objetivo", item["objective"]),
+                      ("prerequisitos", item["prerequisites"]), ("passos", steps),
+                      ("verificacao", item["verification"]), ("erros_comuns", item["common_errors"]),
+                      ("tags", item["tags"])]
+        elif item_type == "examples":
+            fields = [("caso_id", item["id"]), ("titulo", item["title"]), ("tipo", item["type"]),
+                      ("contexto", item["context"]), ("intervencao", item["intervention"]),
+                      ("resultado", item["result"]), ("licao_principal", item["lesson"]), ("tags", item["tags"])]
+        else:
+            fields = [("qa_id", item["id"]), ("pergunta", item["question"]), ("variacoes", item["variations"]),
+                      ("resposta", item["answer"]), ("citacao_suporte", item["supporting_quote"]),
+                      ("categoria", item["category"]), ("tags", item["tags"])]
+        entries.append("\n".join(_yaml_lines(fields)))
+
+    text = "\n\n".join(entries) if entries else "[NÃO MENCIONADO]"
+    return f"{text}\n\n{notes}" if notes else text
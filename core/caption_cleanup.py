@@ -0,0 +1,206 @@
+"""
+Limpeza determinística de legendas antes de qualquer chamada ao LLM.
+
+Legendas automáticas chegam com linhas repetidas (legenda "rolante"), marcações
+como [Música]/[Music], vícios de linguagem e chamadas de patrocínio/inscrição.
+Tudo isso era enviado ao Gemini em todos os modos (7-8 vezes nos multi-stage).
+
+A limpeza:
+1. Remove marcações que não são fala ([Música], [Aplausos], ♪, >>)
+2. Remove a sobreposição entre linhas consecutivas (legenda rolante)
+3. Remove vícios de linguagem isolados e palavras repetidas em sequência
+4. Remove frases de patrocínio e de "inscreva-se / link na descrição"
+5. Reorganiza o texto em frases e parágrafos
+
+O resultado é guardado em cache (data/cache/clean_captions), então cada
+transcrição é limpa uma única vez. Só passam pela limpeza as legendas baixadas
+do YouTube (marcadas por download_transcription com um arquivo
+`<legenda>.txt.captions` ao lado); documentos extraídos, PRDs, arquivos
+temporários do worker e qualquer outro texto são lidos como estão.
+
+Configuração via .env:
+    CAPTION_CLEANUP=true
+"""
+
+import os
+import re
+import hashlib
+
+from core.llm_backend import estimate_tokens
+
+# Versão das regras: mudar invalida o cache de legendas limpas
+CLEANUP_VERSION = "1"
+
+# Marca (arquivo vazio ao lado da legenda) gravada no download
+CAPTION_MARK_SUFFIX = ".captions"
+
+CACHE_DIR = os.path.join("data", "cache", "clean_captions")
+
+NON_SPEECH_RE = re.compile(
+    r"\[[^\]\n]{0,40}\]"
+    r"|\([^)\n]{0,25}(?:música|music|aplausos|applause|risos|laughter)[^)\n]{0,25}\)"
+    r"|♪+|>>+",
+    re.IGNORECASE,
+)
+
+FILLER_WORDS = {
+    # pt
+    "hã", "hãã", "hum", "humm", "hmm", "ãh", "ahn", "éh", "uhum", "aham",
+    # en
+    "uh", "uhh", "um", "umm", "uhm", "erm", "er",
+}
+
+BOILERPLATE_RE = re.compile(
+    r"(inscrev[ae]-se|se inscrev|ativ[ae] o sininho|deix[ae] (o )?seu like|deixa aquele like|"
+    r"link (est[áa] )?na descrição|patrocinad[oa] (por|pel[ao])|"
+    r"subscribe to (the|my|our) channel|hit the (notification )?bell|smash (that|the) like|"
+    r"link in the description|this video is sponsored|sponsored by|"
+    r"make sure to (like and )?subscribe|don'?t forget to subscribe)",
+    re.IGNORECASE,
+)
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+# Linhas/frases maiores que isso nunca são descartadas como boilerplate
+BOILERPLATE_MAX_WORDS = 40
+
+SENTENCES_PER_PARAGRAPH = 5
+WORDS_PER_PARAGRAPH = 80
+
+_WORD_STRIP = ".,!?…;:\"'“”‘’()"
+
+
+def cleanup_enabled() -> bool:
+    return os.environ.get("CAPTION_CLEANUP", "true").strip().lower() in ("1", "true", "yes", "sim")
+
+
+def mark_caption_file(path: str):
+    """Marca um arquivo como legenda baixada (só esses passam pela limpeza)."""
+    with open(path + CAPTION_MARK_SUFFIX, 'w', encoding='utf-8'):
+        pass
+
+
+def is_caption_file(path: str) -> bool:
+    """A origem decide, não a extensão: só legendas marcadas no download são limpas."""
+    return os.path.exists(path + CAPTION_MARK_SUFFIX)
+
+
+def _norm(word: str) -> str:
+    return word.strip(_WORD_STRIP).lower()
+
+
+def _merge_lines(lines):
+    """
+    Junta as linhas removendo a sobreposição com o texto já acumulado:
+    se o início de uma linha repete o final das anteriores, só o resto entra.
+    """
+    words = []
+    norm_words = []
+    for line in lines:
+        line_words = line.split()
+        if not line_words:
+            continue
+        line_norm = [_norm(w) for w in line_words]
+
+        # Maior k tal que as últimas k palavras acumuladas == primeiras k da linha
+        overlap = 0
+        max_k = min(len(line_words), len(norm_words))
+        for k in range(max_k, 0, -1):
+            if norm_words[-k:] == line_norm[:k]:
+                overlap = k
+                break
+
+        # Só conta como legenda rolante se a sobreposição for relevante
+        if overlap >= 3 or overlap == len(line_words):
+            line_words, line_norm = line_words[overlap:], line_norm[overlap:]
+
+        words.extend(line_words)
+        norm_words.extend(line_norm)
+    return words
+
+
+def _drop_fillers(words):
+    """Remove vícios de linguagem isolados e a mesma palavra repetida em sequência."""
+    result = []
+    previous = None
+    for word in words:
+        norm = _norm(word)
+        if norm in FILLER_WORDS:
+            continue
+        if norm and norm == previous:
+            continue
+        result.append(word)
+        # Só colapsa repetições dentro da mesma frase ("então então", "the the")
+        previous = norm if word == word.strip(_WORD_STRIP) else None
+    return result
+
+
+def _is_boilerplate(text: str) -> bool:
+    return len(text.split()) <= BOILERPLATE_MAX_WORDS and bool(BOILERPLATE_RE.search(text))
+
+
+def _reflow(words):
+    """Reorganiza o texto em parágrafos de frases (ou de N palavras, sem pontuação)."""
+    text = " ".join(words)
+    sentences = [s.strip() for s in SENTENCE_END_RE.split(text) if s.strip()]
+    sentences = [s for s in sentences if not _is_boilerplate(s)]
+
+    if len(sentences) > 1:
+        groups = [sentences[i:i + SENTENCES_PER_PARAGRAPH] for i in range(0, len(sentences), SENTENCES_PER_PARAGRAPH)]
+        return "\n\n".join(" ".join(group) for group in groups)
+
+    # Legenda sem pontuação: parágrafos de tamanho fixo
+    words = " ".join(sentences).split()
+    return "\n\n".join(
+        " ".join(words[i:i + WORDS_PER_PARAGRAPH]) for i in range(0, len(words), WORDS_PER_PARAGRAPH)
+    )
+
+
+def clean_captions(text: str) -> str:
+    """Aplica todas as regras de limpeza a um texto de legenda."""
+    lines = [NON_SPEECH_RE.sub(" ", line) for line in text.splitlines()]
+    # Legendas sem pontuação: o boilerplate só é detectável linha a linha
+    lines = [line for line in lines if not _is_boilerplate(line)]
+    words = _merge_lines(lines)
+    words = _drop_fillers(words)
+    return _reflow(words)
+
+
+def _cache_path(raw_text: str) -> str:
+    digest = hashlib.sha256(f"{CLEANUP_VERSION}\0{raw_text}".encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.txt")
+
+
+def read_transcription(path: str) -> str:
+    """
+    Lê uma transcrição; legendas passam pela limpeza (uma vez, com cache).
+
+    Returns:
+        str: Texto pronto para ser enviado ao LLM
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw_text = f.read()
+
+    if not cleanup_enabled() or not is_caption_file(path):
+        return raw_text
+
+    cache_path = _cache_path(raw_text)
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    cleaned = clean_captions(raw_text)
+    if not cleaned.strip():
+        # Nada sobrou (ex.: arquivo só com marcações): mantém o original
+        return raw_text
+
+    before, after = estimate_tokens(raw_text), estimate_tokens(cleaned)
+    saved = before - after
+    print(f"🧹 Legenda limpa: {before} → {after} tokens (-{saved}, {saved / max(before, 1):.0%}) em {os.path.basename(path)}")
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(cleaned)
+    os.replace(tmp_path, cache_path)
+    return cleaned
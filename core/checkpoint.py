@@ -0,0 +1,100 @@
+"""
+Checkpoint por etapa para os processadores multi-stage.
+
+Cada etapa concluída (dimensão/bloco) é gravada imediatamente em
+data/checkpoints/<hash>.json, onde o hash identifica o tipo de processamento,
+a versão do prompt, o idioma de saída e o texto de entrada. Se o processo cair
+(erro, Ctrl+C, soft time limit do Celery), a próxima execução com a mesma
+entrada reaproveita as etapas já pagas e roda apenas as que faltam e a síntese.
+Etapas geradas em streaming também deixam o texto parcial ao lado do checkpoint
+(<hash>.<etapa>.partial), retomado por continuação (ver core/streaming.py).
+
+Configuração via .env:
+    CHECKPOINT_DIR=data/checkpoints
+"""
+
+import os
+import glob
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+
+def input_hash(kind, text, language="", version=""):
+    """Hash estável de (tipo de processamento, versão do prompt, idioma, texto de entrada)."""
+    digest = hashlib.sha256()
+    for part in (kind, version, language, text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()[:24]
+
+
+class StageCheckpoint:
+    """
+    Armazena o resultado de cada etapa concluída de um processamento.
+
+    A escrita é atômica (arquivo temporário + os.replace), então um checkpoint
+    nunca fica corrompido pela metade.
+    """
+
+    def __init__(self, kind, text, language="", checkpoint_dir=None, version=""):
+        self.kind = kind
+        self.key = input_hash(kind, text, language, version)
+        self.checkpoint_dir = checkpoint_dir or os.environ.get("CHECKPOINT_DIR", os.path.join("data", "checkpoints"))
+        self.path = os.path.join(self.checkpoint_dir, f"{self.key}.json")
+        self._lock = threading.Lock()
+        self._stages = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("stages", {})
+        except Exception as e:
+            print(f"⚠️  Checkpoint ilegível ignorado ({self.path}): {e}")
+            return {}
+
+    def _write(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        data = {
+            "kind": self.kind,
+            "input_hash": self.key,
+            "updated_at": datetime.now().isoformat(),
+            "stages": self._stages
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, stage_id):
+        """Resultado salvo da etapa, ou None se ela ainda não foi concluída."""
+        with self._lock:
+            return self._stages.get(stage_id)
+
+    def completed_stages(self):
+        """IDs das etapas já concluídas."""
+        with self._lock:
+            return list(self._stages.keys())
+
+    def save_stage(self, stage_id, value):
+        """Registra a etapa como concluída e persiste o checkpoint."""
+        with self._lock:
+            self._stages[stage_id] = value
+            self._write()
+
+    def partial_path(self, stage_id):
+        """Arquivo do texto parcial (streaming) de uma etapa em andamento."""
+        return os.path.join(self.checkpoint_dir, f"{self.key}.{stage_id}.partial")
+
+    def clear(self):
+        """Remove o checkpoint e parciais (chamado depois que a saída final foi salva)."""
+        with self._lock:
+            self._stages = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            for partial in glob.glob(os.path.join(self.checkpoint_dir, f"{self.key}.*.partial")):
+                os.remove(partial)
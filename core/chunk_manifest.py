@@ -0,0 +1,90 @@
+"""
+Manifesto de chunks para `process_transcription`.
+
+Ao lado do arquivo de saída fica um `<saida>.manifest.json` com o hash e o
+resultado de cada chunk já processado. Se a execução for interrompida, a próxima
+processa apenas os chunks que faltam; quando o último termina, o arquivo final é
+montado de uma vez (escrita atômica) e o manifesto é removido. Assim o arquivo
+de saída só existe quando está completo.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+
+def text_hash(text):
+    """SHA-256 (hex) de um texto."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def atomic_write_text(path, content):
+    """Grava em um arquivo temporário e troca pelo destino com os.replace."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class ChunkManifest:
+    """
+    Registro dos chunks concluídos de um arquivo de saída.
+
+    Um chunk só é reaproveitado se o seu hash e o hash do prompt forem os mesmos
+    da execução anterior.
+    """
+
+    def __init__(self, output_file, prompt):
+        self.output_file = output_file
+        self.path = output_file + ".manifest.json"
+        self.prompt_hash = text_hash(prompt)
+        self.chunks = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Manifesto ilegível ignorado ({self.path}): {e}")
+            return
+
+        if data.get("prompt_hash") != self.prompt_hash:
+            print("⚠️  Prompt mudou desde a última execução. Reprocessando todos os chunks.")
+            return
+        self.chunks = data.get("chunks", {})
+
+    def _save(self, total_chunks):
+        data = {
+            "output_file": os.path.basename(self.output_file),
+            "prompt_hash": self.prompt_hash,
+            "total_chunks": total_chunks,
+            "updated_at": datetime.now().isoformat(),
+            "chunks": self.chunks
+        }
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def get(self, index, chunk):
+        """Resultado salvo do chunk, ou None se ele precisa ser processado."""
+        entry = self.chunks.get(str(index))
+        if entry and entry.get("hash") == text_hash(chunk):
+            return entry["output"]
+        return None
+
+    def record(self, index, chunk, output, total_chunks):
+        """Registra um chunk concluído e persiste o manifesto."""
+        self.chunks[str(index)] = {
+            "hash": text_hash(chunk),
+            "output": output,
+            "completed_at": datetime.now().isoformat()
+        }
+        self._save(total_chunks)
+
+    def finalize(self, outputs):
+        """Monta o arquivo de saída atomicamente e remove o manifesto."""
+        atomic_write_text(self.output_file, "".join(output + "\n\n" for output in outputs))
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,234 @@
+"""
+Controle adaptativo de concorrência (AIMD) para chamadas ao LLM.
+
+Substitui as pausas fixas (60s a cada 15 chunks, 30s entre arquivos, 65s após
+um 429) por uma janela de requisições simultâneas que se ajusta à cota real:
+
+- cada resposta bem-sucedida aumenta a janela de forma aditiva (+1 por janela
+  completa de respostas);
+- um 429, um timeout/503 ou um pico de latência reduz a janela de forma
+  multiplicativa (no máximo uma redução por intervalo de latência típico);
+- após um 429 sem pool de chaves, novas chamadas aguardam um recuo exponencial
+  (2s, 4s, 8s... até KEY_COOLDOWN_SECONDS) que é zerado no primeiro sucesso.
+
+Como o recuo é zerado a cada sucesso, poucas tentativas podem caber em poucos
+segundos, bem menos que a janela de cota por minuto do Gemini: os laços de
+tentativa das etapas usam `QuotaRetry` e só desistem de um 429 depois de um
+período de cota inteiro (QUOTA_WINDOW_SECONDS) desde o primeiro.
+
+A janela atual é exposta por `snapshot()` (e no /health da API).
+
+Configuração via .env:
+    LLM_CONCURRENCY_INITIAL=2     Janela inicial
+    LLM_CONCURRENCY_MAX=8         Janela máxima
+    LLM_CONCURRENCY_DECREASE=0.5  Fator de redução (429 / pico de latência)
+    LLM_LATENCY_SPIKE_FACTOR=3    Pico = latência > fator x latência média
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Amostras antes de considerar a latência média confiável
+MIN_LATENCY_SAMPLES = 5
+LATENCY_EWMA_ALPHA = 0.2
+BACKOFF_BASE_SECONDS = 2.0
+
+# Janela das cotas por minuto (RPM/TPM): uma etapa não desiste de um 429 antes disso
+QUOTA_WINDOW_SECONDS = 60.0
+
+
+class AdaptiveConcurrency:
+    """
+    Janela AIMD de chamadas simultâneas (thread-safe).
+
+    Uso:
+        with controller.slot() as call:
+            response = backend._generate(...)
+            call.success(latency)        # ou call.rate_limited() / call.overloaded()
+    """
+
+    def __init__(
+        self,
+        initial: Optional[float] = None,
+        max_limit: Optional[float] = None,
+        min_limit: float = 1.0,
+        decrease: Optional[float] = None,
+        spike_factor: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+    ):
+        env = os.environ.get
+        self.max_limit = max_limit if max_limit is not None else float(env("LLM_CONCURRENCY_MAX", "8"))
+        self.min_limit = min_limit
+        initial = initial if initial is not None else float(env("LLM_CONCURRENCY_INITIAL", "2"))
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.decrease = decrease if decrease is not None else float(env("LLM_CONCURRENCY_DECREASE", "0.5"))
+        self.spike_factor = spike_factor if spike_factor is not None else float(env("LLM_LATENCY_SPIKE_FACTOR", "3"))
+        self.max_backoff = max_backoff if max_backoff is not None else float(env("KEY_COOLDOWN_SECONDS", "60"))
+
+        self.in_flight = 0
+        self.latency_avg = 0.0
+        self.latency_samples = 0
+        self.paused_until = 0.0
+        self.successes = 0
+        self.rate_limited_count = 0
+        self.decreases = 0
+        self._consecutive_429 = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------ janela
+
+    def acquire(self):
+        """Bloqueia até haver vaga na janela (e o recuo após um 429 terminar)."""
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=min(wait, 1.0) if wait > 0 else 1.0)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Reserva uma vaga durante a chamada; o resultado é informado pelo `_Call`."""
+        self.acquire()
+        try:
+            yield _Call(self)
+        finally:
+            self.release()
+
+    # --------------------------------------------------------------- feedback
+
+    def _multiplicative_decrease(self, reason: str):
+        # Uma única redução por "RTT": respostas da mesma rajada não somam cortes
+        now = time.monotonic()
+        if now - self._last_decrease < max(self.latency_avg, 1.0):
+            return
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        self._last_decrease = now
+        self.decreases += 1
+        print(f"📉 Concorrência do LLM: {previous:.1f} → {self.limit:.1f} ({reason})")
+
+    def on_success(self, latency: float):
+        with self._cond:
+            self.successes += 1
+            self._consecutive_429 = 0
+
+            spike = (
+                self.latency_samples >= MIN_LATENCY_SAMPLES
+                and latency > self.spike_factor * self.latency_avg
+            )
+            self.latency_samples += 1
+            if self.latency_samples == 1:
+                self.latency_avg = latency
+            else:
+                self.latency_avg += LATENCY_EWMA_ALPHA * (latency - self.latency_avg)
+
+            if spike:
+                self._multiplicative_decrease(f"pico de latência {latency:.1f}s")
+            else:
+                # +1 a cada janela completa de respostas bem-sucedidas
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def on_rate_limited(self, pause: bool = True):
+        """429: reduz a janela e, se `pause`, aplica recuo exponencial a todas as chamadas."""
+        with self._cond:
+            self.rate_limited_count += 1
+            self._consecutive_429 += 1
+            self._multiplicative_decrease("429")
+            if pause:
+                backoff = min(self.max_backoff, BACKOFF_BASE_SECONDS * 2 ** (self._consecutive_429 - 1))
+                self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+                print(f"⏳ Cota excedida (429): novas chamadas em {backoff:.0f}s")
+
+    def on_overloaded(self):
+        """Timeout ou 503: servidor sobrecarregado, reduz a janela sem pausar."""
+        with self._cond:
+            self._multiplicative_decrease("timeout/sobrecarga")
+
+    def wait_until_ready(self):
+        """Espera o recuo atual terminar (para laços que não chamam o LLM diretamente)."""
+        wait = self.paused_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def snapshot(self) -> Dict:
+        """Métrica da janela atual."""
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "latency_avg_s": round(self.latency_avg, 2),
+                "paused_for_s": max(0.0, round(self.paused_until - time.monotonic(), 1)),
+                "successes": self.successes,
+                "rate_limited": self.rate_limited_count,
+                "decreases": self.decreases,
+            }
+
+
+class QuotaRetry:
+    """
+    Tentativas de uma etapa após 429.
+
+    Uso (no `except ResourceExhausted` de um laço de tentativas):
+        if quota.exhausted() and attempt >= max_retries - 1:
+            raise
+    """
+
+    def __init__(self, window: float = QUOTA_WINDOW_SECONDS):
+        self.window = window
+        self.first_429: Optional[float] = None
+
+    def exhausted(self) -> bool:
+        """Registra um 429; True se já passou um período de cota inteiro desde o primeiro."""
+        now = time.monotonic()
+        if self.first_429 is None:
+            self.first_429 = now
+        return now - self.first_429 >= self.window
+
+
+class _Call:
+    """Resultado de uma chamada dentro de `AdaptiveConcurrency.slot()`."""
+
+    def __init__(self, controller: AdaptiveConcurrency):
+        self.controller = controller
+
+    def success(self, latency: float):
+        self.controller.on_success(latency)
+
+    def rate_limited(self, pause: bool = True):
+        self.controller.on_rate_limited(pause)
+
+    def overloaded(self):
+        self.controller.on_overloaded()
+
+
+_controller_lock = threading.Lock()
+_controller: Optional[AdaptiveConcurrency] = None
+
+
+def get_concurrency() -> AdaptiveConcurrency:
+    """Retorna o controlador global de concorrência do LLM."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdaptiveConcurrency()
+    return _controller
+
+
+def set_concurrency(controller: Optional[AdaptiveConcurrency]):
+    """Substitui o controlador global (None = recria a partir do .env)."""
+    global _controller
+    with _controller_lock:
+        _controller = controller
@@ -0,0 +1,133 @@
+"""
+Manifesto da consolidação incremental do Agent Builder.
+
+A cada execução, o AgentConsolidator relia e re-extraía todos os
+*agent_builder*.json do diretório, mesmo quando só um vídeo novo tinha sido
+adicionado. O manifesto (`.consolidation_manifest.json`, no diretório das
+fontes) guarda, por arquivo, tamanho, mtime e hash do conteúdo junto com o que
+foi extraído dele (fonte, instruções do agente e itens por tipo). Na execução
+seguinte só os arquivos novos ou alterados são lidos; os demais vêm do
+manifesto, e os removidos saem dele.
+
+Quando as regras de extração mudam (versão diferente), o manifesto inteiro é
+descartado e tudo é relido.
+
+Configuração via .env:
+    CONSOLIDATION_INCREMENTAL=true
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from core.chunk_manifest import atomic_write_text, text_hash
+
+MANIFEST_FILENAME = ".consolidation_manifest.json"
+
+
+def incremental_enabled() -> bool:
+    return os.environ.get("CONSOLIDATION_INCREMENTAL", "true").strip().lower() in ("1", "true", "yes", "sim")
+
+
+def bytes_hash(data: bytes) -> str:
+    """SHA-256 (hex) de um conteúdo binário."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ConsolidationManifest:
+    """
+    Extrações salvas por arquivo-fonte de um diretório.
+
+    Um arquivo é reaproveitado se tamanho e mtime baterem com os registrados;
+    se só o mtime mudou (cópia, `touch`), o hash do conteúdo decide.
+    """
+
+    def __init__(self, source_dir: str, version: int):
+        self.path = os.path.join(source_dir, MANIFEST_FILENAME)
+        self.version = version
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Manifesto de consolidação ilegível ignorado ({self.path}): {e}")
+            return
+
+        if data.get("version") != self.version:
+            print("⚠️  Regras de extração mudaram desde a última consolidação. Relendo todas as fontes.")
+            return
+        self.entries = data.get("sources", {})
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        """Extração salva do arquivo, ou None se ele é novo ou mudou."""
+        entry = self.entries.get(os.path.basename(path))
+        if entry is None:
+            return None
+        stat = os.stat(path)
+        if entry["size"] != stat.st_size:
+            return None
+        if entry["mtime"] != stat.st_mtime:
+            if entry["hash"] != file_hash(path):
+                return None
+            entry["mtime"] = stat.st_mtime
+            self.dirty = True
+        return entry["extracted"]
+
+    def record(self, path: str, extracted: Dict, digest: str):
+        """Registra a extração de um arquivo lido nesta execução."""
+        stat = os.stat(path)
+        self.entries[os.path.basename(path)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "hash": digest,
+            "extracted": extracted,
+        }
+        self.dirty = True
+
+    def prune(self, paths: List[str]) -> List[str]:
+        """Remove do manifesto os arquivos que não existem mais; devolve os nomes removidos."""
+        current = {os.path.basename(path) for path in paths}
+        removed = [name for name in self.entries if name not in current]
+        for name in removed:
+            del self.entries[name]
+        if removed:
+            self.dirty = True
+        return removed
+
+    def fingerprint(self, paths: List[str], settings: str = "") -> str:
+        """
+        Hash do conjunto de fontes (nome + hash, na ordem dada) e das configurações
+        que afetam as saídas: muda quando qualquer um deles muda.
+        """
+        lines = [f"v{self.version}", settings]
+        for path in paths:
+            entry = self.entries.get(os.path.basename(path))
+            lines.append(f"{os.path.basename(path)}:{entry['hash'] if entry else ''}")
+        return text_hash("\n".join(lines))
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {
+            "version": self.version,
+            "updated_at": datetime.now().isoformat(),
+            "sources": self.entries,
+        }
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
+        self.dirty = False
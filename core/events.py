@@ -0,0 +1,93 @@
+"""
+Eventos de progresso por job (etapas iniciadas/concluídas e trechos de texto
+gerados em streaming).
+
+O processamento roda nos workers do Celery e o WebSocket na API, em processos
+diferentes; por isso os eventos de cada job vão para um arquivo JSONL
+(data/events/<job_id>.jsonl) que o WebSocket acompanha a partir do último
+offset lido. Fora de um job (ex.: CLI) `publish` não faz nada.
+
+O job atual fica num ContextVar: `job_scope(job_id)` o define para o bloco e
+`submit_with_context` o propaga para as threads dos executores.
+
+Configuração via .env:
+    EVENTS_DIR=data/events
+"""
+
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar("job_id", default=None)
+_write_lock = threading.Lock()
+
+
+def events_dir() -> str:
+    return os.environ.get("EVENTS_DIR", os.path.join("data", "events"))
+
+
+def events_path(job_id: str) -> str:
+    return os.path.join(events_dir(), f"{job_id}.jsonl")
+
+
+@contextmanager
+def job_scope(job_id: Optional[str]):
+    """Associa os eventos publicados dentro do bloco ao job `job_id`."""
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def current_job_id() -> Optional[str]:
+    return _current_job.get()
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """executor.submit que preserva os ContextVars (job atual) na thread do worker."""
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+def publish(event_type: str, **data):
+    """Acrescenta um evento ao arquivo do job atual (sem job, não faz nada)."""
+    job_id = _current_job.get()
+    if not job_id:
+        return
+    event = {"type": event_type, "job_id": job_id, "ts": time.time(), **data}
+    line = json.dumps(event, ensure_ascii=False) + "\n"
+    path = events_path(job_id)
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def read_events(job_id: str, offset: int = 0) -> Tuple[List[Dict], int]:
+    """
+    Eventos do job a partir de `offset` (bytes).
+
+    Returns:
+        (eventos, novo offset) - uma linha ainda incompleta fica para a próxima leitura
+    """
+    path = events_path(job_id)
+    if not os.path.exists(path):
+        return [], offset
+
+    events = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw_line in f:
+            if not raw_line.endswith(b"\n"):
+                break
+            offset += len(raw_line)
+            try:
+                events.append(json.loads(raw_line))
+            except ValueError:
+                continue
+    return events, offset
@@ -0,0 +1,175 @@
+"""
+Escrita de planilhas grandes em streaming (openpyxl write-only).
+
+As planilhas consolidadas (AgentConsolidator, FAQ) montavam abas inteiras em
+memória, com Alignment/Border/Font criados e atribuídos célula a célula, e
+depois percorriam todas as células de novo para ajustar as larguras: memória e
+tempo cresciam sem limite com o número de linhas.
+
+Aqui o workbook é write-only: cada linha é escrita no arquivo temporário da aba
+assim que é acrescentada e descartada em seguida. Os estilos são nomeados
+(registrados uma vez por workbook e referenciados pelo nome em cada célula). As
+larguras das colunas precisam ir no início da aba (antes da primeira linha): são
+fixas ou medidas numa passada prévia pelos valores, guardando só o máximo
+corrente de cada coluna, sem criar células. Alturas de linha são aplicadas só
+durante a escrita da linha.
+"""
+
+from typing import Callable, Iterable, List, Optional, Sequence
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.dimensions import RowDimension
+    EXCEL_AVAILABLE = True
+except ImportError:
+    EXCEL_AVAILABLE = False
+
+# Estilos nomeados compartilhados
+HEADER = "kb_header"
+CELL = "kb_cell"
+TITLE = "kb_title"
+BOLD = "kb_bold"
+FAQ_HEADER = "faq_header"
+FAQ_CELL = "faq_cell"
+FAQ_CELL_SHADED = "faq_cell_shaded"
+
+MAX_WIDTH = 80
+
+
+def _named_styles() -> List["NamedStyle"]:
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    wrap = Alignment(vertical="top", wrap_text=True)
+    return [
+        NamedStyle(
+            name=HEADER,
+            font=Font(bold=True, color="FFFFFF"),
+            fill=header_fill,
+            alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+            border=border,
+        ),
+        NamedStyle(name=CELL, alignment=wrap, border=border),
+        NamedStyle(name=TITLE, font=Font(bold=True, size=14)),
+        NamedStyle(name=BOLD, font=Font(bold=True)),
+        NamedStyle(
+            name=FAQ_HEADER,
+            font=Font(bold=True, color="FFFFFF", size=12),
+            fill=header_fill,
+            alignment=Alignment(horizontal="center", vertical="center"),
+        ),
+        NamedStyle(name=FAQ_CELL, alignment=wrap),
+        NamedStyle(
+            name=FAQ_CELL_SHADED,
+            alignment=wrap,
+            fill=PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid"),
+        ),
+    ]
+
+
+def create_workbook() -> "Workbook":
+    """Workbook write-only com os estilos nomeados registrados."""
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    return wb
+
+
+def measure_widths(headers: Sequence, rows: Iterable[Sequence], max_width: int = MAX_WIDTH) -> List[int]:
+    """
+    Larguras das colunas pelo maior valor de cada uma (limitado a `max_width`),
+    acompanhando só o máximo corrente enquanto percorre as linhas.
+    """
+    widths = [min(len(str(header)), max_width) for header in headers]
+    for row in rows:
+        for index, value in enumerate(row):
+            if value is None:
+                continue
+            length = len(value) if isinstance(value, str) else len(str(value))
+            if length > widths[index]:
+                widths[index] = min(length, max_width)
+    return [width + 2 for width in widths]
+
+
+class StreamSheet:
+    """
+    Aba write-only. As larguras são definidas na criação (vão antes da primeira
+    linha no arquivo); `append` escreve a linha na hora, sem guardá-la.
+    """
+
+    def __init__(self, wb: "Workbook", title: str, widths: Sequence[float]):
+        self.ws = wb.create_sheet(title)
+        self.row = 0
+        for index, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(index)].width = width
+
+    def append(
+        self,
+        values: Sequence,
+        style: Optional[str] = None,
+        styles: Optional[Sequence[Optional[str]]] = None,
+        height: Optional[float] = None,
+    ):
+        """
+        Escreve uma linha.
+
+        Args:
+            style: estilo nomeado de todas as células
+            styles: estilo nomeado por coluna (None = sem estilo); tem precedência sobre `style`
+            height: altura só desta linha
+        """
+        cells = []
+        for index, value in enumerate(values):
+            cell_style = styles[index] if styles is not None else style
+            if cell_style is None:
+                cells.append(value)
+                continue
+            cell = WriteOnlyCell(self.ws, value=value)
+            cell.style = cell_style
+            cells.append(cell)
+
+        self.row += 1
+        if height is not None:
+            # A dimensão só precisa existir enquanto a linha é escrita
+            self.ws.row_dimensions[self.row] = RowDimension(self.ws, index=self.row, ht=height)
+        self.ws.append(cells)
+        if height is not None:
+            del self.ws.row_dimensions[self.row]
+
+    def merge(self, cell_range: str):
+        """Mescla um intervalo (gravado no fim da aba, pode ser chamado a qualquer momento)."""
+        self.ws.merged_cells.add(cell_range)
+
+
+def write_table(
+    wb: "Workbook",
+    title: str,
+    headers: Sequence[str],
+    rows: Callable[[], Iterable[Sequence]],
+    header_style: str = HEADER,
+    cell_style: str = CELL,
+    widths: Optional[Sequence[float]] = None,
+) -> int:
+    """
+    Aba com cabeçalho e linhas, em streaming.
+
+    Args:
+        rows: função que devolve um iterável novo de linhas a cada chamada; sem
+              `widths`, é chamada duas vezes (medição das colunas e escrita)
+        widths: larguras fixas por coluna (dispensa a medição)
+
+    Returns:
+        int: Número de linhas escritas (sem o cabeçalho)
+    """
+    if widths is None:
+        widths = measure_widths(headers, rows())
+    sheet = StreamSheet(wb, title, widths)
+    sheet.append(headers, style=header_style)
+    count = 0
+    for row in rows():
+        sheet.append(row, style=cell_style)
+        count += 1
+    return count
@@ -3,9 +3,9 @@ Módulo para converter FAQ processado em planilha Excel.
 """
 import os
 import re
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
+from core.excel_stream import BOLD, FAQ_CELL, FAQ_CELL_SHADED, FAQ_HEADER, TITLE, StreamSheet, create_workbook
+
+FAQ_ROW_HEIGHT = 60
 
 def parse_faq_text(faq_text):
     """
@@ -97,6 +97,7 @@ def parse_faq_text(faq_text):
 def create_faq_excel(faq_text, output_path, source_name="Documento"):
     """
     Cria planilha Excel a partir do texto FAQ processado.
+    Escrita em streaming (core/excel_stream.py): as linhas não ficam em memória.
     
     Args:
         faq_text: Texto FAQ processado
@@ -109,89 +110,44 @@ def create_faq_excel(faq_text, output_path, source_name="Documento"):
     if not faq_items:
         raise ValueError("Nenhum item FAQ encontrado no texto. Verifique o formato.")
     
-    # Cria workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "FAQ"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=14)
-    wrap_alignment = Alignment(wrap_text=True, vertical="top")
+    # Cria workbook (write-only, estilos nomeados) e a aba com as larguras fixas:
+    # ID, Pergunta, Variações, Resposta, Framework, Palavras-chave, Categoria
+    wb = create_workbook()
+    ws = StreamSheet(wb, "FAQ", [8, 40, 40, 60, 60, 30, 20])
     
     # Título
-    ws['A1'] = f"FAQ Completo - {source_name}"
-    ws['A1'].font = title_font
-    ws.merge_cells('A1:G1')
+    ws.append([f"FAQ Completo - {source_name}"], style=TITLE)
+    ws.merge('A1:G1')
+    ws.append([])
     
     # Cabeçalhos
     headers = ['ID', 'Pergunta Principal (q)', 'Variações de Pergunta (sq)', 'Resposta (a)', 'Framework/Detalhes (f)', 'Palavras-chave (tags)', 'Categoria']
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col_num)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+    ws.append(headers, style=FAQ_HEADER)
     
     # Dados
     for idx, item in enumerate(faq_items, 1):
-        row = idx + 3
-        
-        # ID
-        ws.cell(row=row, column=1, value=idx)
-        
-        # Pergunta (q)
-        ws.cell(row=row, column=2, value=item.get('q', ''))
-        
-        # Variações (sq)
-        ws.cell(row=row, column=3, value=item.get('sq', ''))
-        
-        # Resposta (a)
-        ws.cell(row=row, column=4, value=item.get('a', ''))
-        
-        # Framework (f)
-        ws.cell(row=row, column=5, value=item.get('f', ''))
-        
-        # Palavras-chave (tags)
-        tags = item.get('tags', '')
-        ws.cell(row=row, column=6, value=tags)
-        
-        # Categoria (usa palavras-chave e conteúdo para determinar)
-        category = item.get('categoria', '')
-        if not category:
-            # Se não houver categoria explícita, extrai das palavras-chave
-            category = extract_category_from_keywords(
-                tags=tags,
-                f_text=item.get('f', ''),
-                q_text=item.get('q', ''),
-                a_text=item.get('a', '')
-            )
-        ws.cell(row=row, column=7, value=category)
-        
-        # Aplica formatação
-        for col in range(1, 8):
-            cell = ws.cell(row=row, column=col)
-            cell.alignment = wrap_alignment
-    
-    # Ajusta largura das colunas
-    ws.column_dimensions['A'].width = 8   # ID
-    ws.column_dimensions['B'].width = 40  # Pergunta
-    ws.column_dimensions['C'].width = 40  # Variações
-    ws.column_dimensions['D'].width = 60  # Resposta
-    ws.column_dimensions['E'].width = 60  # Framework
-    ws.column_dimensions['F'].width = 30  # Palavras-chave
-    ws.column_dimensions['G'].width = 20  # Categoria
-    
-    # Ajusta altura das linhas
-    for row in range(4, len(faq_items) + 4):
-        ws.row_dimensions[row].height = 60
+        ws.append(_faq_row(idx, item), style=FAQ_CELL, height=FAQ_ROW_HEIGHT)
     
     # Salva arquivo
     wb.save(output_path)
     return len(faq_items)
 
 
+def _faq_row(idx, item):
+    """ID, q, sq, a, f, tags e categoria (explícita ou deduzida das palavras-chave e do conteúdo)."""
+    tags = item.get('tags', '')
+    category = item.get('categoria', '')
+    if not category:
+        # Se não houver categoria explícita, extrai das palavras-chave
+        category = extract_category_from_keywords(
+            tags=tags,
+            f_text=item.get('f', ''),
+            q_text=item.get('q', ''),
+            a_text=item.get('a', '')
+        )
+    return [idx, item.get('q', ''), item.get('sq', ''), item.get('a', ''), item.get('f', ''), tags, category]
+
+
 def extract_category_from_keywords(tags, f_text="", q_text="", a_text=""):
     """
     Extrai categoria baseada em palavras-chave (tags) e conteúdo.
@@ -342,101 +298,34 @@ def create_consolidated_faq_excel(faq_texts_list, source_names_list, output_path
     if not all_faq_items:
         raise ValueError("Nenhum item FAQ encontrado nos textos fornecidos.")
     
-    # Cria workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "FAQ Consolidado"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=14)
-    wrap_alignment = Alignment(wrap_text=True, vertical="top")
-    source_fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
+    # Cria workbook (write-only, estilos nomeados) e a aba com as larguras fixas:
+    # ID, Fonte, Pergunta, Variações, Resposta, Framework, Palavras-chave, Categoria
+    wb = create_workbook()
+    ws = StreamSheet(wb, "FAQ Consolidado", [8, 25, 40, 40, 60, 60, 30, 20])
     
     # Título
     total_sources = len(set(source_names_list))
-    ws['A1'] = f"FAQ Consolidado - {total_sources} Fonte(s)"
-    ws['A1'].font = title_font
-    ws.merge_cells('A1:H1')
+    ws.append([f"FAQ Consolidado - {total_sources} Fonte(s)"], style=TITLE)
+    ws.merge('A1:H1')
     
     # Informações das fontes
-    ws['A2'] = "Fontes processadas:"
-    ws['A2'].font = Font(bold=True)
     sources_text = " | ".join(set(source_names_list))
-    ws.merge_cells('B2:H2')
-    ws['B2'] = sources_text
-    ws['B2'].alignment = wrap_alignment
+    ws.append(["Fontes processadas:", sources_text], styles=[BOLD, FAQ_CELL])
+    ws.merge('B2:H2')
+    ws.append([])
     
     # Cabeçalhos
     headers = ['ID', 'Fonte', 'Pergunta Principal (q)', 'Variações de Pergunta (sq)', 'Resposta (a)', 'Framework/Detalhes (f)', 'Palavras-chave (tags)', 'Categoria']
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col_num)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+    ws.append(headers, style=FAQ_HEADER)
     
-    # Dados
+    # Dados (fonte com cor de fundo alternada)
+    plain = [FAQ_CELL] * len(headers)
+    shaded = [FAQ_CELL, FAQ_CELL_SHADED] + [FAQ_CELL] * (len(headers) - 2)
     for idx, item in enumerate(all_faq_items, 1):
-        row = idx + 4
-        
-        # ID
-        ws.cell(row=row, column=1, value=idx)
-        
-        # Fonte (com cor de fundo alternada)
-        source_cell = ws.cell(row=row, column=2, value=item.get('source', 'Desconhecida'))
-        if idx % 2 == 0:
-            source_cell.fill = source_fill
-        
-        # Pergunta (q)
-        ws.cell(row=row, column=3, value=item.get('q', ''))
-        
-        # Variações (sq)
-        ws.cell(row=row, column=4, value=item.get('sq', ''))
-        
-        # Resposta (a)
-        ws.cell(row=row, column=5, value=item.get('a', ''))
-        
-        # Framework (f)
-        ws.cell(row=row, column=6, value=item.get('f', ''))
-        
-        # Palavras-chave (tags)
-        tags = item.get('tags', '')
-        ws.cell(row=row, column=7, value=tags)
-        
-        # Categoria (usa palavras-chave e conteúdo para determinar)
-        category = item.get('categoria', '')
-        if not category:
-            # Se não houver categoria explícita, extrai das palavras-chave
-            category = extract_category_from_keywords(
-                tags=tags,
-                f_text=item.get('f', ''),
-                q_text=item.get('q', ''),
-                a_text=item.get('a', '')
-            )
-        ws.cell(row=row, column=8, value=category)
-        
-        # Aplica formatação
-        for col in range(1, 9):
-            cell = ws.cell(row=row, column=col)
-            cell.alignment = wrap_alignment
-    
-    # Ajusta largura das colunas
-    ws.column_dimensions['A'].width = 8   # ID
-    ws.column_dimensions['B'].width = 25  # Fonte
-    ws.column_dimensions['C'].width = 40  # Pergunta
-    ws.column_dimensions['D'].width = 40  # Variações
-    ws.column_dimensions['E'].width = 60  # Resposta
-    ws.column_dimensions['F'].width = 60  # Framework
-    ws.column_dimensions['G'].width = 30  # Palavras-chave
-    ws.column_dimensions['H'].width = 20  # Categoria
-    
-    # Ajusta altura das linhas
-    for row in range(5, len(all_faq_items) + 5):
-        ws.row_dimensions[row].height = 60
+        row = _faq_row(idx, item)
+        row.insert(1, item.get('source', 'Desconhecida'))
+        ws.append(row, styles=shaded if idx % 2 == 0 else plain, height=FAQ_ROW_HEIGHT)
     
     # Salva arquivo
     wb.save(output_path)
     return len(all_faq_items)
-
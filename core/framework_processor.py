@@ -7,143 +7,111 @@ import os
 import time
 import json
 from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
-import google.generativeai as genai
 from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
 
-load_dotenv()
-
-# Configura Gemini
-genai.configure(api_key=os.environ["API_KEY"])
-
-# Cache do modelo válido para evitar múltiplas tentativas
-_valid_model_cache = None
+from core.llm_backend import estimate_tokens
+from core.concurrency import QuotaRetry
+from core.model_router import route_model
+from core.caption_cleanup import read_transcription
+from core.stage_scheduler import Stage, StageResult, StageScheduler
+from core.checkpoint import StageCheckpoint
+from core.streaming import stream_generate
+from core.prompt_registry import get_prompt_registry
+from core.map_reduce import MapReducer, use_map_reduce, with_chunk_note, build_reduce_prompt
+from core.retrieval import TranscriptRetriever, retrieval_enabled, with_excerpt_note
+from core.structured import single_call_enabled, build_single_call_prompt, generate_sections
+from core.usage import models_scope, stage_scope
 
-def get_available_models():
-    """
-    Lista modelos disponíveis que suportam generateContent.
-    """
-    try:
-        models = list(genai.list_models())
-        available = [
-            m.name.replace('models/', '') 
-            for m in models 
-            if 'generateContent' in m.supported_generation_methods
-        ]
-        return available
-    except Exception as e:
-        print(f"⚠️  Erro ao listar modelos: {e}")
-        return []
-
-def find_valid_model(preferred_name=None):
-    """
-    Encontra um modelo válido, tentando o preferido primeiro.
-    """
-    global _valid_model_cache
-    
-    # Se já temos um modelo válido em cache, usa ele
-    if _valid_model_cache:
-        return _valid_model_cache
-    
-    # Lista modelos disponíveis
-    available = get_available_models()
-    
-    if not available:
-        # Fallback para modelos comuns se não conseguir listar
-        fallback_models = [
-            "gemini-2.5-flash",
-            "gemini-2.5-flash-lite",
-            "gemini-2.5-pro",
-            "gemini-3-pro",
-        ]
-        
-        for model_name in fallback_models:
-            try:
-                model = genai.GenerativeModel(model_name)
-                _valid_model_cache = model_name
-                print(f"✅ Modelo válido encontrado (fallback): {model_name}")
-                return model_name
-            except:
-                continue
-        
-        raise ValueError("Nenhum modelo Gemini disponível encontrado!")
-    
-    # Se tem modelo preferido, tenta usar diretamente (confia na config do usuário)
-    if preferred_name:
-        preferred_clean = preferred_name.replace('models/', '').strip()
-        # Se está na lista de disponíveis OU é um dos modelos novos solicitados
-        valid_models = [
-            "gemini-2.5-flash", 
-            "gemini-2.5-flash-lite", 
-            "gemini-2.5-pro", 
-            "gemini-3-pro"
-        ]
-        
-        if preferred_clean in available or preferred_clean in valid_models:
-            _valid_model_cache = preferred_clean
-            print(f"✅ Usando modelo preferido: {preferred_clean}")
-            return preferred_clean
-        
-        # Se não achou na lista mas o usuário forçou, tenta mesmo assim
-        print(f"⚠️  Modelo '{preferred_clean}' não listado na API, mas será tentado.")
-        return preferred_clean
-    
-    # Procura por modelos flash primeiro
-    flash_models = [m for m in available if 'flash' in m.lower()]
-    if flash_models:
-        model_name = flash_models[0]
-        _valid_model_cache = model_name
-        print(f"✅ Usando modelo Flash disponível: {model_name}")
-        return model_name
-    
-    # Se não tem flash, usa o primeiro disponível
-    model_name = available[0]
-    _valid_model_cache = model_name
-    print(f"✅ Usando primeiro modelo disponível: {model_name}")
-    return model_name
-
-def get_model():
-    """
-    Obtém o modelo Gemini configurado.
-    """
-    # Removido: load_dotenv(override=True) para evitar sobrescrever a escolha do usuário
-    # que foi salva no .env (se disponível) ou está em memória
-    
-    # Obtém modelo preferido do .env
-    preferred_model = os.environ.get("LLM_MODEL", "").replace("models/", "").strip()
-    
-    # Nota: gemini-2.5-flash e outros modelos são válidos, não precisa de verificação especial
-
-    # Encontra modelo válido
-    try:
-        model_name = find_valid_model(preferred_model)
-        print(f"🤖 Usando modelo: {model_name}")
-        return genai.GenerativeModel(model_name)
-    except Exception as e:
-        print(f"❌ Erro ao encontrar modelo válido: {e}")
-        # Última tentativa com modelo 2.5 flash
-        print("🔄 Tentando modelo padrão (gemini-2.5-flash)...")
-        return genai.GenerativeModel("gemini-2.5-flash")
+load_dotenv()
 
 
 class FrameworkProcessor:
     """
     Processa transcrições grandes extraindo frameworks em múltiplas etapas.
+
+    As dimensões são independentes entre si e rodam em paralelo (respeitando o rate
+    limiter global); a síntese roda quando todas terminam. Cada dimensão concluída
+    vai para um checkpoint, então uma nova execução com a mesma entrada retoma de
+    onde parou. Subclasses (N8N, PRD) reutilizam o mesmo motor trocando
+    DIMENSIONS, CHECKPOINT_KIND, prompts e mensagens.
     """
 
+    # Dimensões extraídas por este processador: (número, nome)
+    DIMENSIONS = [
+        (1, "FRAMEWORK COMPLETO DE IMPLEMENTAÇÃO"),
+        (2, "INSIGHTS REVOLUCIONÁRIOS"),
+        (3, "ASPECTOS CONTRA-INTUITIVOS"),
+        (4, "HISTÓRIAS E CASOS TRANSFORMADORES"),
+        (5, "NÚMEROS E FÓRMULAS EXATAS"),
+        (6, "APLICAÇÕES IMEDIATAS PÓS-LEITURA"),
+        (7, "CITAÇÕES ESTRATÉGICAS E MANTRAS")
+    ]
+
+    # Palavras-chave (pt/en) do perfil de consulta de cada dimensão no modo de
+    # recuperação (RETRIEVAL_MODE); dimensões sem perfil recebem a transcrição inteira
+    RETRIEVAL_KEYWORDS = {
+        1: "passo etapa fase processo método metodologia sistema framework modelo estrutura implementar "
+           "step phase process method methodology system framework model implement",
+        2: "insight descoberta percebi aprendi segredo verdade principal chave revelação "
+           "realized learned secret truth lesson key discovery",
+        3: "contrário contraintuitivo mito erro errado ninguém acredita surpreendente oposto verdade "
+           "myth mistake wrong counterintuitive surprising opposite actually believe",
+        4: "história caso cliente aluno exemplo aconteceu resultado antes depois "
+           "story case client customer student example happened result before after",
+        5: "__num__ __num__ __num__ número percentual porcento reais dólares fórmula métrica taxa dias meses vezes "
+           "number percent dollars formula metric rate ratio days months times",
+        6: "hoje agora comece começar faça ação aplicar prática exercício tarefa primeiro "
+           "today now start action apply practice exercise task first",
+        7: "frase sempre digo lembre regra princípio mantra nunca "
+           "quote always say remember rule principle mantra never",
+    }
+
+    START_MESSAGE = "🚀 INICIANDO EXTRAÇÃO DE FRAMEWORK COMPLETO"
+    SUCCESS_MESSAGE = "✅ FRAMEWORK COMPLETO EXTRAÍDO COM SUCESSO!"
+    FAILURE_MESSAGE = None
+    CHECKPOINT_KIND = "framework"
+    PROMPT_TEMPLATE = "prompt_framework.txt"
+
+    # Modo de chamada única (SINGLE_CALL_MODE) para entradas curtas: dimensões e
+    # síntese numa resposta JSON. N8N e PRD usam sempre as etapas separadas.
+    SINGLE_CALL = True
+    SYNTHESIS_DESCRIPTION = (
+        "SÍNTESE FINAL integradora das 7 dimensões: SUMÁRIO EXECUTIVO TRANSFORMADOR (3 parágrafos densos), "
+        "SÍNTESE FINAL MEMORÁVEL, GUIA DE INÍCIO IMEDIATO, conexões entre dimensões, "
+        "os 3 insights mais transformadores e plano de ação de 30-60-90 dias"
+    )
+
     def __init__(self, transcription_text, output_language="pt"):
         self.transcription = transcription_text
         self.output_language = output_language
         self.dimensions = {}
         self.synthesis = None
+        self.stage_timings = {}
+        # Etapa → modelos que responderam (ver core/usage.py)
+        self.stage_models = {}
+        self.prompt_version = get_prompt_registry().version(self.PROMPT_TEMPLATE)
+        self.checkpoint = StageCheckpoint(
+            self.CHECKPOINT_KIND, transcription_text, output_language, version=self.prompt_version
+        )
+        # Entradas acima do limiar de tokens são processadas em modo map-reduce
+        self.map_reducer = (
+            MapReducer(transcription_text, mode=self.CHECKPOINT_KIND) if use_map_reduce(transcription_text) else None
+        )
+        # Modo de recuperação: cada dimensão com perfil recebe só os trechos relevantes
+        self.retriever = TranscriptRetriever(transcription_text) if retrieval_enabled(transcription_text) else None
+        # Entradas curtas: tudo numa chamada só (as seções inválidas voltam para as etapas)
+        self.single_call = (
+            self.SINGLE_CALL and self.map_reducer is None and single_call_enabled(transcription_text)
+        )
+        self.single_call_sections = None
 
     def load_framework_prompt(self):
-        """Carrega o prompt completo de framework."""
-        prompt_path = os.path.join('config', 'prompts', 'prompt_framework.txt')
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        """Carrega o prompt completo de framework (via registro de prompts)."""
+        return get_prompt_registry().text(self.PROMPT_TEMPLATE)
 
-    def create_dimension_prompt(self, dimension_number, dimension_name):
+    def create_dimension_prompt(self, dimension_number, dimension_name, content=None):
         """
         Cria um prompt focado em uma dimensão específica.
 
@@ -151,25 +119,14 @@ class FrameworkProcessor:
             dimension_number: Número da dimensão (1-7)
             dimension_name: Nome descritivo da dimensão
         """
-        base_prompt = self.load_framework_prompt()
+        # Em modo map-reduce o conteúdo é um trecho da transcrição
+        content = self.transcription if content is None else content
 
-        # Extrai apenas a seção relevante do prompt
-        dimension_marker = f"# **DIMENSÃO {dimension_number}:"
-        next_dimension_marker = f"# **DIMENSÃO {dimension_number + 1}:"
-
-        # Encontra início e fim da dimensão
-        start = base_prompt.find(dimension_marker)
-        if dimension_number < 7:
-            end = base_prompt.find(next_dimension_marker)
-        else:
-            # Última dimensão vai até RECURSOS COMPLEMENTARES
-            end = base_prompt.find("# **RECURSOS COMPLEMENTARES**")
-
-        if start == -1:
+        # Seção da dimensão já indexada pelo registro de prompts
+        dimension_content = get_prompt_registry().section(self.PROMPT_TEMPLATE, dimension_number)
+        if dimension_content is None:
             raise ValueError(f"Dimensão {dimension_number} não encontrada no prompt")
 
-        dimension_content = base_prompt[start:end if end != -1 else None]
-
         # Cria prompt focado
         focused_prompt = f"""
 Você é um especialista em extrair frameworks de implementação de conteúdos educacionais.
@@ -194,7 +151,7 @@ Você é um especialista em extrair frameworks de implementação de conteúdos
 
 **TRANSCRIÇÃO COMPLETA PARA ANÁLISE**:
 
-{self.transcription}
+{content}
 
 ---
 
@@ -208,17 +165,12 @@ Você é um especialista em extrair frameworks de implementação de conteúdos
         """
         print(f"\n🔍 Processando Dimensão {dimension_number}: {dimension_name}")
 
-        prompt = self.create_dimension_prompt(dimension_number, dimension_name)
-
         max_retries = 5  # Aumentado para 5 tentativas
-        for attempt in range(max_retries):
+        quota = QuotaRetry()
+        attempt = 0
+        while True:
             try:
-                # Cria modelo dinamicamente para garantir valor correto
-                current_model = get_model()
-                chat = current_model.start_chat(history=[])
-                response = chat.send_message(prompt)
-
-                result = response.text.strip()
+                result = self.extract_dimension(dimension_number, dimension_name)
                 self.dimensions[dimension_number] = {
                     "name": dimension_name,
                     "content": result,
@@ -229,17 +181,16 @@ Você é um especialista em extrair frameworks de implementação de conteúdos
                 return result
 
             except ResourceExhausted:
-                # Tratamento específico para erro 429 (Cota)
-                wait_time = 65  # Espera 65 segundos (o limite renova a cada minuto)
-                print(f"⏳ Cota excedida (429). Aguardando {wait_time}s para renovar tokens... (Tentativa {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                if attempt == max_retries - 1:
+                # Erro 429 (Cota): o controlador de concorrência reduz a janela e aplica
+                # o recuo; a próxima tentativa espera por ele dentro do backend. Só desiste
+                # depois das tentativas e de um período de cota inteiro
+                if quota.exhausted() and attempt >= max_retries - 1:
                     raise
+                print(f"⏳ Cota excedida (429). Nova tentativa após o recuo... (Tentativa {attempt + 1})")
 
             except DeadlineExceeded:
                 if attempt < max_retries - 1:
                     print(f"⏳ Timeout - tentativa {attempt + 1}/{max_retries}")
-                    time.sleep(5)
                 else:
                     raise
             except RuntimeError as e:
@@ -257,6 +208,102 @@ Você é um especialista em extrair frameworks de implementação de conteúdos
                     time.sleep(10)
                 else:
                     raise
+            attempt += 1
+
+    def route(self, stage, prompt):
+        """Modelo da etapa pelo roteador (None = LLM_MODEL, se o roteamento estiver desligado)."""
+        return route_model(self.CHECKPOINT_KIND, stage, estimate_tokens(prompt))
+
+    def generate_stage(self, stage_id, prompt, route_stage):
+        """Gera a etapa em streaming, com o parcial ao lado do checkpoint."""
+        return stream_generate(
+            prompt, self.checkpoint.partial_path(stage_id), stage_id, model=self.route(route_stage, prompt)
+        ).strip()
+
+    def extract_dimension(self, dimension_number, dimension_name):
+        """
+        Extrai uma dimensão: uma chamada com a transcrição inteira ou, para
+        entradas grandes, map-reduce sobre os chunks (com cache intermediário,
+        então uma retentativa só refaz as chamadas que faltaram). No modo de
+        recuperação, uma chamada só com os trechos relevantes para a dimensão.
+        """
+        keywords = self.RETRIEVAL_KEYWORDS.get(dimension_number)
+        if self.retriever is not None and keywords:
+            section = get_prompt_registry().section(self.PROMPT_TEMPLATE, dimension_number) or ""
+            # Nome e palavras-chave repetidos pesam mais que o texto da seção
+            query = " ".join([dimension_name, dimension_name, keywords, keywords, section])
+            excerpts = self.retriever.context_for(query, label=f"Dimensão {dimension_number}")
+            prompt = with_excerpt_note(self.create_dimension_prompt(dimension_number, dimension_name, content=excerpts))
+            return self.generate_stage(f"dimension_{dimension_number}", prompt, "dimension")
+
+        if self.map_reducer is None:
+            prompt = self.create_dimension_prompt(dimension_number, dimension_name)
+            return self.generate_stage(f"dimension_{dimension_number}", prompt, "dimension")
+
+        section = get_prompt_registry().section(self.PROMPT_TEMPLATE, dimension_number)
+        title = f"DIMENSÃO {dimension_number}: {dimension_name}"
+        return self.map_reducer.run(
+            lambda chunk, index, total: with_chunk_note(
+                self.create_dimension_prompt(dimension_number, dimension_name, content=chunk), index, total
+            ),
+            lambda partials, level: build_reduce_prompt(title, section, partials, self.output_language),
+            label=f"Dimensão {dimension_number}"
+        )
+
+    def create_single_call_prompt(self, sections):
+        """Prompt da chamada única: prompt completo do framework + seções JSON esperadas."""
+        instructions = f"""{self.load_framework_prompt()}
+
+**IDIOMA DE SAÍDA**: {"Português Brasileiro" if self.output_language == "pt" else "English"}
+
+**REGRAS**: Use exemplos EXATOS da transcrição (com números, nomes, casos). NÃO invente informações; se algo não estiver mencionado, escreva "Não mencionado na transcrição"."""
+        return build_single_call_prompt(instructions, sections, self.transcription)
+
+    def run_single_call(self):
+        """
+        Extrai as dimensões que faltam e a síntese numa única chamada com resposta
+        JSON. As dimensões válidas vão para o checkpoint como se tivessem rodado
+        nas etapas; as inválidas (e a síntese, se inválida) ficam para o DAG normal.
+        """
+        sections = {
+            f"dimension_{num}": f"DIMENSÃO {num}: {name}"
+            for num, name in self.DIMENSIONS
+            if self.checkpoint.get(f"dimension_{num}") is None
+        }
+        if not sections:
+            return
+        sections["synthesis"] = self.SYNTHESIS_DESCRIPTION
+
+        prompt = self.create_single_call_prompt(sections)
+        print(f"\n⚡ Chamada única: {len(sections)} seções em uma requisição (~{estimate_tokens(prompt)} tokens)")
+        timing = StageResult("single_call", started_at=datetime.now().isoformat())
+        start = time.monotonic()
+        try:
+            with stage_scope("single_call"):
+                results = generate_sections(prompt, sections, model=self.route("single", prompt))
+            timing.status = "done"
+        except RuntimeError:
+            raise
+        except Exception as e:
+            print(f"⚠️  Chamada única falhou ({e}); seguindo com as etapas separadas")
+            results = {}
+            timing.status, timing.error = "failed", e
+        timing.duration = time.monotonic() - start
+        self.stage_timings["single_call"] = self.stage_timing(timing)
+
+        for num, name in self.DIMENSIONS:
+            content = results.get(f"dimension_{num}")
+            if content is None:
+                continue
+            self.dimensions[num] = {
+                "name": name,
+                "content": content,
+                "timestamp": datetime.now().isoformat()
+            }
+            self.checkpoint.save_stage(f"dimension_{num}", self.dimensions[num])
+        self.synthesis = results.get("synthesis")
+        self.single_call_sections = sorted(results)
+        print(f"✅ Chamada única: {len(results)}/{len(sections)} seções válidas")
 
     def synthesize_framework(self):
         """
@@ -299,19 +346,13 @@ Você é um especialista em sintetizar frameworks de implementação.
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                # Cria modelo dinamicamente para garantir valor correto
-                current_model = get_model()
-                chat = current_model.start_chat(history=[])
-                response = chat.send_message(synthesis_prompt)
-
-                self.synthesis = response.text.strip()
+                self.synthesis = self.generate_stage("synthesis", synthesis_prompt, "synthesis")
                 print(f"✅ Síntese concluída ({len(self.synthesis)} caracteres)")
                 return self.synthesis
 
             except DeadlineExceeded:
                 if attempt < max_retries - 1:
                     print(f"⏳ Timeout - tentativa {attempt + 1}/{max_retries}")
-                    time.sleep(5)
                 else:
                     raise
 
@@ -352,7 +393,7 @@ Você é um especialista em sintetizar frameworks de implementação.
 - **Total de dimensões processadas**: {len(self.dimensions)}
 - **Timestamp da síntese**: {self.synthesis and datetime.now().isoformat()}
 - **Tamanho total do framework**: ~{len(final_document)} caracteres
-- **Processado com**: {os.environ.get("LLM_MODEL", "gemini-2.5-flash")}
+- **Processado com**: {self.models_used()}
 
 ---
 
@@ -371,8 +412,13 @@ Você é um especialista em sintetizar frameworks de implementação.
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "language": self.output_language,
-                "model": os.environ.get("LLM_MODEL", "gemini-2.5-flash"),
-                "transcription_size": len(self.transcription)
+                "model": self.models_used(),
+                "transcription_size": len(self.transcription),
+                "prompt_version": self.prompt_version,
+                "map_reduce_chunks": len(self.map_reducer.chunks) if self.map_reducer else None,
+                "retrieval_passages": len(self.retriever.index.passages) if self.retriever else None,
+                "single_call_sections": self.single_call_sections,
+                "stage_timings": self.stage_timings
             },
             "synthesis": self.synthesis,
             "dimensions": self.dimensions
@@ -383,58 +429,120 @@ Você é um especialista em sintetizar frameworks de implementação.
 
         print(f"💾 Metadados salvos em: {json_path}")
 
+    def run_synthesis_stage(self):
+        """
+        Etapa de síntese: erros não críticos não impedem salvar as dimensões.
+        """
+        try:
+            return self.synthesize_framework()
+        except RuntimeError:
+            raise
+        except Exception as e:
+            print(f"❌ Erro na síntese: {e}")
+            print("⚠️  Continuando sem síntese...")
+            self.synthesis = "Síntese não gerada devido a erro."
+            return self.synthesis
+
+    def build_stages(self):
+        """
+        Monta o DAG: todas as dimensões em paralelo e a síntese depois delas.
+        Dimensões já presentes no checkpoint são restauradas e não rodam de novo.
+        """
+        stages = []
+        for num, name in self.DIMENSIONS:
+            saved = self.checkpoint.get(f"dimension_{num}")
+            if saved is not None:
+                self.dimensions[num] = saved
+                print(f"♻️  Dimensão {num} restaurada do checkpoint")
+                continue
+            stages.append(Stage(f"dimension_{num}", partial(self.process_dimension, num, name)))
+        # Síntese já obtida na chamada única não é refeita
+        if self.synthesis is None:
+            stages.append(Stage(
+                "synthesis",
+                self.run_synthesis_stage,
+                depends_on=tuple(stage.stage_id for stage in stages)
+            ))
+        return stages
+
+    def on_stage_done(self, result):
+        """Registra o tempo de cada etapa e grava no checkpoint as dimensões concluídas."""
+        self.stage_timings[result.stage_id] = self.stage_timing(result)
+        if result.status == "failed" and not isinstance(result.error, RuntimeError):
+            print(f"❌ Erro ao processar {result.stage_id}: {result.error}")
+        if result.status == "done" and result.stage_id.startswith("dimension_"):
+            num = int(result.stage_id.split("_", 1)[1])
+            self.checkpoint.save_stage(result.stage_id, self.dimensions[num])
+
+    def run_stages(self):
+        """
+        Executa todas as etapas pelo StageScheduler.
+        Relança RuntimeError (erro crítico de API) após cancelar o que não começou.
+        """
+        scheduler = StageScheduler(on_stage_done=self.on_stage_done)
+        start = time.monotonic()
+        results = scheduler.run(self.build_stages())
+
+        print(f"\n⏱️  Tempo total das etapas: {time.monotonic() - start:.1f}s")
+        for stage_id, result in results.items():
+            print(f"   • {stage_id}: {result.duration:.1f}s ({result.status})")
+        return results
+
+    def stage_timing(self, result):
+        """Tempo da etapa e os modelos que responderam as suas chamadas."""
+        return {**result.timing(), "models": sorted(self.stage_models.get(result.stage_id, ()))}
+
+    def models_used(self):
+        """Modelos que de fato responderam (o LLM_MODEL pode ser "auto" com o roteador)."""
+        models = sorted({model for stage_models in self.stage_models.values() for model in stage_models})
+        return ", ".join(models) or "não registrado (etapas restauradas do checkpoint)"
+
     def process_complete_framework(self, output_path):
         """
         Executa o processamento completo do framework em todas as etapas.
+
+        Returns:
+            str: Caminho do framework salvo, ou None se o processamento foi abortado
+            ou alguma etapa falhou
         """
         print("=" * 80)
-        print("🚀 INICIANDO EXTRAÇÃO DE FRAMEWORK COMPLETO")
+        print(self.START_MESSAGE)
         print("=" * 80)
 
-        # Define as 7 dimensões
-        dimensions_to_process = [
-            (1, "FRAMEWORK COMPLETO DE IMPLEMENTAÇÃO"),
-            (2, "INSIGHTS REVOLUCIONÁRIOS"),
-            (3, "ASPECTOS CONTRA-INTUITIVOS"),
-            (4, "HISTÓRIAS E CASOS TRANSFORMADORES"),
-            (5, "NÚMEROS E FÓRMULAS EXATAS"),
-            (6, "APLICAÇÕES IMEDIATAS PÓS-LEITURA"),
-            (7, "CITAÇÕES ESTRATÉGICAS E MANTRAS")
-        ]
-
-        # Processa cada dimensão
-        for dim_num, dim_name in dimensions_to_process:
-            try:
-                self.process_dimension(dim_num, dim_name)
-                # Rate limiting - espera entre dimensões
-                if dim_num < 7:
-                    print("⏳ Aguardando 20s antes da próxima dimensão...")
-                    time.sleep(20)
-            except RuntimeError as e:
-                # Erro crítico (API Key, etc) - Aborta tudo
-                print(f"🛑 Processamento ABORTADO na dimensão {dim_num}: {e}")
-                print("⚠️  Verifique sua API KEY no arquivo .env")
-                return
-            except Exception as e:
-                print(f"❌ Erro ao processar dimensão {dim_num}: {e}")
-                # Continua com as outras dimensões
-                continue
-
-        # Sintetiza tudo
         try:
-            self.synthesize_framework()
-        except Exception as e:
-            print(f"❌ Erro na síntese: {e}")
-            print("⚠️  Continuando sem síntese...")
-            self.synthesis = "Síntese não gerada devido a erro."
+            with models_scope(self.stage_models):
+                if self.single_call:
+                    self.run_single_call()
+                results = self.run_stages()
+        except RuntimeError as e:
+            # Erro crítico (API Key, etc) - Aborta tudo
+            print(f"🛑 Processamento ABORTADO: {e}")
+            print("⚠️  Verifique sua API KEY no arquivo .env")
+            if self.FAILURE_MESSAGE:
+                print(self.FAILURE_MESSAGE)
+            print(f"💾 Dimensões concluídas preservadas em: {self.checkpoint.path}")
+            return None
+
+        # Etapa com falha: nada é salvo (um arquivo incompleto bloquearia a próxima
+        # execução pelo "já existe") e o checkpoint fica para refazer só o que falhou
+        failed = [stage_id for stage_id, result in results.items() if result.status == "failed"]
+        if failed:
+            print(f"❌ Etapas com falha: {', '.join(failed)}")
+            if self.FAILURE_MESSAGE:
+                print(self.FAILURE_MESSAGE)
+            print(f"💾 Dimensões concluídas preservadas em: {self.checkpoint.path}")
+            return None
 
         # Salva resultado final
         self.save_complete_framework(output_path)
+        self.checkpoint.clear()
 
         print("\n" + "=" * 80)
-        print("✅ FRAMEWORK COMPLETO EXTRAÍDO COM SUCESSO!")
+        print(self.SUCCESS_MESSAGE)
         print("=" * 80)
 
+        return output_path
+
 
 def process_transcription_framework(input_file, output_language="pt"):
     """
@@ -443,10 +551,12 @@ def process_transcription_framework(input_file, output_language="pt"):
     Args:
         input_file: Caminho do arquivo de transcrição
         output_language: Idioma de saída ('pt' ou 'en')
+
+    Returns:
+        str: Caminho do arquivo de saída, ou None se o framework não foi gerado
     """
-    # Lê transcrição
-    with open(input_file, 'r', encoding='utf-8') as f:
-        transcription = f.read()
+    # Lê transcrição (legendas passam pela limpeza, com cache)
+    transcription = read_transcription(input_file)
 
     # Cria nome de saída
     output_dir = os.path.join('data', 'processed')
@@ -462,6 +572,4 @@ def process_transcription_framework(input_file, output_language="pt"):
 
     # Processa
     processor = FrameworkProcessor(transcription, output_language)
-    processor.process_complete_framework(output_path)
-
-    return output_path
+    return processor.process_complete_framework(output_path)
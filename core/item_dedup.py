@@ -0,0 +1,249 @@
+"""
+Deduplicação de Q&As e fatos entre fontes (consolidação do Agent Builder).
+
+Os extratores só removem repetições exatas dentro de um bloco; numa base com
+centenas de vídeos do mesmo autor, a planilha e o JSON consolidados se enchem de
+paráfrases da mesma pergunta ou do mesmo fato. Aqui, depois de juntar todas as
+fontes:
+
+1. o texto de cada item é normalizado (minúsculas, sem acentos, só palavras) e
+   itens com o mesmo texto normalizado caem no mesmo grupo (hash exato);
+2. os textos distintos recebem uma assinatura MinHash (trigramas de palavras) e
+   são agrupados por LSH; pares candidatos com Jaccard estimado >= limiar e os
+   mesmos números no texto ("conversão de 2%" ≠ "conversão de 5%") são unidos
+   (union-find);
+3. cada grupo vira um item só: o representante é o mais completo (resposta ou
+   afirmação mais longa), com as fontes de todos em `sources` e, para Q&A, as
+   outras formulações da pergunta em `variations`.
+
+Diferente de core/near_dedup.py (chunks e transcrições, índice persistido), os
+itens são curtos e numerosos: as assinaturas usam trigramas e a família de hash
+(a*x + b) mod (2^31 - 1), que cabe em 64 bits e é vetorizada com NumPy quando
+disponível (sem NumPy, o mesmo cálculo em Python puro).
+
+Configuração via .env:
+    ITEM_DEDUP_ENABLED=true
+    ITEM_DEDUP_THRESHOLD=0.7    Similaridade mínima (Jaccard estimado) para unir dois itens
+"""
+
+import os
+import re
+import zlib
+import random
+import unicodedata
+from typing import Callable, Dict, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 31) - 1
+_EMPTY = _PRIME
+
+# Permutações fixas (semente constante): o resultado não muda entre execuções
+_rng = random.Random(4242)
+_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+if NUMPY_AVAILABLE:
+    _A_NP = np.array(_A, dtype=np.uint64)[:, None]
+    _B_NP = np.array(_B, dtype=np.uint64)[:, None]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Tipo de item → texto comparado e "qualidade" (maior = representante)
+ITEM_TEXT: Dict[str, Callable[[Dict], str]] = {
+    "qa_items": lambda item: f"{item.get('question', '')} {item.get('answer', '')}",
+    "facts": lambda item: item.get('statement', ''),
+}
+ITEM_QUALITY: Dict[str, Callable[[Dict], int]] = {
+    "qa_items": lambda item: len(item.get('answer', '')),
+    "facts": lambda item: len(item.get('statement', '')),
+}
+
+MAX_VARIATIONS = 10
+
+
+def item_dedup_enabled() -> bool:
+    return os.environ.get("ITEM_DEDUP_ENABLED", "true").strip().lower() in ("1", "true", "yes", "sim")
+
+
+def item_dedup_threshold() -> float:
+    return float(os.environ.get("ITEM_DEDUP_THRESHOLD", "0.7"))
+
+
+class _AccentTable(dict):
+    """Tabela de str.translate preenchida sob demanda: caractere → caractere sem acento."""
+
+    def __missing__(self, code: int) -> str:
+        decomposed = unicodedata.normalize("NFD", chr(code))
+        stripped = "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+        self[code] = stripped
+        return stripped
+
+
+_ACCENTS = _AccentTable()
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e só palavras (pontuação e espaços extras somem)."""
+    lowered = text.lower()
+    if not lowered.isascii():
+        lowered = lowered.translate(_ACCENTS)
+    return " ".join(_WORD_RE.findall(lowered))
+
+
+def _shingles(normalized: str) -> List[int]:
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        return [zlib.crc32(normalized.encode('utf-8'))] if words else []
+    return list({
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    })
+
+
+def signature(normalized: str) -> List[int]:
+    """Assinatura MinHash (NUM_PERM valores) de um texto já normalizado."""
+    values = _shingles(normalized)
+    if not values:
+        return [_EMPTY] * NUM_PERM
+    if NUMPY_AVAILABLE:
+        # a < 2^31 e x < 2^32: a*x + b < 2^64, sem estouro em uint64
+        x = np.array(values, dtype=np.uint64)[None, :]
+        return ((_A_NP * x + _B_NP) % _PRIME).min(axis=1).tolist()
+    return [min((a * x + b) % _PRIME for x in values) for a, b in zip(_A, _B)]
+
+
+def numbers(normalized: str) -> frozenset:
+    """Números do texto (palavras com dígitos): itens com números diferentes não são unidos."""
+    return frozenset(word for word in normalized.split() if any(c.isdigit() for c in word))
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Jaccard estimado: fração de posições iguais nas assinaturas."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # A raiz é sempre o menor índice: grupos ficam na posição do primeiro item
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def cluster(texts: List[str], threshold: float) -> Tuple[List[List[int]], int]:
+    """
+    Agrupa textos iguais (após normalização) ou quase iguais.
+
+    Returns:
+        (grupos de índices, na ordem do primeiro item de cada grupo; quantidade de
+        itens unidos por texto normalizado idêntico)
+    """
+    groups = _UnionFind(len(texts))
+
+    # 1. Hash exato do texto normalizado
+    first_by_text: Dict[str, int] = {}
+    distinct: List[Tuple[int, str]] = []
+    exact = 0
+    for index, text in enumerate(texts):
+        normalized = normalize(text)
+        first = first_by_text.setdefault(normalized, index)
+        if first != index:
+            groups.union(first, index)
+            exact += 1
+        else:
+            distinct.append((index, normalized))
+
+    # 2. MinHash + LSH sobre os textos distintos
+    signatures: Dict[int, List[int]] = {}
+    item_numbers: Dict[int, frozenset] = {}
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for index, normalized in distinct:
+        sig = signature(normalized)
+        signatures[index] = sig
+        item_numbers[index] = numbers(normalized)
+        candidates = set()
+        for band in range(BANDS):
+            key = (band, tuple(sig[band * ROWS:(band + 1) * ROWS]))
+            bucket = buckets.setdefault(key, [])
+            candidates.update(bucket)
+            bucket.append(index)
+        for other in sorted(candidates):
+            if (
+                groups.find(other) != groups.find(index)
+                and item_numbers[other] == item_numbers[index]
+                and similarity(sig, signatures[other]) >= threshold
+            ):
+                groups.union(other, index)
+
+    members: Dict[int, List[int]] = {}
+    for index in range(len(texts)):
+        members.setdefault(groups.find(index), []).append(index)
+    return [members[root] for root in sorted(members)], exact
+
+
+def _merge_group(item_type: str, items: List[Dict]) -> Dict:
+    """Representante do grupo (o mais completo), com as fontes e formulações dos demais."""
+    quality = ITEM_QUALITY[item_type]
+    best = max(range(len(items)), key=lambda i: (quality(items[i]), -i))
+    merged = dict(items[best])
+    if len(items) == 1:
+        return merged
+
+    sources = []
+    for item in items:
+        for source in item.get('sources') or [item.get('source', '')]:
+            if source and source not in sources:
+                sources.append(source)
+    merged['sources'] = sources
+
+    if item_type == "qa_items":
+        variations = list(merged.get('variations') or [])
+        seen = {normalize(v) for v in variations} | {normalize(merged.get('question', ''))}
+        for item in items:
+            for question in [item.get('question', '')] + list(item.get('variations') or []):
+                key = normalize(question)
+                if key and key not in seen and len(variations) < MAX_VARIATIONS:
+                    seen.add(key)
+                    variations.append(question)
+        merged['variations'] = variations
+    return merged
+
+
+def dedupe_items(item_type: str, items: List[Dict], threshold: float) -> Tuple[List[Dict], Dict]:
+    """
+    Une os itens quase duplicados de um tipo ("qa_items" ou "facts").
+
+    Returns:
+        (itens deduplicados, relatório com antes/depois/exatos/similares/razão)
+    """
+    text = ITEM_TEXT[item_type]
+    groups, exact = cluster([text(item) for item in items], threshold)
+    kept = [_merge_group(item_type, [items[i] for i in group]) for group in groups]
+
+    removed = len(items) - len(kept)
+    report = {
+        "before": len(items),
+        "after": len(kept),
+        "exact": exact,
+        "near": removed - exact,
+        "ratio": round(removed / len(items), 4) if items else 0.0,
+    }
+    return kept, report
@@ -0,0 +1,316 @@
+"""
+Exportação da base consolidada em JSON Lines (e Parquet, opcional) por tipo de item.
+
+A única saída legível por máquina do AgentConsolidator era o JSON consolidado
+(um objeto só, com indentação): quem ingere a base num RAG precisa carregar o
+arquivo inteiro na memória. Aqui cada tipo de item (qa_items, facts, ...) vira
+uma série de arquivos .jsonl (um item por linha, em partes de até
+CONSOLIDATION_EXPORT_SHARD_ITEMS itens), gravados um registro por vez: a
+memória não cresce com o tamanho da base. Com pyarrow instalado, os mesmos
+itens podem sair também em Parquet, escritos em lotes (row groups).
+
+Cada registro traz:
+- `id`: identificador estável (tipo + texto normalizado do item + primeira
+  fonte), o mesmo entre execuções; o id dado pelo modelo (QA001, F002...) se
+  repete entre fontes e fica em `source_item_id`;
+- `sources` / `source_files`: nomes das fontes e os *agent_builder*.json de
+  origem.
+
+O `manifest.json` do diretório de exportação lista as partes de cada tipo com as
+contagens: a leitura pode ser preguiçosa (`iter_items`) e paralela (uma parte
+por processo, `iter_file`).
+
+Configuração via .env:
+    CONSOLIDATION_EXPORT_FORMATS=jsonl        jsonl, parquet (separados por vírgula) ou off
+    CONSOLIDATION_EXPORT_SHARD_ITEMS=50000    Itens por arquivo
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.chunk_manifest import atomic_write_text
+from core.item_dedup import normalize
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXPORT_DIRNAME = "export"
+EXPORT_MANIFEST = "manifest.json"
+EXPORT_VERSION = 1
+
+# Linhas por row group do Parquet (o lote é o que fica em memória)
+PARQUET_BATCH_ROWS = 5000
+
+# Tipo de item → prefixo do id estável e campo que identifica o item
+ID_PREFIX = {
+    "qa_items": "qa",
+    "facts": "fact",
+    "procedures": "proc",
+    "glossary": "term",
+    "examples": "ex",
+}
+KEY_FIELD = {
+    "qa_items": "question",
+    "facts": "statement",
+    "procedures": "name",
+    "glossary": "term",
+    "examples": "title",
+}
+
+# Colunas do Parquet por tipo (campos dos esquemas de core/block_schemas.py); as
+# listas viram list<string>, o resto string. O JSONL guarda todos os campos.
+LIST_FIELDS = ("variations", "tags", "steps", "related")
+PARQUET_FIELDS = {
+    "qa_items": ("question", "answer", "variations", "supporting_quote", "category", "tags"),
+    "facts": ("statement", "type", "evidence", "confidence", "tags"),
+    "procedures": ("name", "objective", "prerequisites", "steps", "verification", "common_errors", "tags"),
+    "glossary": ("term", "definition", "context", "related", "example"),
+    "examples": ("title", "type", "context", "intervention", "result", "lesson", "tags"),
+}
+RECORD_FIELDS = ("id", "item_type", "source_item_id", "sources", "source_files")
+LIST_COLUMNS = frozenset(LIST_FIELDS + ("sources", "source_files"))
+
+
+def export_formats() -> List[str]:
+    """Formatos pedidos em CONSOLIDATION_EXPORT_FORMATS (vazio = exportação desligada)."""
+    raw = os.environ.get("CONSOLIDATION_EXPORT_FORMATS", "jsonl").strip().lower()
+    if raw in ("", "off", "false", "0", "nao", "não"):
+        return []
+    formats = []
+    for name in raw.split(","):
+        name = name.strip()
+        if name not in ("jsonl", "parquet"):
+            print(f"⚠️  Formato de exportação desconhecido ignorado: {name}")
+        elif name not in formats:
+            formats.append(name)
+    return formats
+
+
+def export_shard_items() -> int:
+    return max(1, int(os.environ.get("CONSOLIDATION_EXPORT_SHARD_ITEMS", "50000")))
+
+
+def stable_id(item_type: str, item: Dict) -> str:
+    """Id que só depende do tipo, do texto que identifica o item e da sua primeira fonte."""
+    sources = item.get('sources') or [item.get('source', '')]
+    key = f"{item_type}\n{normalize(str(item.get(KEY_FIELD[item_type], '')))}\n{sources[0]}"
+    return f"{ID_PREFIX[item_type]}_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def export_records(item_type: str, items: Iterable[Dict], source_files: Dict[str, str]) -> Iterator[Dict]:
+    """
+    Registros de exportação de um tipo, um de cada vez.
+
+    Args:
+        source_files: nome da fonte → arquivo *agent_builder*.json de origem
+    """
+    seen = set()
+    for item in items:
+        record_id = stable_id(item_type, item)
+        # Itens com o mesmo texto e a mesma fonte (deduplicação desligada): sufixo na ordem
+        suffix = 1
+        unique_id = record_id
+        while unique_id in seen:
+            suffix += 1
+            unique_id = f"{record_id}-{suffix}"
+        seen.add(unique_id)
+
+        sources = list(item.get('sources') or [item.get('source', '')])
+        record = {
+            "id": unique_id,
+            "item_type": item_type,
+            "source_item_id": item.get('id'),
+            "sources": sources,
+            "source_files": [source_files.get(source, '') for source in sources],
+        }
+        for key, value in item.items():
+            if key not in ('id', 'source', 'sources'):
+                record[key] = value
+        yield record
+
+
+class _JsonlShards:
+    """Arquivos .jsonl de um tipo, trocando de parte a cada `shard_items` registros."""
+
+    def __init__(self, export_dir: str, item_type: str, shard_items: int):
+        self.export_dir = export_dir
+        self.item_type = item_type
+        self.shard_items = shard_items
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        self.files: List[Dict] = []
+        self.handle = None
+
+    def _open(self):
+        name = f"{self.item_type}-{len(self.files):05d}.jsonl"
+        path = os.path.join(self.export_dir, name)
+        self.files.append({"path": name, "format": "jsonl", "count": 0})
+        self.handle = open(path + ".tmp", 'w', encoding='utf-8')
+
+    def _close(self):
+        self.handle.close()
+        path = os.path.join(self.export_dir, self.files[-1]["path"])
+        os.replace(path + ".tmp", path)
+        self.handle = None
+
+    def write(self, record: Dict):
+        if self.handle is None:
+            self._open()
+        # Um registro por vez: o codificador em C serializa a linha e ela vai direto para o arquivo
+        self.handle.write(self.encoder.encode(record))
+        self.handle.write("\n")
+        self.files[-1]["count"] += 1
+        if self.files[-1]["count"] >= self.shard_items:
+            self._close()
+
+    def close(self) -> List[Dict]:
+        if self.handle is not None:
+            self._close()
+        return self.files
+
+
+def _parquet_value(field: str, value):
+    if field in LIST_COLUMNS:
+        if value is None or value == '':
+            return []
+        if isinstance(value, list):
+            return [str(v) for v in value]
+        # Texto livre ("tag1, tag2")
+        return [part.strip() for part in str(value).split(',') if part.strip()]
+    if value is None:
+        return None
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+class _ParquetShards:
+    """Arquivos .parquet de um tipo: colunas fixas, escritos em row groups de PARQUET_BATCH_ROWS."""
+
+    def __init__(self, export_dir: str, item_type: str, shard_items: int):
+        self.export_dir = export_dir
+        self.item_type = item_type
+        self.shard_items = shard_items
+        self.columns = RECORD_FIELDS + PARQUET_FIELDS[item_type]
+        self.schema = pa.schema([
+            (column, pa.list_(pa.string()) if column in LIST_COLUMNS else pa.string())
+            for column in self.columns
+        ])
+        self.files: List[Dict] = []
+        self.writer = None
+        self.batch: List[Dict] = []
+
+    def _flush(self):
+        if not self.batch:
+            return
+        if self.writer is None:
+            name = f"{self.item_type}-{len(self.files):05d}.parquet"
+            self.files.append({"path": name, "format": "parquet", "count": 0})
+            self.writer = pq.ParquetWriter(os.path.join(self.export_dir, name + ".tmp"), self.schema)
+        columns = {column: [_parquet_value(column, row.get(column)) for row in self.batch] for column in self.columns}
+        self.writer.write_table(pa.table(columns, schema=self.schema))
+        self.files[-1]["count"] += len(self.batch)
+        self.batch = []
+        if self.files[-1]["count"] >= self.shard_items:
+            self._close()
+
+    def _close(self):
+        self.writer.close()
+        path = os.path.join(self.export_dir, self.files[-1]["path"])
+        os.replace(path + ".tmp", path)
+        self.writer = None
+
+    def write(self, record: Dict):
+        self.batch.append(record)
+        remaining = self.shard_items - (self.files[-1]["count"] if self.writer is not None else 0)
+        if len(self.batch) >= min(PARQUET_BATCH_ROWS, remaining):
+            self._flush()
+
+    def close(self) -> List[Dict]:
+        self._flush()
+        if self.writer is not None:
+            self._close()
+        return self.files
+
+
+def export_knowledge_base(
+    consolidated_data: Dict,
+    export_dir: str,
+    item_types: Iterable[str],
+    formats: Optional[List[str]] = None,
+    project_name: str = "",
+) -> Dict:
+    """
+    Exporta os itens consolidados por tipo (JSONL e/ou Parquet) e grava o manifesto.
+
+    Partes de exportações anteriores que não fazem parte desta são removidas.
+
+    Returns:
+        Dict: Manifesto da exportação
+    """
+    formats = export_formats() if formats is None else formats
+    if "parquet" in formats and not PARQUET_AVAILABLE:
+        print("⚠️  pyarrow não instalado. Exportação em Parquet ignorada.")
+        formats = [name for name in formats if name != "parquet"]
+
+    os.makedirs(export_dir, exist_ok=True)
+    shard_items = export_shard_items()
+    sources = consolidated_data['metadata']['sources']
+    source_files = {source.get('name', ''): source.get('file', '') for source in sources}
+
+    manifest = {
+        "version": EXPORT_VERSION,
+        "project": project_name,
+        "generated_at": datetime.now().isoformat(),
+        "formats": formats,
+        "sources": sources,
+        "item_types": {},
+    }
+    for item_type in item_types:
+        writers = [
+            (_JsonlShards if name == "jsonl" else _ParquetShards)(export_dir, item_type, shard_items)
+            for name in formats
+        ]
+        count = 0
+        for record in export_records(item_type, consolidated_data.get(item_type, []), source_files):
+            for writer in writers:
+                writer.write(record)
+            count += 1
+        manifest["item_types"][item_type] = {
+            "count": count,
+            "files": [entry for writer in writers for entry in writer.close()],
+        }
+
+    # Partes que sobraram de uma exportação maior
+    current = {entry["path"] for info in manifest["item_types"].values() for entry in info["files"]}
+    for name in os.listdir(export_dir):
+        if name.endswith((".jsonl", ".parquet")) and name not in current:
+            os.remove(os.path.join(export_dir, name))
+
+    atomic_write_text(os.path.join(export_dir, EXPORT_MANIFEST), json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+def load_manifest(export_dir: str) -> Dict:
+    with open(os.path.join(export_dir, EXPORT_MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_file(path: str) -> Iterator[Dict]:
+    """Registros de uma parte .jsonl, um de cada vez (uma parte por processo para ler em paralelo)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_items(export_dir: str, item_type: str) -> Iterator[Dict]:
+    """Todos os registros JSONL de um tipo, lidos sob demanda, na ordem das partes."""
+    manifest = load_manifest(export_dir)
+    for entry in manifest["item_types"].get(item_type, {}).get("files", []):
+        if entry["format"] == "jsonl":
+            yield from iter_file(os.path.join(export_dir, entry["path"]))
@@ -0,0 +1,233 @@
+"""
+Pool de chaves da API do Gemini com cota própria por chave.
+
+Com várias chaves em API_KEYS, cada chave tem seu próprio limitador (RPM/TPM) e
+estado de saúde. Cada requisição vai para a chave com mais folga; uma chave que
+recebe 429 entra em resfriamento sem bloquear as outras, e a chamada é refeita
+imediatamente em outra chave. A vazão total cresce com o número de chaves.
+
+O estado (janelas e resfriamentos) fica em data/cache/key_pool_state.json,
+protegido por flock, e é compartilhado entre a CLI e os workers do Celery na
+mesma máquina. As chaves nunca são gravadas: o arquivo usa apenas um hash curto.
+
+Configuração via .env:
+    API_KEYS=chave1,chave2,chave3   (ativa o pool; LLM_RPM/LLM_TPM passam a valer por chave)
+    KEY_COOLDOWN_SECONDS=60         Resfriamento de uma chave após 429
+    KEY_POOL_STATE_FILE=data/cache/key_pool_state.json
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from core.rate_limiter import RateLimiter
+
+# flock só existe em sistemas POSIX; sem ele o estado fica restrito ao processo
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Identificador curto e não reversível da chave (para logs e arquivo de estado)."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+def configured_keys() -> List[str]:
+    """Chaves de API_KEYS (separadas por vírgula), sem repetições."""
+    keys = []
+    for key in os.environ.get("API_KEYS", "").split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class KeyState:
+    """Limitador e saúde de uma chave."""
+
+    def __init__(self, api_key: str, rpm: int, tpm: int):
+        self.api_key = api_key
+        self.fingerprint = key_fingerprint(api_key)
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm, clock=time.time)
+        self.cooldown_until = 0.0
+        self.rate_limited = 0
+        self.client = None
+
+
+class KeyPool:
+    """
+    Distribui requisições entre as chaves pela maior folga disponível.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        state_path: Optional[str] = None,
+    ):
+        if not keys:
+            raise ValueError("KeyPool precisa de pelo menos uma chave")
+
+        env = os.environ.get
+        rpm = rpm if rpm is not None else int(env("LLM_RPM", "15"))
+        tpm = tpm if tpm is not None else int(env("LLM_TPM", "0"))
+        self.cooldown = cooldown if cooldown is not None else float(env("KEY_COOLDOWN_SECONDS", "60"))
+        self.keys: Dict[str, KeyState] = {}
+        for key in keys:
+            state = KeyState(key, rpm, tpm)
+            self.keys[state.fingerprint] = state
+
+        if state_path is None:
+            state_path = env("KEY_POOL_STATE_FILE", os.path.join("data", "cache", "key_pool_state.json"))
+        self.state_path = state_path if FCNTL_AVAILABLE else None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ estado em disco
+
+    def _load_state(self, f):
+        f.seek(0)
+        try:
+            data = json.loads(f.read() or "{}")
+        except ValueError:
+            data = {}
+        for fingerprint, saved in data.get("keys", {}).items():
+            state = self.keys.get(fingerprint)
+            if state is None:
+                continue
+            state.limiter.restore(saved.get("requests", []))
+            state.cooldown_until = saved.get("cooldown_until", 0.0)
+
+    def _save_state(self, f):
+        data = {"updated_at": time.time(), "keys": {}}
+        # Preserva chaves de outros processos que este pool não conhece
+        f.seek(0)
+        try:
+            data["keys"] = json.loads(f.read() or "{}").get("keys", {})
+        except ValueError:
+            pass
+        for fingerprint, state in self.keys.items():
+            data["keys"][fingerprint] = {
+                "requests": state.limiter.snapshot(),
+                "cooldown_until": state.cooldown_until,
+            }
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(data))
+        f.flush()
+
+    @contextmanager
+    def _shared_state(self):
+        """Seção crítica entre threads e, se possível, entre processos."""
+        with self._lock:
+            if not self.state_path:
+                yield
+                return
+
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(self.state_path, 'a+', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    self._load_state(f)
+                    yield
+                    self._save_state(f)
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------ seleção
+
+    def acquire(self, tokens: int = 0) -> KeyState:
+        """
+        Reserva uma requisição na chave com mais folga, esperando se todas
+        estiverem no limite ou em resfriamento.
+        """
+        while True:
+            with self._shared_state():
+                now = time.time()
+                best = None
+                best_headroom = -1.0
+                wait = float("inf")
+
+                for state in self.keys.values():
+                    if state.cooldown_until > now:
+                        wait = min(wait, state.cooldown_until - now)
+                        continue
+                    key_wait = state.limiter.wait_time(tokens)
+                    if key_wait > 0:
+                        wait = min(wait, key_wait)
+                        continue
+                    headroom = state.limiter.headroom()
+                    if headroom > best_headroom:
+                        best, best_headroom = state, headroom
+
+                if best is not None and best.limiter.try_acquire(tokens):
+                    return best
+
+            time.sleep(min(wait, 1.0) if wait != float("inf") else 0.1)
+
+    def report_rate_limited(self, state: KeyState, retry_after: Optional[float] = None):
+        """Coloca a chave em resfriamento após um 429."""
+        with self._shared_state():
+            state.cooldown_until = time.time() + (retry_after or self.cooldown)
+            state.rate_limited += 1
+        print(f"🧊 Chave {state.fingerprint} em resfriamento por {retry_after or self.cooldown:.0f}s (429)")
+
+    def client_for(self, state: KeyState):
+        """Cliente gRPC do Gemini dedicado à chave (criado sob demanda)."""
+        with self._lock:
+            if state.client is None:
+                from google.ai import generativelanguage as glm
+                state.client = glm.GenerativeServiceClient(client_options={"api_key": state.api_key})
+            return state.client
+
+    def status(self) -> List[Dict]:
+        """Resumo por chave (para logs/diagnóstico)."""
+        with self._shared_state():
+            now = time.time()
+            return [
+                {
+                    "key": state.fingerprint,
+                    "headroom": round(state.limiter.headroom(), 3),
+                    "cooling_down_s": max(0.0, round(state.cooldown_until - now, 1)),
+                    "rate_limited": state.rate_limited,
+                }
+                for state in self.keys.values()
+            ]
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[KeyPool] = None
+_pool_checked = False
+
+
+def get_key_pool() -> Optional[KeyPool]:
+    """
+    Pool global, criado a partir de API_KEYS. None se API_KEYS não estiver
+    definida (usa-se então API_KEY com o limitador global, como antes).
+    """
+    global _pool, _pool_checked
+    if not _pool_checked:
+        with _pool_lock:
+            if not _pool_checked:
+                keys = configured_keys()
+                if keys:
+                    _pool = KeyPool(keys)
+                    print(f"🔑 Pool de chaves ativo: {len(keys)} chave(s)")
+                _pool_checked = True
+    return _pool
+
+
+def set_key_pool(pool: Optional[KeyPool]):
+    """Substitui o pool global (None = desativa o pool)."""
+    global _pool, _pool_checked
+    with _pool_lock:
+        _pool = pool
+        _pool_checked = True
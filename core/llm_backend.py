@@ -0,0 +1,399 @@
+"""
+Backends de LLM plugáveis.
+
+Os processadores não falam mais diretamente com `google.generativeai`: todas as
+chamadas passam por um backend obtido via `get_backend()`. Além do backend real
+(Gemini) existe um backend falso, determinístico e offline, com latência, uso de
+tokens e taxa de erro configuráveis (incluindo 429 injetados), para rodar e fazer
+testes de carga do pipeline sem rede e sem chave de API.
+
+Seleção via .env:
+    LLM_BACKEND=gemini   (padrão)
+    LLM_BACKEND=fake     (offline; ver variáveis FAKE_LLM_* em FakeBackend)
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted, ServiceUnavailable
+
+from core.rate_limiter import get_rate_limiter
+from core.key_pool import get_key_pool
+from core.concurrency import get_concurrency
+from core.usage import record_call
+from core.model_resolver import DEFAULT_MODEL, get_model_resolver
+
+load_dotenv()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa rápida de tokens (~4 caracteres por token), sem chamada de rede.
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class LLMUsage:
+    """Uso de tokens de uma chamada."""
+    prompt_tokens: int = 0
+    candidate_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.candidate_tokens
+
+
+@dataclass
+class LLMResponse:
+    """Resposta normalizada de qualquer backend."""
+    text: str
+    model: str
+    usage: LLMUsage = field(default_factory=LLMUsage)
+    latency: float = 0.0
+
+
+class LLMBackend:
+    """
+    Interface base dos backends de LLM.
+
+    Subclasses implementam `_generate`; `generate` aplica o rate limiter global
+    (ou escolhe a chave do pool, se API_KEYS estiver definida), limita as chamadas
+    simultâneas pelo controlador adaptativo (core/concurrency.py), mede a latência,
+    registra o uso (core/usage.py) e normaliza a resposta, servindo de ponto único
+    para políticas comuns a todas as chamadas.
+    """
+
+    name = "base"
+
+    def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        history: Optional[List[Dict]] = None,
+        generation_config: Optional[Dict] = None,
+        on_text: Optional[Callable[[str], None]] = None,
+    ) -> LLMResponse:
+        """
+        Gera uma resposta para o prompt.
+
+        Args:
+            prompt: Texto enviado ao modelo
+            model: Nome do modelo (None = modelo padrão do backend)
+            history: Histórico de chat no formato do Gemini (opcional)
+            generation_config: Configuração de geração (opcional)
+            on_text: Se informado, a resposta é gerada em streaming e cada trecho
+                é entregue a esta função assim que chega (ver core/streaming.py)
+
+        Returns:
+            LLMResponse
+        """
+        tokens = estimate_tokens(prompt)
+        pool = get_key_pool()
+        if pool is None:
+            get_rate_limiter().acquire(tokens)
+            return self._timed_generate(prompt, model, history, generation_config, None, on_text)
+
+        # Pool de chaves: um 429 resfria só aquela chave e a chamada vai para outra
+        attempts = len(pool.keys) + 1
+        for attempt in range(attempts):
+            key = pool.acquire(tokens)
+            try:
+                return self._timed_generate(prompt, model, history, generation_config, key, on_text, retry=attempt)
+            except ResourceExhausted:
+                pool.report_rate_limited(key)
+                if attempt == attempts - 1:
+                    raise
+
+    def _timed_generate(self, prompt, model, history, generation_config, key, on_text, retry=0) -> LLMResponse:
+        model_name = model or self.default_model()
+        with get_concurrency().slot() as call:
+            start = time.monotonic()
+            try:
+                response = self._generate(prompt, model_name, history, generation_config, key, on_text)
+            except ResourceExhausted as e:
+                # Com pool de chaves, o resfriamento é por chave: não pausa as outras
+                call.rate_limited(pause=key is None)
+                record_call(self.name, model_name, "rate_limited", time.monotonic() - start, retry=retry, error=str(e))
+                raise
+            except (DeadlineExceeded, ServiceUnavailable) as e:
+                call.overloaded()
+                record_call(self.name, model_name, "overloaded", time.monotonic() - start, retry=retry, error=str(e))
+                raise
+            except Exception as e:
+                record_call(self.name, model_name, "error", time.monotonic() - start, retry=retry, error=str(e))
+                raise
+            response.latency = time.monotonic() - start
+            call.success(response.latency)
+        record_call(self.name, response.model, "ok", response.latency, usage=response.usage, retry=retry)
+        return response
+
+    def _generate(self, prompt, model, history, generation_config, key=None, on_text=None) -> LLMResponse:
+        """
+        `key` é o KeyState do pool de chaves (None = chave padrão, API_KEY);
+        com `on_text`, a resposta é gerada em streaming.
+        """
+        raise NotImplementedError
+
+    def default_model(self) -> str:
+        """Nome do modelo usado quando nenhum é especificado."""
+        model = os.environ.get("LLM_MODEL", DEFAULT_MODEL).replace("models/", "").strip()
+        # LLM_MODEL=auto: o modelo vem do roteador; sem rota, usa o padrão
+        if not model or model.lower() == "auto":
+            return DEFAULT_MODEL
+        return model
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+# ---------------------------------------------------------------------------
+
+class GeminiBackend(LLMBackend):
+    """Backend real usando google.generativeai."""
+
+    name = "gemini"
+
+    def default_model(self) -> str:
+        # Resolução memorizada pelo resolvedor: sem listagem de modelos por chamada
+        return get_model_resolver().resolve(super().default_model())
+
+    def _generate(self, prompt, model, history, generation_config, key=None, on_text=None) -> LLMResponse:
+        model_name = model or self.default_model()
+        gemini_model = get_model_resolver().get_model(model_name, generation_config, key=key)
+        stream = on_text is not None
+
+        if history:
+            chat = gemini_model.start_chat(history=history)
+            response = chat.send_message(prompt, stream=stream)
+        else:
+            response = gemini_model.generate_content(prompt, stream=stream)
+
+        if stream:
+            parts = []
+            for chunk in response:
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    # Trecho sem texto (ex.: só finish_reason/metadados)
+                    continue
+                parts.append(piece)
+                on_text(piece)
+            text = "".join(parts)
+        else:
+            text = response.text
+
+        return LLMResponse(
+            text=text,
+            model=model_name,
+            usage=self._extract_usage(response),
+        )
+
+    @staticmethod
+    def _extract_usage(response) -> LLMUsage:
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is None:
+            return LLMUsage()
+        return LLMUsage(
+            prompt_tokens=getattr(metadata, "prompt_token_count", 0) or 0,
+            candidate_tokens=getattr(metadata, "candidates_token_count", 0) or 0,
+            cached_tokens=getattr(metadata, "cached_content_token_count", 0) or 0,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Fake (offline)
+# ---------------------------------------------------------------------------
+
+class FakeBackend(LLMBackend):
+    """
+    Backend falso, determinístico e offline.
+
+    O resultado de cada chamada depende apenas da semente, do prompt e de quantas
+    vezes aquele prompt já foi enviado; assim uma mesma execução é reproduzível,
+    inclusive a sequência de erros injetados e as retentativas.
+
+    Configuração via .env (todas opcionais):
+        FAKE_LLM_LATENCY        Latência base em segundos (padrão: 0.05)
+        FAKE_LLM_JITTER         Variação máxima somada à latência (padrão: 0)
+        FAKE_LLM_SECONDS_PER_1K Latência extra por 1000 tokens de saída (padrão: 0)
+        FAKE_LLM_OUTPUT_TOKENS  Tokens gerados por resposta (padrão: 400)
+        FAKE_LLM_ERROR_RATE     Probabilidade de erro 503 (padrão: 0)
+        FAKE_LLM_429_RATE       Probabilidade de erro 429 / cota (padrão: 0)
+        FAKE_LLM_STREAM_BREAK_RATE  Probabilidade de um streaming cair no meio (padrão: 0)
+        FAKE_LLM_JSON_DROP_RATE Probabilidade de cada seção de uma resposta JSON faltar (padrão: 0)
+        FAKE_LLM_SEED           Semente (padrão: 0)
+
+    Com `response_mime_type=application/json` no generation_config, a resposta é
+    um JSON gerado a partir do `response_schema` (todas as propriedades do objeto
+    preenchidas), como faria o modo estruturado do Gemini.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: Optional[float] = None,
+        jitter: Optional[float] = None,
+        seconds_per_1k_tokens: Optional[float] = None,
+        output_tokens: Optional[int] = None,
+        error_rate: Optional[float] = None,
+        rate_limit_rate: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        env = os.environ.get
+        self.latency = latency if latency is not None else float(env("FAKE_LLM_LATENCY", "0.05"))
+        self.jitter = jitter if jitter is not None else float(env("FAKE_LLM_JITTER", "0"))
+        self.seconds_per_1k_tokens = (
+            seconds_per_1k_tokens if seconds_per_1k_tokens is not None
+            else float(env("FAKE_LLM_SECONDS_PER_1K", "0"))
+        )
+        self.output_tokens = output_tokens if output_tokens is not None else int(env("FAKE_LLM_OUTPUT_TOKENS", "400"))
+        self.error_rate = error_rate if error_rate is not None else float(env("FAKE_LLM_ERROR_RATE", "0"))
+        self.rate_limit_rate = (
+            rate_limit_rate if rate_limit_rate is not None else float(env("FAKE_LLM_429_RATE", "0"))
+        )
+        self.seed = seed if seed is not None else int(env("FAKE_LLM_SEED", "0"))
+        self.stream_break_rate = float(env("FAKE_LLM_STREAM_BREAK_RATE", "0"))
+        self.json_drop_rate = float(env("FAKE_LLM_JSON_DROP_RATE", "0"))
+
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.calls = 0
+
+    def _next_rng(self, prompt: str):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.calls += 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}"), digest
+
+    def _generate(self, prompt, model, history, generation_config, key=None, on_text=None) -> LLMResponse:
+        model_name = model or self.default_model()
+        full_prompt = "".join(str(turn.get("parts", "")) for turn in (history or [])) + prompt
+        rng, digest = self._next_rng(full_prompt)
+
+        first_token = self.latency + rng.uniform(0, self.jitter)
+        generation = self.seconds_per_1k_tokens * self.output_tokens / 1000
+        if on_text is None and first_token + generation > 0:
+            time.sleep(first_token + generation)
+        elif on_text is not None and first_token > 0:
+            time.sleep(first_token)
+
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            raise ResourceExhausted("429 Resource has been exhausted (fake backend)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise ServiceUnavailable("503 The model is overloaded (fake backend)")
+
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            schema = generation_config.get("response_schema") or {"type": "object", "properties": {"text": {"type": "string"}}}
+            text = json.dumps(self._fake_json(rng, schema, digest, model_name), ensure_ascii=False)
+        else:
+            text = self._fake_text(rng, digest, model_name)
+        if on_text is not None:
+            self._fake_stream(rng, text, generation, on_text)
+        return LLMResponse(
+            text=text,
+            model=model_name,
+            usage=LLMUsage(
+                prompt_tokens=estimate_tokens(full_prompt),
+                candidate_tokens=estimate_tokens(text),
+            ),
+        )
+
+    def _fake_stream(self, rng, text, generation, on_text, pieces=8):
+        """Entrega o texto em trechos, podendo cair no meio (FAKE_LLM_STREAM_BREAK_RATE)."""
+        breaks = rng.random() < self.stream_break_rate
+        size = max(1, -(-len(text) // pieces))
+        for index, start in enumerate(range(0, len(text), size)):
+            if breaks and index == pieces // 2:
+                raise ServiceUnavailable("503 Stream interrupted (fake backend)")
+            if generation > 0:
+                time.sleep(generation / pieces)
+            on_text(text[start:start + size])
+
+    def _fake_json(self, rng, schema, digest, model_name, depth=0):
+        """Valor aleatório que respeita o schema (strings do primeiro nível com tamanho de resposta)."""
+        kind = str(schema.get("type", "string")).lower()
+        if kind == "object":
+            return {
+                name: self._fake_json(rng, prop, digest, model_name, depth + 1)
+                for name, prop in schema.get("properties", {}).items()
+                # Seções ausentes no primeiro nível simulam respostas incompletas
+                if depth > 0 or rng.random() >= self.json_drop_rate
+            }
+        if kind == "array":
+            return [self._fake_json(rng, schema.get("items", {}), digest, model_name, depth + 1)
+                    for _ in range(rng.randint(1, 3))]
+        if kind == "integer":
+            return rng.randint(0, 100)
+        if kind == "number":
+            return round(rng.uniform(0, 100), 2)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        if schema.get("enum"):
+            return rng.choice(schema["enum"])
+        if depth <= 1:
+            return self._fake_text(rng, digest, model_name)
+        return self._fake_text(rng, digest, model_name, target_chars=60)
+
+    def _fake_text(self, rng, digest, model_name, target_chars=None) -> str:
+        words = ["conteúdo", "framework", "processo", "resultado", "cliente", "métrica",
+                 "estratégia", "exemplo", "passo", "conceito", "dados", "agente"]
+        target_chars = target_chars or self.output_tokens * 4
+        parts = [f"[fake:{model_name}:{digest[:12]}]"]
+        size = len(parts[0])
+        while size < target_chars:
+            word = rng.choice(words)
+            parts.append(word)
+            size += len(word) + 1
+        return " ".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Seleção do backend
+# ---------------------------------------------------------------------------
+
+_backend_lock = threading.Lock()
+_backend: Optional[LLMBackend] = None
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend,
+}
+
+
+def get_backend() -> LLMBackend:
+    """
+    Retorna o backend global (criado sob demanda a partir de LLM_BACKEND).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("LLM_BACKEND", "gemini").strip().lower()
+                if name not in BACKENDS:
+                    raise ValueError(f"LLM_BACKEND inválido: '{name}'. Opções: {', '.join(BACKENDS)}")
+                _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend: Optional[LLMBackend]):
+    """
+    Substitui o backend global (ex.: FakeBackend configurado para teste de carga).
+    Passe None para voltar a usar LLM_BACKEND.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,220 @@
+"""
+Modo map-reduce para entradas maiores que a janela de contexto.
+
+Em vez de embutir a transcrição inteira em cada prompt, o texto é dividido em
+chunks de tamanho limitado. Cada chunk é extraído em paralelo (map) e os
+resultados parciais são combinados em grupos de `fan_in` (reduce), nível a
+nível, até sobrar um único resultado. Cada requisição tem tamanho limitado
+(latência previsível) e o número de chamadas cresce linearmente com a entrada.
+
+Os resultados intermediários ficam em cache em disco (chave = hash do prompt +
+modelo), então uma retentativa ou reexecução só refaz as chamadas que faltam.
+
+Configuração via .env:
+    MAP_REDUCE_MODE=auto              auto (pelo limiar), on ou off
+    MAP_REDUCE_THRESHOLD_TOKENS=200000
+    MAP_REDUCE_CHUNK_TOKENS=30000     Tamanho máximo de cada chunk
+    MAP_REDUCE_FAN_IN=4               Resultados combinados por chamada de reduce
+    MAP_REDUCE_WORKERS=4              Chamadas de map/reduce em paralelo por etapa
+    MAP_REDUCE_CACHE_DIR=data/cache/map_reduce
+"""
+
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from core.llm_backend import get_backend, estimate_tokens
+from core.model_router import route_model
+from core.events import submit_with_context
+from core.usage import current_stage, stage_scope
+
+
+def use_map_reduce(text: str) -> bool:
+    """Decide se a entrada deve ser processada em modo map-reduce."""
+    mode = os.environ.get("MAP_REDUCE_MODE", "auto").strip().lower()
+    if mode == "on":
+        return True
+    if mode == "off":
+        return False
+    threshold = int(os.environ.get("MAP_REDUCE_THRESHOLD_TOKENS", "200000"))
+    return estimate_tokens(text) > threshold
+
+
+def split_text_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """
+    Divide o texto em chunks de até `max_tokens` (estimados), preferindo quebrar
+    em fim de linha para não cortar frases e parágrafos.
+    """
+    max_chars = max_tokens * 4
+    chunks = []
+    current = []
+    size = 0
+
+    for line in text.splitlines(keepends=True):
+        # Linha maior que um chunk inteiro: corte duro
+        while len(line) > max_chars:
+            if current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+
+        if size + len(line) > max_chars and current:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def with_chunk_note(prompt: str, index: int, total: int) -> str:
+    """Avisa o modelo de que o conteúdo do prompt é apenas um trecho do material."""
+    note = (
+        f"**ATENÇÃO**: o conteúdo para análise abaixo é o TRECHO {index + 1} de {total} "
+        "de um material maior. Extraia apenas o que está neste trecho e NÃO marque como "
+        "ausente algo que pode estar em outros trechos.\n"
+    )
+    return note + prompt
+
+
+def build_reduce_prompt(title: str, section: Optional[str], partials: List[str], output_language: str = "pt") -> str:
+    """
+    Prompt de reduce: combina extrações parciais (de trechos diferentes) de uma
+    mesma dimensão/bloco em um único resultado, no formato da seção original.
+    """
+    partials_text = "\n\n".join(
+        f"### EXTRAÇÃO PARCIAL {i + 1}\n\n{partial}" for i, partial in enumerate(partials)
+    )
+
+    return f"""
+Você está consolidando extrações parciais de **{title}**, cada uma feita sobre um trecho diferente do mesmo material.
+
+**INSTRUÇÕES**:
+1. Combine tudo em um ÚNICO resultado, seguindo o formato da seção abaixo
+2. Una listas e remova duplicatas, mantendo a versão mais completa de cada item
+3. Preserve EXATAMENTE números, nomes, citações e termos técnicos
+4. NÃO invente informações - use apenas o que está nas extrações parciais
+5. Só marque algo como não mencionado se NENHUMA extração parcial o trouxer
+
+**IDIOMA DE SAÍDA**: {"Português Brasileiro" if output_language == "pt" else "English"}
+
+---
+
+{section or title}
+
+---
+
+**EXTRAÇÕES PARCIAIS**:
+
+{partials_text}
+
+---
+
+**AGORA CRIE O RESULTADO CONSOLIDADO DE {title}**:
+"""
+
+
+class MapReducer:
+    """
+    Executa map (por chunk) e reduce hierárquico sobre um texto grande.
+
+    Args:
+        text: Texto completo de entrada
+        chunk_tokens: Tamanho máximo de cada chunk (tokens estimados)
+        fan_in: Quantos resultados parciais cada chamada de reduce combina
+        max_workers: Chamadas em paralelo (o rate limiter global continua valendo)
+        cache_dir: Diretório do cache de resultados intermediários
+        mode: Modo de processamento (para o roteamento de modelos)
+    """
+
+    def __init__(
+        self,
+        text: str,
+        chunk_tokens: Optional[int] = None,
+        fan_in: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        mode: str = "",
+    ):
+        env = os.environ.get
+        self.chunk_tokens = chunk_tokens or int(env("MAP_REDUCE_CHUNK_TOKENS", "30000"))
+        self.fan_in = max(2, fan_in or int(env("MAP_REDUCE_FAN_IN", "4")))
+        self.max_workers = max_workers or int(env("MAP_REDUCE_WORKERS", "4"))
+        self.cache_dir = cache_dir or env("MAP_REDUCE_CACHE_DIR", os.path.join("data", "cache", "map_reduce"))
+        self.mode = mode
+        self.chunks = split_text_by_tokens(text, self.chunk_tokens)
+
+    def _cache_path(self, prompt: str, model: Optional[str]) -> str:
+        backend = get_backend()
+        key = f"{backend.name}:{model or backend.default_model()}:{prompt}"
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.txt")
+
+    def _call(self, prompt: str, stage: str) -> str:
+        """Chamada ao LLM com cache em disco do resultado."""
+        model = route_model(self.mode, stage, estimate_tokens(prompt))
+        path = self._cache_path(prompt, model)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        # Etapa no registro de uso: ex. "dimension_3/map"
+        with stage_scope(f"{current_stage()}/{stage}" if current_stage() else stage):
+            result = get_backend().generate(prompt, model=model).text.strip()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(result)
+        os.replace(tmp_path, path)
+        return result
+
+    def _parallel(self, prompts: List[str], stage: str) -> List[str]:
+        if len(prompts) == 1:
+            return [self._call(prompts[0], stage)]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(prompts))) as executor:
+            futures = [submit_with_context(executor, self._call, prompt, stage) for prompt in prompts]
+            return [future.result() for future in futures]
+
+    def run(
+        self,
+        map_prompt: Callable[[str, int, int], str],
+        reduce_prompt: Callable[[List[str], int], str],
+        label: str = "",
+    ) -> str:
+        """
+        Executa o map-reduce completo.
+
+        Args:
+            map_prompt: (chunk, índice, total) -> prompt de extração do chunk
+            reduce_prompt: (resultados parciais, nível) -> prompt de combinação
+            label: Nome da etapa (apenas para log)
+
+        Returns:
+            str: Resultado final combinado
+        """
+        total = len(self.chunks)
+        print(f"🧩 {label}: map-reduce em {total} chunks (fan-in {self.fan_in})")
+
+        results = self._parallel([
+            map_prompt(chunk, index, total) for index, chunk in enumerate(self.chunks)
+        ], "map")
+
+        level = 1
+        while len(results) > 1:
+            groups = [results[i:i + self.fan_in] for i in range(0, len(results), self.fan_in)]
+            print(f"   🔗 {label}: reduce nível {level} ({len(results)} → {len(groups)})")
+
+            # Grupo com um único resultado passa direto para o próximo nível
+            to_reduce = [i for i, group in enumerate(groups) if len(group) > 1]
+            reduced = self._parallel([reduce_prompt(groups[i], level) for i in to_reduce], "reduce")
+            results = [group[0] for group in groups]
+            for i, result in zip(to_reduce, reduced):
+                results[i] = result
+            level += 1
+
+        return results[0]
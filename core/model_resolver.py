@@ -0,0 +1,231 @@
+"""
+Resolução de modelos Gemini compartilhada por todos os processadores.
+
+- O catálogo de modelos (genai.list_models) fica em disco, em
+  data/cache/model_catalog.json, e só é consultado na API quando expira (TTL).
+- A escolha do modelo (LLM_MODEL → modelo válido) é memorizada por nome
+  preferido, inclusive quando o modelo não aparece na listagem.
+- Instâncias de GenerativeModel são reutilizadas por (modelo, configuração, chave).
+- Nada acessa a rede no import: a API só é configurada na primeira chamada.
+
+Pool de chaves: o google-generativeai só aceita uma chave global
+(genai.configure) e não expõe um cliente por GenerativeModel. A instância de
+cada chave recebe o cliente dessa chave no atributo `_client`, que o SDK
+preenche sob demanda em generate_content (verificado com a versão fixada no
+requirements.txt, 0.8.5). Ao atualizar o SDK, conferir esse atributo:
+`_bind_client` falha com erro claro se ele deixar de existir.
+
+Configuração via .env:
+    MODEL_CATALOG_TTL=86400   Validade do catálogo em disco, em segundos
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+from core.key_pool import configured_keys, get_key_pool
+
+# Modelos Gemini conhecidos e aceitos mesmo quando não aparecem na listagem da API
+KNOWN_MODELS = [
+    "gemini-2.5-flash",
+    "gemini-2.5-flash-lite",
+    "gemini-2.5-pro",
+    "gemini-3-pro",
+]
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+CATALOG_PATH = os.path.join("data", "cache", "model_catalog.json")
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+def configure_gemini():
+    """
+    Configura a API do Gemini uma única vez, sob demanda (nunca no import).
+    """
+    global _configured
+    import google.generativeai as genai
+
+    if _configured:
+        return genai
+
+    with _configure_lock:
+        if not _configured:
+            # Sem API_KEY, usa a primeira chave do pool (API_KEYS) como padrão
+            api_key = os.environ.get("API_KEY") or next(iter(configured_keys()), None)
+            if not api_key:
+                raise RuntimeError("API key não configurada: defina API_KEY (ou API_KEYS) no arquivo .env")
+            genai.configure(api_key=api_key)
+            _configured = True
+
+    return genai
+
+
+def clean_model_name(name: Optional[str]) -> str:
+    """Remove o prefixo 'models/' e espaços do nome do modelo."""
+    return (name or "").replace("models/", "").strip()
+
+
+class ModelResolver:
+    """
+    Catálogo de modelos com cache em disco + cache de instâncias GenerativeModel.
+    """
+
+    def __init__(self, catalog_path: str = CATALOG_PATH, ttl: Optional[float] = None):
+        self.catalog_path = catalog_path
+        self.ttl = ttl if ttl is not None else float(os.environ.get("MODEL_CATALOG_TTL", "86400"))
+        self._lock = threading.RLock()
+        self._catalog: Optional[List[str]] = None
+        self._resolved: Dict[str, str] = {}
+        self._instances: Dict[tuple, object] = {}
+
+    # ----------------------------------------------------------------- catálogo
+
+    def _read_disk_catalog(self) -> Optional[List[str]]:
+        if not os.path.exists(self.catalog_path):
+            return None
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if time.time() - data.get("fetched_at", 0) > self.ttl:
+            return None
+        return data.get("models") or None
+
+    def _write_disk_catalog(self, models: List[str]):
+        os.makedirs(os.path.dirname(self.catalog_path), exist_ok=True)
+        tmp_path = self.catalog_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fetched_at": time.time(), "models": models}, f, indent=2)
+        os.replace(tmp_path, self.catalog_path)
+
+    def _fetch_catalog(self) -> List[str]:
+        genai = configure_gemini()
+        return [
+            clean_model_name(m.name)
+            for m in genai.list_models()
+            if 'generateContent' in m.supported_generation_methods
+        ]
+
+    def available_models(self, refresh: bool = False) -> List[str]:
+        """
+        Modelos que suportam generateContent.
+
+        Ordem de consulta: memória → disco (dentro do TTL) → API. Uma falha na
+        listagem retorna [] e não é repetida no mesmo processo.
+        """
+        with self._lock:
+            if self._catalog is not None and not refresh:
+                return self._catalog
+
+            models = None if refresh else self._read_disk_catalog()
+            if models is None:
+                try:
+                    models = self._fetch_catalog()
+                    if models:
+                        self._write_disk_catalog(models)
+                except RuntimeError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️  Erro ao listar modelos: {e}")
+                    models = []
+
+            self._catalog = models
+            return models
+
+    # ---------------------------------------------------------------- resolução
+
+    def resolve(self, preferred: Optional[str] = None) -> str:
+        """
+        Encontra um modelo válido, tentando o preferido primeiro.
+        O resultado é memorizado por nome preferido.
+        """
+        preferred_clean = clean_model_name(preferred)
+
+        with self._lock:
+            if preferred_clean in self._resolved:
+                return self._resolved[preferred_clean]
+
+            model_name = self._choose(preferred_clean)
+            self._resolved[preferred_clean] = model_name
+            return model_name
+
+    def _choose(self, preferred: str) -> str:
+        available = self.available_models()
+
+        if preferred:
+            if preferred in available or preferred in KNOWN_MODELS:
+                print(f"✅ Usando modelo preferido: {preferred}")
+            else:
+                # Se não achou na lista mas o usuário forçou, tenta mesmo assim
+                print(f"⚠️  Modelo '{preferred}' não listado na API, mas será tentado.")
+            return preferred
+
+        if not available:
+            # Fallback para o primeiro modelo conhecido se não conseguir listar
+            print(f"✅ Modelo válido encontrado (fallback): {KNOWN_MODELS[0]}")
+            return KNOWN_MODELS[0]
+
+        # Procura por modelos flash primeiro
+        flash_models = [m for m in available if 'flash' in m.lower()]
+        if flash_models:
+            print(f"✅ Usando modelo Flash disponível: {flash_models[0]}")
+            return flash_models[0]
+
+        # Se não tem flash, usa o primeiro disponível
+        print(f"✅ Usando primeiro modelo disponível: {available[0]}")
+        return available[0]
+
+    # ---------------------------------------------------------------- instâncias
+
+    def get_model(self, model_name: Optional[str] = None, generation_config: Optional[Dict] = None, key=None):
+        """
+        Instância de GenerativeModel reutilizada por (modelo, configuração, chave).
+        Sem `model_name`, usa o modelo resolvido a partir de LLM_MODEL.
+        `key` é um KeyState do pool de chaves: a instância usa o cliente dessa chave.
+        """
+        model_name = model_name or self.resolve(os.environ.get("LLM_MODEL"))
+        cache_key = (
+            model_name,
+            json.dumps(generation_config, sort_keys=True, default=str),
+            key.fingerprint if key else None,
+        )
+
+        with self._lock:
+            instance = self._instances.get(cache_key)
+            if instance is None:
+                genai = configure_gemini()
+                instance = genai.GenerativeModel(model_name, generation_config=generation_config)
+                if key is not None:
+                    _bind_client(instance, get_key_pool().client_for(key))
+                self._instances[cache_key] = instance
+            return instance
+
+
+def _bind_client(instance, client):
+    """Associa à instância o cliente de uma chave do pool (ver docstring do módulo)."""
+    if not hasattr(instance, "_client"):
+        raise RuntimeError(
+            "Versão do google-generativeai sem GenerativeModel._client: o pool de chaves "
+            "(API_KEYS) requer a versão fixada no requirements.txt"
+        )
+    instance._client = client
+
+
+_resolver_lock = threading.Lock()
+_resolver: Optional[ModelResolver] = None
+
+
+def get_model_resolver() -> ModelResolver:
+    """Retorna o resolvedor de modelos global."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = ModelResolver()
+    return _resolver
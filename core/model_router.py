@@ -0,0 +1,148 @@
+"""
+Roteamento de modelos por modo de processamento e etapa.
+
+Com o roteamento ativo, cada chamada escolhe um "tier" de modelo de acordo com
+o modo (faq, framework, agent_builder...), a etapa (chunk, dimensão, bloco,
+map, reduce, síntese, chamada única) e o tamanho da entrada: extrações simples vão para um
+modelo Lite, as dimensões/blocos para Flash e a síntese integradora para Pro.
+A latência e o custo esperados de cada rota são registrados no log.
+
+Ativação via .env:
+    LLM_MODEL=auto        ou   MODEL_ROUTING=true
+
+Ajustes opcionais:
+    MODEL_TIER_LITE=gemini-2.5-flash-lite
+    MODEL_TIER_FLASH=gemini-2.5-flash
+    MODEL_TIER_PRO=gemini-2.5-pro
+    MODEL_ROUTES=framework.synthesis=flash,faq.chunk=flash   (sobrescreve a tabela)
+    MODEL_ROUTING_SMALL_TOKENS=8000     Dimensões/blocos de entradas menores descem para Lite
+    MODEL_ROUTING_LARGE_TOKENS=200000   Entradas maiores sobem de Lite para Flash
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+# Preço (USD por 1M tokens de entrada / saída) e desempenho aproximados por modelo:
+# latência até o primeiro token (s) e velocidade de geração (tokens/s).
+# Valores de referência para estimativas, não para cobrança.
+MODEL_PRICING = {
+    "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40, "first_token_s": 0.5, "tokens_per_s": 250},
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "first_token_s": 1.0, "tokens_per_s": 180},
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.00, "first_token_s": 3.0, "tokens_per_s": 90},
+    "gemini-3-pro": {"input": 2.00, "output": 12.00, "first_token_s": 4.0, "tokens_per_s": 80},
+}
+
+DEFAULT_TIERS = {
+    "lite": "gemini-2.5-flash-lite",
+    "flash": "gemini-2.5-flash",
+    "pro": "gemini-2.5-pro",
+}
+
+# Tier por (modo, etapa); "*" vale para qualquer modo
+DEFAULT_ROUTES = {
+    ("*", "synthesis"): "pro",
+    ("*", "dimension"): "flash",
+    ("*", "block"): "flash",
+    ("*", "map"): "lite",
+    ("*", "reduce"): "flash",
+    ("*", "chunk"): "lite",
+    ("*", "single"): "flash",
+    ("copywriting", "chunk"): "flash",
+}
+
+# Tokens de saída esperados por etapa (para estimar latência e custo)
+EXPECTED_OUTPUT_TOKENS = {
+    "synthesis": 3000,
+    "dimension": 2500,
+    "block": 2500,
+    "map": 1500,
+    "reduce": 2500,
+    "chunk": 1500,
+    "single": 20000,
+}
+
+
+def routing_enabled() -> bool:
+    """Roteamento ativo quando LLM_MODEL=auto ou MODEL_ROUTING=true."""
+    if os.environ.get("LLM_MODEL", "").strip().lower() == "auto":
+        return True
+    return os.environ.get("MODEL_ROUTING", "false").strip().lower() in ("1", "true", "yes", "sim")
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    """Custo estimado (USD) de uma chamada; 0.0 para modelos sem preço conhecido."""
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return (prompt_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
+
+
+def estimate_latency(model: str, output_tokens: int) -> float:
+    """Latência estimada (s) de uma chamada; 0.0 para modelos sem dados."""
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return pricing["first_token_s"] + output_tokens / pricing["tokens_per_s"]
+
+
+def _parse_routes(spec: str) -> Dict[Tuple[str, str], str]:
+    """Lê MODEL_ROUTES no formato 'modo.etapa=tier,...' (modo pode ser '*')."""
+    routes = {}
+    for item in spec.split(","):
+        if "=" not in item or "." not in item.split("=", 1)[0]:
+            continue
+        key, tier = item.split("=", 1)
+        mode, stage = key.strip().split(".", 1)
+        routes[(mode.strip(), stage.strip())] = tier.strip().lower()
+    return routes
+
+
+class ModelRouter:
+    """Escolhe o modelo de cada chamada a partir da tabela de rotas."""
+
+    def __init__(self):
+        env = os.environ.get
+        self.tiers = {
+            "lite": env("MODEL_TIER_LITE", DEFAULT_TIERS["lite"]),
+            "flash": env("MODEL_TIER_FLASH", DEFAULT_TIERS["flash"]),
+            "pro": env("MODEL_TIER_PRO", DEFAULT_TIERS["pro"]),
+        }
+        self.routes = dict(DEFAULT_ROUTES)
+        self.routes.update(_parse_routes(env("MODEL_ROUTES", "")))
+        self.small_tokens = int(env("MODEL_ROUTING_SMALL_TOKENS", "8000"))
+        self.large_tokens = int(env("MODEL_ROUTING_LARGE_TOKENS", "200000"))
+
+    def tier_for(self, mode: str, stage: str, prompt_tokens: int) -> str:
+        """Tier da rota, ajustado pelo tamanho da entrada."""
+        tier = self.routes.get((mode, stage)) or self.routes.get(("*", stage), "flash")
+
+        # Documentos pequenos não precisam de Flash para extrair uma dimensão/bloco;
+        # entradas muito longas saem do Lite. A síntese mantém o tier configurado.
+        if stage in ("dimension", "block") and tier == "flash" and prompt_tokens <= self.small_tokens:
+            tier = "lite"
+        elif stage != "synthesis" and tier == "lite" and prompt_tokens > self.large_tokens:
+            tier = "flash"
+        return tier
+
+    def route(self, mode: str, stage: str, prompt_tokens: int) -> str:
+        """Modelo da rota, registrando latência e custo esperados."""
+        tier = self.tier_for(mode, stage, prompt_tokens)
+        model = self.tiers.get(tier, self.tiers["flash"])
+
+        output_tokens = EXPECTED_OUTPUT_TOKENS.get(stage, 2000)
+        latency = estimate_latency(model, output_tokens)
+        cost = estimate_cost(model, prompt_tokens, output_tokens)
+        print(
+            f"🧭 Rota {mode}/{stage} → {model} [{tier}] "
+            f"(~{prompt_tokens} tokens, latência esperada ~{latency:.1f}s, custo esperado ~${cost:.4f})"
+        )
+        return model
+
+
+def route_model(mode: str, stage: str, prompt_tokens: int) -> Optional[str]:
+    """
+    Modelo para a chamada, ou None (= modelo padrão) se o roteamento estiver desligado.
+    """
+    if not routing_enabled():
+        return None
+    return ModelRouter().route(mode, stage, prompt_tokens)
@@ -3,21 +3,42 @@ import time
 import json
 from datetime import datetime
 from dotenv import load_dotenv
-import google.generativeai as genai
 from google.api_core.exceptions import DeadlineExceeded
 
 # Import from the sibling module
 try:
-    from .framework_processor import FrameworkProcessor, get_model
+    from .framework_processor import FrameworkProcessor
+    from .prompt_registry import get_prompt_registry
 except ImportError:
     # Fallback for when running as script
-    from framework_processor import FrameworkProcessor, get_model
+    from framework_processor import FrameworkProcessor
+    from prompt_registry import get_prompt_registry
 
 class N8NFrameworkProcessor(FrameworkProcessor):
     """
     Processador especializado para análise de workflows n8n (JSON).
     """
 
+    DIMENSIONS = [
+        (1, "VISÃO GERAL E ARQUITETURA"),
+        (2, "ANÁLISE DE DADOS E TRANSFORMAÇÃO"),
+        (3, "AUDITORIA DE NÓS E CONFIGURAÇÕES"),
+        (4, "TRATAMENTO DE ERROS E RESILIÊNCIA"),
+        (5, "PERFORMANCE E OTIMIZAÇÃO"),
+        (6, "ESCALABILIDADE E MANUTENÇÃO"),
+        (7, "PLANO DE MELHORIA E REFATORAÇÃO")
+    ]
+
+    START_MESSAGE = "🚀 INICIANDO ANÁLISE DE WORKFLOW N8N"
+    SUCCESS_MESSAGE = "✅ ANÁLISE DE WORKFLOW CONCLUÍDA!"
+    FAILURE_MESSAGE = "❌ ANÁLISE FALHOU."
+    CHECKPOINT_KIND = "n8n"
+    # Workflows JSON: sem recuperação de trechos
+    RETRIEVAL_KEYWORDS = {}
+    PROMPT_TEMPLATE = "prompt_n8n_framework.txt"
+    # Síntese própria (prompt diferente): sem modo de chamada única
+    SINGLE_CALL = False
+
     def __init__(self, json_content, output_language="pt"):
         """
         Args:
@@ -26,34 +47,16 @@ class N8NFrameworkProcessor(FrameworkProcessor):
         """
         super().__init__(json_content, output_language)
         
-    def load_framework_prompt(self):
-        """Carrega o prompt específico para n8n."""
-        # Ajuste o caminho conforme necessário, assumindo estrutura atual
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompt_path = os.path.join(base_path, 'config', 'prompts', 'prompt_n8n_framework.txt')
-        
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    def create_dimension_prompt(self, dimension_number, dimension_name):
+    def create_dimension_prompt(self, dimension_number, dimension_name, content=None):
         """
         Cria um prompt focado em uma dimensão específica para n8n.
         """
-        base_prompt = self.load_framework_prompt()
-        dimension_marker = f"# **DIMENSÃO {dimension_number}:"
-        next_dimension_marker = f"# **DIMENSÃO {dimension_number + 1}:"
-
-        start = base_prompt.find(dimension_marker)
-        if dimension_number < 7:
-            end = base_prompt.find(next_dimension_marker)
-        else:
-            # Última dimensão vai até SÍNTESE FINAL
-            end = base_prompt.find("# **SÍNTESE FINAL DO ESPECIALISTA**")
-
-        if start == -1:
-            raise ValueError(f"Dimensão {dimension_number} não encontrada no prompt")
+        # Em modo map-reduce o conteúdo é um trecho da transcrição
+        content = self.transcription if content is None else content
 
-        dimension_content = base_prompt[start:end if end != -1 else None]
+        dimension_content = get_prompt_registry().section(self.PROMPT_TEMPLATE, dimension_number)
+        if dimension_content is None:
+            raise ValueError(f"Dimensão {dimension_number} não encontrada no prompt")
 
         focused_prompt = f"""
 Você é um Arquiteto de Automação Sênior especializado em n8n.
@@ -77,7 +80,7 @@ Você é um Arquiteto de Automação Sênior especializado em n8n.
 
 **JSON DO(S) WORKFLOW(S) N8N PARA ANÁLISE**:
 
-{self.transcription}
+{content}
 
 ---
 
@@ -123,18 +126,13 @@ Você é um Arquiteto de Soluções Sênior.
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                current_model = get_model()
-                chat = current_model.start_chat(history=[])
-                response = chat.send_message(synthesis_prompt)
-
-                self.synthesis = response.text.strip()
+                self.synthesis = self.generate_stage("synthesis", synthesis_prompt, "synthesis")
                 print(f"✅ Síntese concluída ({len(self.synthesis)} caracteres)")
                 return self.synthesis
 
             except DeadlineExceeded:
                 if attempt < max_retries - 1:
                     print(f"⏳ Timeout - tentativa {attempt + 1}/{max_retries}")
-                    time.sleep(5)
                 else:
                     raise
             except Exception as e:
@@ -182,7 +180,7 @@ Você é um Arquiteto de Soluções Sênior.
 
 ## 📊 METADADOS DA ANÁLISE
 
-- **Modelo utilizado**: {os.environ.get("LLM_MODEL", "gemini-2.5-flash")}
+- **Modelo utilizado**: {self.models_used()}
 - **Timestamp**: {datetime.now().isoformat()}
 
 **🤖 Gerado automaticamente pelo N8N Framework Processor**
@@ -199,8 +197,9 @@ Você é um Arquiteto de Soluções Sênior.
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "language": self.output_language,
-                "model": os.environ.get("LLM_MODEL", "gemini-2.5-flash"),
-                "type": "n8n_analysis"
+                "model": self.models_used(),
+                "type": "n8n_analysis",
+                "stage_timings": self.stage_timings
             },
             "synthesis": self.synthesis,
             "dimensions": self.dimensions
@@ -209,53 +208,6 @@ Você é um Arquiteto de Soluções Sênior.
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, ensure_ascii=False, indent=2)
 
-    def process_complete_framework(self, output_path):
-        print("=" * 80)
-        print("🚀 INICIANDO ANÁLISE DE WORKFLOW N8N")
-        print("=" * 80)
-
-        dimensions_to_process = [
-            (1, "VISÃO GERAL E ARQUITETURA"),
-            (2, "ANÁLISE DE DADOS E TRANSFORMAÇÃO"),
-            (3, "AUDITORIA DE NÓS E CONFIGURAÇÕES"),
-            (4, "TRATAMENTO DE ERROS E RESILIÊNCIA"),
-            (5, "PERFORMANCE E OTIMIZAÇÃO"),
-            (6, "ESCALABILIDADE E MANUTENÇÃO"),
-            (7, "PLANO DE MELHORIA E REFATORAÇÃO")
-        ]
-
-        for dim_num, dim_name in dimensions_to_process:
-            try:
-                self.process_dimension(dim_num, dim_name)
-                if dim_num < 7:
-                    print("⏳ Aguardando 10s...")
-                    time.sleep(10)
-            except RuntimeError as e:
-                # Erro crítico (API Key, etc) - Aborta tudo
-                print(f"🛑 Processamento ABORTADO na dimensão {dim_num}: {e}")
-                print("⚠️  Verifique sua API KEY no arquivo .env")
-                # Remove arquivo parcial se existir? Talvez não.
-                print("❌ ANÁLISE FALHOU.")
-                return
-            except Exception as e:
-                print(f"❌ Erro ao processar dimensão {dim_num}: {e}")
-                continue
-
-        try:
-            self.synthesize_framework()
-        except RuntimeError as e:
-            print(f"🛑 Síntese ABORTADA: {e}")
-            return
-        except Exception as e:
-            print(f"❌ Erro na síntese: {e}")
-            self.synthesis = "Síntese não gerada devido a erro."
-
-        self.save_complete_framework(output_path)
-        
-        print("\n" + "=" * 80)
-        print("✅ ANÁLISE DE WORKFLOW CONCLUÍDA!")
-        print("=" * 80)
-
 
 def process_n8n_framework(json_input_path, output_language="pt"):
     """
@@ -285,7 +237,5 @@ def process_n8n_framework(json_input_path, output_language="pt"):
         return output_path
 
     processor = N8NFrameworkProcessor(formatted_json, output_language)
-    processor.process_complete_framework(output_path)
-
-    return output_path
+    return processor.process_complete_framework(output_path)
 
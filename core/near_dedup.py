@@ -0,0 +1,219 @@
+"""
+Detecção de quase-duplicatas com MinHash + LSH (Python puro).
+
+Canais repetem a mesma abertura/encerramento/patrocínio em todos os vídeos e
+cursos republicam aulas. Este índice guarda a assinatura MinHash de cada chunk
+e de cada transcrição processada (em data/cache/near_dup_index.jsonl, só com
+acréscimos) e permite:
+
+- reaproveitar a saída de um chunk quase idêntico a outro já processado;
+- pular transcrições inteiras quase idênticas a outra já processada.
+
+Configuração via .env:
+    NEAR_DUP_ENABLED=false        Desligado por padrão (transcrições puladas não geram saída própria)
+    NEAR_DUP_THRESHOLD=0.85       Similaridade mínima (Jaccard estimado) para chunks
+    NEAR_DUP_DOC_THRESHOLD=0.9    Similaridade mínima para transcrições inteiras
+"""
+
+import os
+import re
+import json
+import zlib
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from core.caption_cleanup import read_transcription
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Permutações fixas (semente constante): assinaturas são estáveis entre execuções
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+INDEX_PATH = os.path.join("data", "cache", "near_dup_index.jsonl")
+
+
+def near_dup_enabled() -> bool:
+    return os.environ.get("NEAR_DUP_ENABLED", "false").strip().lower() in ("1", "true", "yes", "sim")
+
+
+def shingles(text: str) -> set:
+    """Conjunto de hashes dos n-gramas de palavras (normalizadas) do texto."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: str) -> List[int]:
+    """Assinatura MinHash (NUM_PERM valores) do texto."""
+    values = shingles(text)
+    if not values:
+        return [_MAX_HASH] * NUM_PERM
+    return [
+        min(((a * v + b) % _MERSENNE_PRIME) & _MAX_HASH for v in values)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Jaccard estimado: fração de posições iguais nas assinaturas."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(signature: List[int]) -> List[str]:
+    return [
+        f"{band}:" + ",".join(str(v) for v in signature[band * ROWS:(band + 1) * ROWS])
+        for band in range(BANDS)
+    ]
+
+
+class NearDupIndex:
+    """
+    Índice LSH persistido em disco (JSONL: uma linha por entrada adicionada;
+    ao carregar, a última linha de cada chave prevalece).
+
+    Cada entrada tem uma chave, um namespace (ex.: tipo de prompt + idioma, já
+    que a saída depende dele), a assinatura e um payload livre (ex.: a saída).
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._buckets: Dict[str, List[str]] = {}
+        self._load()
+
+    @staticmethod
+    def _entry_id(namespace: str, key: str) -> str:
+        return f"{namespace}|{key}"
+
+    def _index_entry(self, entry_id: str, signature: List[int]):
+        for band_key in _band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(entry_id)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Linha incompleta (processo interrompido durante a escrita)
+                    continue
+                if len(record.get("sig", ())) != NUM_PERM:
+                    continue
+                self._entries[record["id"]] = {"sig": record["sig"], "payload": record.get("payload", {})}
+        for entry_id, entry in self._entries.items():
+            self._index_entry(entry_id, entry["sig"])
+
+    def _append(self, entry_id: str, entry: Dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        line = json.dumps({"id": entry_id, **entry}, ensure_ascii=False)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+    def query(
+        self,
+        signature: List[int],
+        namespace: str,
+        threshold: float,
+        exclude_key: Optional[str] = None,
+    ) -> Optional[Tuple[str, float, Dict]]:
+        """
+        Entrada mais parecida do namespace com similaridade >= threshold.
+
+        Returns:
+            (chave, similaridade, payload) ou None
+        """
+        exclude_id = self._entry_id(namespace, exclude_key) if exclude_key else None
+        prefix = f"{namespace}|"
+
+        with self._lock:
+            candidates = set()
+            for band_key in _band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+
+            best = None
+            for entry_id in candidates:
+                if not entry_id.startswith(prefix) or entry_id == exclude_id:
+                    continue
+                entry = self._entries[entry_id]
+                score = similarity(signature, entry["sig"])
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (entry_id[len(prefix):], score, entry.get("payload", {}))
+            return best
+
+    def add(self, key: str, signature: List[int], namespace: str, payload: Optional[Dict] = None):
+        """Adiciona (ou substitui) uma entrada e persiste o índice."""
+        entry_id = self._entry_id(namespace, key)
+        with self._lock:
+            previous = self._entries.get(entry_id)
+            if previous is not None:
+                for band_key in _band_keys(previous["sig"]):
+                    bucket = self._buckets.get(band_key, [])
+                    if entry_id in bucket:
+                        bucket.remove(entry_id)
+            self._entries[entry_id] = {"sig": signature, "payload": payload or {}}
+            self._index_entry(entry_id, signature)
+            self._append(entry_id, self._entries[entry_id])
+
+
+_index_lock = threading.Lock()
+_index: Optional[NearDupIndex] = None
+
+
+def get_near_dup_index() -> NearDupIndex:
+    """Retorna o índice global de quase-duplicatas."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDupIndex()
+    return _index
+
+
+def chunk_threshold() -> float:
+    return float(os.environ.get("NEAR_DUP_THRESHOLD", "0.85"))
+
+
+def doc_threshold() -> float:
+    return float(os.environ.get("NEAR_DUP_DOC_THRESHOLD", "0.9"))
+
+
+def find_duplicate_transcript(path: str, namespace: str):
+    """
+    Procura uma transcrição já processada (no mesmo namespace) quase idêntica
+    à do arquivo `path`.
+
+    Returns:
+        (nome do arquivo parecido ou None, similaridade, assinatura de `path`)
+    """
+    signature = minhash(read_transcription(path))
+    match = get_near_dup_index().query(
+        signature, namespace, doc_threshold(), exclude_key=os.path.basename(path)
+    )
+    if match is None:
+        return None, 0.0, signature
+    return match[0], match[1], signature
+
+
+def register_transcript(path: str, namespace: str, signature: List[int]):
+    """Registra uma transcrição processada para as próximas comparações."""
+    get_near_dup_index().add(os.path.basename(path), signature, namespace)
@@ -0,0 +1,168 @@
+"""
+Empacotamento de transcrições curtas em uma única requisição (faq/copywriting).
+
+Playlists com muitos vídeos de 3-5 minutos geram uma requisição por vídeo, cada
+uma com o prompt inteiro na frente: o prompt e a latência fixa da chamada
+dominam. No modo lote, as transcrições que caberiam num único chunk são
+agrupadas até um orçamento de tokens; cada uma vai entre delimitadores próprios
+(<<<DOC_n>>> ... <<<FIM DOC_n>>>) e o modelo responde um objeto JSON com uma
+chave por documento (response_schema), que é separado de volta em um arquivo de
+saída por vídeo, no mesmo caminho e formato de `process_transcription`.
+
+Documentos que faltarem (ou vierem vazios) na resposta são processados
+individualmente, como antes; um lote com um documento só também.
+
+Configuração via .env:
+    PACKING_MODE=off         off ou on
+    PACK_MAX_TOKENS=20000    Tokens de transcrição por requisição
+    PACK_MAX_DOCUMENTS=8     Documentos por requisição
+"""
+
+import os
+from typing import Callable, Dict, List, Optional
+
+from core.llm_backend import estimate_tokens
+from core.model_router import route_model
+from core.chunk_manifest import atomic_write_text
+from core.caption_cleanup import read_transcription
+from core.events import publish
+from core.usage import stage_scope, video_scope
+from core.structured import generate_sections
+from core.processing import CHUNK_SIZE, load_prompt, process_transcription, processed_output_path
+
+PACK_INSTRUCTIONS = """
+
+---
+
+**MODO LOTE**: abaixo há {count} documentos independentes, cada um entre os marcadores <<<ID>>> e <<<FIM ID>>> (ex.: <<<DOC_1>>> ... <<<FIM DOC_1>>>).
+Aplique as instruções acima a CADA documento separadamente, exatamente como faria se ele fosse enviado sozinho. Não misture conteúdo entre documentos.
+Responda com um objeto JSON cujas chaves são os identificadores ({ids}) e cujos valores são o resultado completo de cada documento, no mesmo formato de texto que você usaria para um único documento.
+"""
+
+
+def packing_enabled() -> bool:
+    return os.environ.get("PACKING_MODE", "off").strip().lower() in ("1", "on", "true", "yes", "sim")
+
+
+def build_packed_prompt(prompt: str, documents: Dict[str, str]) -> str:
+    """Prompt do lote: instruções originais + regras do lote + documentos delimitados."""
+    parts = [prompt + PACK_INSTRUCTIONS.format(count=len(documents), ids=", ".join(documents))]
+    for doc_id, text in documents.items():
+        parts.append(f"<<<{doc_id}>>>\n{text}\n<<<FIM {doc_id}>>>")
+    return "\n\n".join(parts)
+
+
+def packed_sections(doc_ids: List[str]) -> Dict[str, str]:
+    """Uma seção (propriedade obrigatória do JSON de resposta) por documento."""
+    return {doc_id: f"Resultado completo do documento {doc_id}" for doc_id in doc_ids}
+
+
+class TranscriptPacker:
+    """
+    Fila de transcrições curtas que são enviadas juntas.
+
+    `add` enfileira uma transcrição (ou recusa, se ela não for curta ou já
+    tiver saída/manifesto); quando o próximo documento não cabe no orçamento, o
+    lote atual é enviado. `flush` envia o que restou. `on_done(input_file)` é
+    chamado para cada transcrição concluída (ex.: registro de quase-duplicatas).
+    """
+
+    def __init__(
+        self,
+        prompt_type: str = "copywriting",
+        output_language: str = "pt",
+        max_tokens: Optional[int] = None,
+        max_documents: Optional[int] = None,
+        on_done: Optional[Callable[[str], None]] = None,
+    ):
+        self.prompt_type = prompt_type
+        self.output_language = output_language
+        self.max_tokens = max_tokens or int(os.environ.get("PACK_MAX_TOKENS", "20000"))
+        self.max_documents = max_documents or int(os.environ.get("PACK_MAX_DOCUMENTS", "8"))
+        self.on_done = on_done
+        self.prompt = load_prompt(prompt_type, output_language)
+        self.pending: List[Dict] = []
+        self.pending_tokens = 0
+        self.requests = 0
+
+    def add(self, input_file: str) -> bool:
+        """Enfileira a transcrição; False = deve ser processada individualmente."""
+        output_file = processed_output_path(input_file, self.prompt_type, self.output_language)
+        if os.path.exists(output_file) or os.path.exists(output_file + ".manifest.json"):
+            return False
+
+        text = read_transcription(input_file)
+        if not text.strip() or len(text) > CHUNK_SIZE:
+            return False
+
+        tokens = estimate_tokens(text)
+        if self.pending and (
+            self.pending_tokens + tokens > self.max_tokens or len(self.pending) >= self.max_documents
+        ):
+            self.flush()
+
+        self.pending.append({"input_file": input_file, "output_file": output_file, "text": text})
+        self.pending_tokens += tokens
+        return True
+
+    def flush(self):
+        """
+        Envia o lote pendente e grava uma saída por transcrição.
+
+        Não levanta exceções: falhas do lote caem para o processamento
+        individual, e falhas individuais são apenas registradas no log.
+        """
+        batch, self.pending, self.pending_tokens = self.pending, [], 0
+        if not batch:
+            return
+        if len(batch) == 1:
+            self._process_individually(batch[0])
+            return
+
+        documents = {f"DOC_{i}": item["text"] for i, item in enumerate(batch, 1)}
+        sources = [os.path.basename(item["input_file"]) for item in batch]
+        print(f"📦 Lote com {len(batch)} transcrições curtas ({sum(estimate_tokens(t) for t in documents.values())} tokens)")
+
+        video_ids = ",".join(os.path.splitext(source)[0] for source in sources)
+        with video_scope(video_ids), stage_scope(f"pack_{len(batch)}"):
+            try:
+                outputs = self._generate(documents)
+            except Exception as e:
+                print(f"⚠️  Lote falhou ({e}); processando as transcrições individualmente")
+                outputs = {}
+        self.requests += 1
+
+        for doc_id, item in zip(documents, batch):
+            output = outputs.get(doc_id)
+            if output is None:
+                print(f"⚠️  {os.path.basename(item['input_file'])} ausente na resposta do lote")
+                self._process_individually(item)
+                continue
+            os.makedirs(os.path.dirname(item["output_file"]), exist_ok=True)
+            atomic_write_text(item["output_file"], output + "\n\n")
+            print(f"✅ Transcrição processada (lote) salva em {item['output_file']}")
+            self._done(item["input_file"])
+
+        publish("pack_completed", sources=sources, recovered=sorted(outputs))
+
+    def _generate(self, documents: Dict[str, str]) -> Dict[str, str]:
+        prompt = build_packed_prompt(self.prompt, documents)
+        model = route_model(self.prompt_type, "chunk", estimate_tokens(prompt))
+        return generate_sections(prompt, packed_sections(list(documents)), model=model, max_retries=3)
+
+    def _process_individually(self, item: Dict):
+        # Um erro aqui não pode derrubar os outros documentos do lote
+        video_id = os.path.splitext(os.path.basename(item["input_file"]))[0]
+        self.requests += 1
+        try:
+            with video_scope(video_id):
+                process_transcription(item["input_file"], self.prompt_type, self.output_language)
+        except Exception as e:
+            print(f"❌ Erro ao processar {os.path.basename(item['input_file'])}: {e}")
+            return
+        if os.path.exists(item["output_file"]):
+            self._done(item["input_file"])
+
+    def _done(self, input_file: str):
+        if self.on_done:
+            self.on_done(input_file)
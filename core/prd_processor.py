@@ -3,15 +3,18 @@ import time
 import json
 from datetime import datetime
 from dotenv import load_dotenv
-import google.generativeai as genai
 from google.api_core.exceptions import DeadlineExceeded
 
 # Import from the sibling module
 try:
-    from .framework_processor import FrameworkProcessor, get_model
+    from .framework_processor import FrameworkProcessor
+    from .prompt_registry import get_prompt_registry
+    from .caption_cleanup import read_transcription
 except ImportError:
     # Fallback for when running as script
-    from framework_processor import FrameworkProcessor, get_model
+    from framework_processor import FrameworkProcessor
+    from prompt_registry import get_prompt_registry
+    from caption_cleanup import read_transcription
 
 class PRDProcessor(FrameworkProcessor):
     """
@@ -19,6 +22,39 @@ class PRDProcessor(FrameworkProcessor):
     baseados na metodologia BMAD.
     """
 
+    DIMENSIONS = [
+        (1, "ESCOPO E VISÃO DO PRODUTO"),
+        (2, "REQUISITOS FUNCIONAIS"),
+        (3, "ARQUITETURA TÉCNICA"),
+        (4, "UX/UI E FRONTEND"),
+        (5, "REQUISITOS NÃO-FUNCIONAIS E SEGURANÇA"),
+        (6, "PLANO DE IMPLEMENTAÇÃO"),
+        (7, "RISCOS E MITIGAÇÃO")
+    ]
+
+    START_MESSAGE = "🚀 INICIANDO CRIAÇÃO DE PRD (BMAD)"
+    SUCCESS_MESSAGE = "✅ PRD GERADO COM SUCESSO!"
+    FAILURE_MESSAGE = "❌ GERAÇÃO DE PRD FALHOU."
+    CHECKPOINT_KIND = "prd"
+    # Escopo e visão (1) precisam do material inteiro
+    RETRIEVAL_KEYWORDS = {
+        2: "funcionalidade recurso usuário tela cadastro fluxo deve permitir "
+           "feature user screen flow should allow requirement",
+        3: "arquitetura banco dados api servidor backend integração serviço stack "
+           "architecture database api server backend integration service stack",
+        4: "tela interface botão página layout design frontend experiência "
+           "screen interface button page layout design frontend experience",
+        5: "segurança desempenho performance escala disponibilidade privacidade autenticação "
+           "security performance scale availability privacy authentication",
+        6: "fase etapa sprint cronograma prazo entrega mvp primeiro depois "
+           "phase step sprint timeline deadline delivery mvp first then",
+        7: "risco problema cuidado falha dificuldade limitação "
+           "risk problem careful failure difficulty limitation",
+    }
+    PROMPT_TEMPLATE = "prompt_prd_bmad.txt"
+    # Síntese própria (prompt diferente): sem modo de chamada única
+    SINGLE_CALL = False
+
     def __init__(self, content, output_language="pt"):
         """
         Args:
@@ -27,33 +63,16 @@ class PRDProcessor(FrameworkProcessor):
         """
         super().__init__(content, output_language)
         
-    def load_framework_prompt(self):
-        """Carrega o prompt específico para PRD BMAD."""
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompt_path = os.path.join(base_path, 'config', 'prompts', 'prompt_prd_bmad.txt')
-        
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    def create_dimension_prompt(self, dimension_number, dimension_name):
+    def create_dimension_prompt(self, dimension_number, dimension_name, content=None):
         """
         Cria um prompt focado em uma dimensão específica do PRD.
         """
-        base_prompt = self.load_framework_prompt()
-        dimension_marker = f"# **DIMENSÃO {dimension_number}:"
-        next_dimension_marker = f"# **DIMENSÃO {dimension_number + 1}:"
-
-        start = base_prompt.find(dimension_marker)
-        if dimension_number < 7:
-            end = base_prompt.find(next_dimension_marker)
-        else:
-            # Última dimensão vai até SÍNTESE DO ARQUITETO
-            end = base_prompt.find("# **SÍNTESE DO ARQUITETO (Conclusão)**")
-
-        if start == -1:
-            raise ValueError(f"Dimensão {dimension_number} não encontrada no prompt")
+        # Em modo map-reduce o conteúdo é um trecho da transcrição
+        content = self.transcription if content is None else content
 
-        dimension_content = base_prompt[start:end if end != -1 else None]
+        dimension_content = get_prompt_registry().section(self.PROMPT_TEMPLATE, dimension_number)
+        if dimension_content is None:
+            raise ValueError(f"Dimensão {dimension_number} não encontrada no prompt")
 
         focused_prompt = f"""
 Você é um Product Manager Sênior e Arquiteto de Soluções especialista em metodologia BMAD.
@@ -77,7 +96,7 @@ Você é um Product Manager Sênior e Arquiteto de Soluções especialista em me
 
 **CONTEÚDO DE REFERÊNCIA (TRANSCRIÇÃO/DOCS/SITES)**:
 
-{self.transcription}
+{content}
 
 ---
 
@@ -123,11 +142,7 @@ Você é um CTO / VP de Engenharia avaliando um PRD recém-criado.
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                current_model = get_model()
-                chat = current_model.start_chat(history=[])
-                response = chat.send_message(synthesis_prompt)
-
-                self.synthesis = response.text.strip()
+                self.synthesis = self.generate_stage("synthesis", synthesis_prompt, "synthesis")
                 print(f"✅ Síntese concluída ({len(self.synthesis)} caracteres)")
                 return self.synthesis
 
@@ -179,7 +194,7 @@ Você é um CTO / VP de Engenharia avaliando um PRD recém-criado.
 ## 📊 METADADOS DO DOCUMENTO
 
 - **Metodologia**: BMAD (Building Multi-Agent Development)
-- **Modelo utilizado**: {os.environ.get("LLM_MODEL", "gemini-2.5-flash")}
+- **Modelo utilizado**: {self.models_used()}
 - **Timestamp**: {datetime.now().isoformat()}
 
 **🤖 Gerado automaticamente pelo PRD BMAD Processor**
@@ -196,8 +211,9 @@ Você é um CTO / VP de Engenharia avaliando um PRD recém-criado.
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "language": self.output_language,
-                "model": os.environ.get("LLM_MODEL", "gemini-2.5-flash"),
-                "type": "prd_bmad"
+                "model": self.models_used(),
+                "type": "prd_bmad",
+                "stage_timings": self.stage_timings
             },
             "synthesis": self.synthesis,
             "dimensions": self.dimensions
@@ -206,47 +222,6 @@ Você é um CTO / VP de Engenharia avaliando um PRD recém-criado.
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, ensure_ascii=False, indent=2)
 
-    def process_complete_framework(self, output_path):
-        print("=" * 80)
-        print("🚀 INICIANDO CRIAÇÃO DE PRD (BMAD)")
-        print("=" * 80)
-
-        dimensions_to_process = [
-            (1, "ESCOPO E VISÃO DO PRODUTO"),
-            (2, "REQUISITOS FUNCIONAIS"),
-            (3, "ARQUITETURA TÉCNICA"),
-            (4, "UX/UI E FRONTEND"),
-            (5, "REQUISITOS NÃO-FUNCIONAIS E SEGURANÇA"),
-            (6, "PLANO DE IMPLEMENTAÇÃO"),
-            (7, "RISCOS E MITIGAÇÃO")
-        ]
-
-        for dim_num, dim_name in dimensions_to_process:
-            try:
-                self.process_dimension(dim_num, dim_name)
-                if dim_num < 7:
-                    print("⏳ Aguardando 10s...")
-                    time.sleep(10)
-            except RuntimeError as e:
-                print(f"🛑 Processamento ABORTADO na dimensão {dim_num}: {e}")
-                print("⚠️  Verifique sua API KEY no arquivo .env")
-                print("❌ GERAÇÃO DE PRD FALHOU.")
-                return
-            except Exception as e:
-                print(f"❌ Erro ao processar dimensão {dim_num}: {e}")
-                continue
-
-        try:
-            self.synthesize_framework()
-        except Exception as e:
-             print(f"❌ Erro na síntese final: {e}")
-
-        self.save_complete_framework(output_path)
-        
-        print("\n" + "=" * 80)
-        print("✅ PRD GERADO COM SUCESSO!")
-        print("=" * 80)
-
 
 def process_prd_framework(input_path, output_language="pt"):
     """
@@ -257,8 +232,8 @@ def process_prd_framework(input_path, output_language="pt"):
     """
     # Lê conteúdo
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Legendas (.txt) passam pela limpeza; JSON/Markdown são lidos como estão
+        content = read_transcription(input_path)
     except Exception as e:
         print(f"❌ Erro ao ler arquivo {input_path}: {e}")
         raise
@@ -275,7 +250,5 @@ def process_prd_framework(input_path, output_language="pt"):
         return output_path
 
     processor = PRDProcessor(content, output_language)
-    processor.process_complete_framework(output_path)
-
-    return output_path
+    return processor.process_complete_framework(output_path)
 
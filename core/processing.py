@@ -1,82 +1,32 @@
 import os
-import time
 from dotenv import load_dotenv
-import google.generativeai as genai
-from google.api_core.exceptions import DeadlineExceeded
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+
+from core.llm_backend import get_backend, estimate_tokens
+from core.concurrency import QuotaRetry
+from core.model_router import route_model
+from core.model_resolver import get_model_resolver
+from core.chunk_manifest import ChunkManifest
+from core.prompt_registry import get_prompt_registry
+from core.caption_cleanup import read_transcription
+from core.events import publish
+from core.usage import stage_scope
+from core.near_dedup import near_dup_enabled, minhash, get_near_dup_index, chunk_threshold
 
 # Carrega as variáveis do .env
 load_dotenv()
 
-# Configura a API do Gemini usando a chave da API do .env
-genai.configure(api_key=os.environ["API_KEY"])
-
-# Cache do modelo válido
-_model_cache = None
-
 def get_available_models_simple():
-    """Lista modelos disponíveis."""
-    try:
-        models = list(genai.list_models())
-        return [
-            m.name.replace('models/', '') 
-            for m in models 
-            if 'generateContent' in m.supported_generation_methods
-        ]
-    except:
-        return []
-
-def get_model_instance():
-    """Obtém instância do modelo, criando se necessário."""
-    global _model_cache
-    
-    if _model_cache:
-        return _model_cache
-    
-    # Tenta modelo do .env primeiro
-    preferred = os.environ.get("LLM_MODEL", "").replace("models/", "").strip()
-    
-    # Lista modelos disponíveis
-    available = get_available_models_simple()
-    
-    # Modelos válidos conhecidos
-    valid_models = [
-        "gemini-2.5-flash",
-        "gemini-2.5-flash-lite", 
-        "gemini-2.5-pro",
-        "gemini-3-pro"
-    ]
-    
-    if available:
-        # Se tem preferido e está disponível (ou é um dos novos modelos), usa
-        if preferred and (preferred in available or preferred in valid_models):
-            model_name = preferred
-        # Senão, procura flash
-        elif any('flash' in m.lower() for m in available):
-            model_name = [m for m in available if 'flash' in m.lower()][0]
-        else:
-            model_name = available[0]
-        
-        _model_cache = genai.GenerativeModel(model_name)
-        print(f"🤖 Modelo configurado: {model_name}")
-        return _model_cache
-    else:
-        # Fallback: tenta modelos comuns
-        for model_name in valid_models:
-            try:
-                _model_cache = genai.GenerativeModel(model_name)
-                print(f"🤖 Modelo configurado (fallback): {model_name}")
-                return _model_cache
-            except:
-                continue
-        
-        # Último recurso: modelo padrão da biblioteca
-        _model_cache = genai.GenerativeModel()
-        return _model_cache
+    """Lista modelos disponíveis (catálogo em cache do resolvedor)."""
+    return get_model_resolver().available_models()
 
 # Variável global para compatibilidade
 model = None
 
-def split_text_into_chunks(transcription_text, max_chunk_size=10000):
+# Tamanho (caracteres) de cada chunk enviado ao modelo
+CHUNK_SIZE = 10000
+
+def split_text_into_chunks(transcription_text, max_chunk_size=CHUNK_SIZE):
     return [transcription_text[i:i+max_chunk_size] for i in range(0, len(transcription_text), max_chunk_size)]
 
 def load_prompt(prompt_type="copywriting", output_language="pt"):
@@ -90,13 +40,8 @@ def load_prompt(prompt_type="copywriting", output_language="pt"):
     Returns:
         str: Conteúdo do prompt com instruções de idioma
     """
-    if prompt_type == "faq":
-        prompt_path = os.path.join('config', 'prompts', 'faq.txt')
-    else:
-        prompt_path = os.path.join('config', 'prompts', 'copywriting.txt')
-
-    with open(prompt_path, 'r', encoding='utf-8') as file:
-        prompt_content = file.read()
+    template_name = "faq.txt" if prompt_type == "faq" else "copywriting.txt"
+    prompt_content = get_prompt_registry().text(template_name)
 
     # Adiciona instrução de idioma ao prompt
     language_instruction = {
@@ -106,65 +51,103 @@ def load_prompt(prompt_type="copywriting", output_language="pt"):
 
     return prompt_content + language_instruction.get(output_language, "")
 
-def interview_transcription_with_gemini(chunk, prompt):
-    current_model = get_model_instance()
-    chat = current_model.start_chat(
-        history=[
-            {"role": "user", "parts": prompt + "\n\n" + chunk}
-        ]
-    )
+def interview_transcription_with_gemini(chunk, prompt, prompt_type="copywriting"):
+    backend = get_backend()
+    history = [
+        {"role": "user", "parts": prompt + "\n\n" + chunk}
+    ]
+    # O texto vai no histórico e na mensagem: o modelo recebe o dobro de tokens
+    model = route_model(prompt_type, "chunk", 2 * estimate_tokens(prompt + "\n\n" + chunk))
     max_retries = 3
-    for attempt in range(max_retries):
+    quota = QuotaRetry()
+    attempt = 0
+    while True:
         try:
-            response = chat.send_message(prompt + "\n\n" + chunk)
+            response = backend.generate(prompt + "\n\n" + chunk, model=model, history=history)
             return response.text.strip()
         except DeadlineExceeded:
             if attempt < max_retries - 1:
                 print(f"Timeout ao processar chunk. Tentativa {attempt + 1} de {max_retries}...")
-                time.sleep(2)
             else:
                 raise
+        except ResourceExhausted:
+            # O controlador de concorrência já aplicou o recuo: a próxima chamada espera por ele.
+            # Só desiste depois das tentativas e de um período de cota inteiro
+            if quota.exhausted() and attempt >= max_retries - 1:
+                raise
+            print(f"Cota excedida (429) ao processar chunk. Tentativa {attempt + 1}...")
+        attempt += 1
+
+def processed_output_path(input_file, prompt_type="copywriting", output_language="pt"):
+    """Caminho da saída de `process_transcription` para uma transcrição."""
+    # Nome base preservando "_kome" ou "_pt" e adicionando tipo de prompt
+    base_name = os.path.basename(input_file).replace(".txt", f"_{prompt_type}_{output_language}_processed.txt")
+    return os.path.join('data', 'processed', base_name)
 
 def process_transcription(input_file, prompt_type="copywriting", output_language="pt"):
     """
     Processa uma transcrição já salva em `src/transcriptions`
     e gera a saída em `src/processed_transcriptions`.
 
+    Os chunks concluídos ficam num manifesto ao lado da saída; se a execução for
+    interrompida, a próxima processa apenas os chunks que faltam. Chunks quase
+    idênticos a outros já processados com o mesmo prompt (aberturas, patrocínios,
+    aulas republicadas) reaproveitam a saída anterior.
+
     Args:
         input_file: Caminho do arquivo de transcrição
         prompt_type: 'faq' ou 'copywriting'
         output_language: 'pt' ou 'en'
     """
-    output_dir = os.path.join('data', 'processed')
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Nome base preservando "_kome" ou "_pt" e adicionando tipo de prompt
-    base_name = os.path.basename(input_file).replace(".txt", f"_{prompt_type}_{output_language}_processed.txt")
-    output_file = os.path.join(output_dir, base_name)
+    output_file = processed_output_path(input_file, prompt_type, output_language)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
     # Verifica se já foi processado
     if os.path.exists(output_file):
         print(f"⏭️  Arquivo já processado: {output_file}")
         return
 
-    with open(input_file, 'r', encoding='utf-8') as file:
-        transcription_text = file.read()
+    transcription_text = read_transcription(input_file)
 
     chunks = split_text_into_chunks(transcription_text)
     prompt = load_prompt(prompt_type, output_language)
+    manifest = ChunkManifest(output_file, prompt)
 
+    use_near_dup = near_dup_enabled()
+    near_dup_index = get_near_dup_index() if use_near_dup else None
+    namespace = f"chunk:{manifest.prompt_hash[:16]}"
+    source_name = os.path.basename(input_file)
+
+    outputs = []
     for index, chunk in enumerate(chunks):
-        print(f"Processando chunk {index + 1}/{len(chunks)} de tamanho {len(chunk)} para {input_file}")
+        saved = manifest.get(index, chunk)
+        if saved is not None:
+            print(f"♻️  Chunk {index + 1}/{len(chunks)} já processado (manifesto)")
+            outputs.append(saved)
+            continue
+
+        if use_near_dup:
+            signature = minhash(chunk)
+            match = near_dup_index.query(signature, namespace, chunk_threshold())
+            if match:
+                match_key, score, payload = match
+                print(f"♻️  Chunk {index + 1}/{len(chunks)} quase idêntico a {match_key} ({score:.0%}) - saída reaproveitada")
+                manifest.record(index, chunk, payload["output"], len(chunks))
+                outputs.append(payload["output"])
+                continue
 
-        processed_chunk = interview_transcription_with_gemini(chunk, prompt)
+        print(f"Processando chunk {index + 1}/{len(chunks)} de tamanho {len(chunk)} para {input_file}")
 
-        with open(output_file, 'a', encoding='utf-8') as out_file:
-            out_file.write(processed_chunk + "\n\n")
+        with stage_scope(f"chunk_{index + 1}"):
+            processed_chunk = interview_transcription_with_gemini(chunk, prompt, prompt_type)
+        manifest.record(index, chunk, processed_chunk, len(chunks))
+        publish("chunk_completed", source=source_name, chunk=index + 1, total=len(chunks), text=processed_chunk)
+        outputs.append(processed_chunk)
 
-        if (index + 1) % 15 == 0:
-            print("Atingido o limite de 15 requisições por minuto. Aguardando 60 segundos...")
-            time.sleep(60)
+        if use_near_dup:
+            near_dup_index.add(f"{source_name}#{index + 1}", signature, namespace, {"output": processed_chunk})
 
+    manifest.finalize(outputs)
     print(f"✅ Transcrição processada salva em {output_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""
+Registro de templates de prompt (config/prompts/*.txt).
+
+Cada template é lido e indexado uma única vez: as seções numeradas
+(DIMENSÃO n / BLOCO n) ficam prontas para uso e cada template ganha um hash de
+versão, usado nas chaves de cache/checkpoint para que uma mudança no prompt
+invalide resultados antigos. O arquivo só é relido quando o seu mtime muda.
+O registro é compartilhado por todos os processadores (get_prompt_registry).
+"""
+
+import os
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'prompts')
+
+# Marcadores das seções numeradas: template -> (marcador da seção n, marcador do fim da última seção)
+SECTION_MARKERS = {
+    "prompt_framework.txt": ("# **DIMENSÃO {n}:", "# **RECURSOS COMPLEMENTARES**"),
+    "prompt_n8n_framework.txt": ("# **DIMENSÃO {n}:", "# **SÍNTESE FINAL DO ESPECIALISTA**"),
+    "prompt_prd_bmad.txt": ("# **DIMENSÃO {n}:", "# **SÍNTESE DO ARQUITETO (Conclusão)**"),
+    "agent_builder.txt": ("## BLOCO {n}:", "# INSTRUÇÕES DE FORMATAÇÃO"),
+}
+
+
+@dataclass
+class PromptTemplate:
+    """Template carregado, com suas seções indexadas por número."""
+    name: str
+    text: str
+    mtime: float
+    version: str
+    sections: Dict[int, str] = field(default_factory=dict)
+
+
+def parse_sections(text, section_marker, end_marker):
+    """
+    Indexa as seções numeradas do template.
+
+    A seção n vai do seu marcador até o marcador da seção n + 1; a última vai
+    até `end_marker` (ou até o fim do texto, se ele não existir).
+    """
+    sections = {}
+    n = 1
+    start = text.find(section_marker.format(n=n))
+    while start != -1:
+        next_start = text.find(section_marker.format(n=n + 1))
+        end = next_start if next_start != -1 else text.find(end_marker)
+        sections[n] = text[start:end if end != -1 else None]
+        n += 1
+        start = next_start
+    return sections
+
+
+class PromptRegistry:
+    """Cache thread-safe de templates de prompt, recarregados por mtime."""
+
+    def __init__(self, prompts_dir=PROMPTS_DIR):
+        self.prompts_dir = prompts_dir
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name, path, mtime):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+        sections = {}
+        if name in SECTION_MARKERS:
+            sections = parse_sections(text, *SECTION_MARKERS[name])
+
+        return PromptTemplate(
+            name=name,
+            text=text,
+            mtime=mtime,
+            version=hashlib.sha256(text.encode('utf-8')).hexdigest()[:12],
+            sections=sections
+        )
+
+    def get(self, name) -> PromptTemplate:
+        """Retorna o template `name`, relendo o arquivo só se ele mudou."""
+        path = os.path.join(self.prompts_dir, name)
+        mtime = os.path.getmtime(path)
+
+        with self._lock:
+            template = self._templates.get(name)
+            if template is None or template.mtime != mtime:
+                template = self._load(name, path, mtime)
+                self._templates[name] = template
+            return template
+
+    def text(self, name) -> str:
+        """Conteúdo completo do template."""
+        return self.get(name).text
+
+    def section(self, name, number) -> Optional[str]:
+        """Seção numerada do template (None se não existir)."""
+        return self.get(name).sections.get(number)
+
+    def version(self, name) -> str:
+        """Hash curto do conteúdo atual do template."""
+        return self.get(name).version
+
+
+_registry_lock = threading.Lock()
+_registry: Optional[PromptRegistry] = None
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Retorna o registro global de prompts."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry()
+    return _registry
@@ -0,0 +1,143 @@
+"""
+Limitador de taxa global para chamadas ao LLM.
+
+Substitui as pausas fixas espalhadas pelos processadores por uma janela deslizante
+de requisições por minuto (RPM) e, opcionalmente, tokens por minuto (TPM),
+compartilhada por todas as threads do processo.
+
+Configuração via .env:
+    LLM_RPM=15     Requisições por minuto (0 = sem limite)
+    LLM_TPM=0      Tokens de entrada por minuto (0 = sem limite)
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Limitador de janela deslizante (thread-safe).
+
+    `acquire()` bloqueia até que a requisição caiba na janela de `period` segundos.
+    `clock` permite usar o relógio de parede (time.time) quando a janela é
+    compartilhada entre processos (ver core/key_pool.py).
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, period: float = 60.0, clock=time.monotonic):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.period = period
+        self.clock = clock
+        self._requests = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._requests and now - self._requests[0][0] >= self.period:
+            _, tokens = self._requests.popleft()
+            self._tokens_in_window -= tokens
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Tempo até haver espaço na janela (0 = pode enviar agora)."""
+        self._prune(now)
+        wait = 0.0
+
+        if self.rpm and len(self._requests) >= self.rpm:
+            oldest = self._requests[len(self._requests) - self.rpm][0]
+            wait = max(wait, oldest + self.period - now)
+
+        if self.tpm and self._requests and self._tokens_in_window + tokens > self.tpm:
+            # Libera requisições antigas até caber (ou até esvaziar a janela)
+            freed = self._tokens_in_window + tokens - self.tpm
+            for timestamp, request_tokens in self._requests:
+                freed -= request_tokens
+                if freed <= 0:
+                    wait = max(wait, timestamp + self.period - now)
+                    break
+            else:
+                # Requisição maior que o TPM: espera a janela esvaziar
+                wait = max(wait, self._requests[-1][0] + self.period - now)
+
+        return wait
+
+    def headroom(self) -> float:
+        """
+        Fração livre da janela atual (1.0 = ociosa, 0.0 = esgotada).
+        """
+        with self._lock:
+            self._prune(self.clock())
+            fractions = [1.0]
+            if self.rpm:
+                fractions.append(1 - len(self._requests) / self.rpm)
+            if self.tpm:
+                fractions.append(1 - self._tokens_in_window / self.tpm)
+            return max(0.0, min(fractions))
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Registra a requisição se houver espaço agora; não bloqueia."""
+        with self._lock:
+            now = self.clock()
+            if self._wait_time(now, tokens) > 0:
+                return False
+            self._requests.append((now, tokens))
+            self._tokens_in_window += tokens
+            return True
+
+    def wait_time(self, tokens: int = 0) -> float:
+        """Segundos até a requisição caber na janela (0 = pode enviar agora)."""
+        with self._lock:
+            return self._wait_time(self.clock(), tokens)
+
+    def snapshot(self):
+        """Requisições da janela atual, serializáveis: [[timestamp, tokens], ...]."""
+        with self._lock:
+            self._prune(self.clock())
+            return [[timestamp, tokens] for timestamp, tokens in self._requests]
+
+    def restore(self, requests):
+        """Substitui a janela pelas requisições de `snapshot()` (de outro processo)."""
+        with self._lock:
+            self._requests = deque((timestamp, tokens) for timestamp, tokens in requests)
+            self._tokens_in_window = sum(tokens for _, tokens in self._requests)
+
+    def acquire(self, tokens: int = 0):
+        """Bloqueia até poder enviar uma requisição com `tokens` tokens."""
+        if not self.rpm and not self.tpm:
+            return
+
+        while True:
+            with self._lock:
+                now = self.clock()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._requests.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+            time.sleep(min(wait, 1.0))
+
+
+_limiter_lock = threading.Lock()
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Retorna o limitador global, criado a partir de LLM_RPM / LLM_TPM."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    rpm=int(os.environ.get("LLM_RPM", "15")),
+                    tpm=int(os.environ.get("LLM_TPM", "0")),
+                )
+    return _limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Substitui o limitador global (None = recria a partir do .env)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
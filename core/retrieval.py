@@ -0,0 +1,214 @@
+"""
+Recuperação de trechos relevantes (BM25) para prompts de dimensão/bloco.
+
+Por padrão cada dimensão/bloco recebe a transcrição inteira. No modo de
+recuperação, a transcrição é dividida em passagens e indexada uma única vez
+(BM25, em memória); cada etapa recebe apenas as passagens mais relevantes para
+o seu "perfil de consulta" (nome da dimensão + palavras-chave + a seção do
+prompt), até um orçamento de tokens, na ordem original do texto.
+
+O índice é esparso: para cada termo, uma lista de postings em `array`
+(passagem, frequência). Com NumPy disponível, a pontuação é vetorizada sobre
+esses mesmos buffers (sem cópia); sem NumPy, cai para um laço em Python puro.
+
+Configuração via .env:
+    RETRIEVAL_MODE=off              off, on ou auto (liga acima de RETRIEVAL_MIN_TOKENS)
+    RETRIEVAL_MIN_TOKENS=30000
+    RETRIEVAL_PASSAGE_TOKENS=500    Tamanho de cada passagem indexada
+    RETRIEVAL_BUDGET_TOKENS=12000   Tokens de transcrição por etapa
+    RETRIEVAL_TOP_K=30              Máximo de passagens por etapa
+"""
+
+import os
+import re
+import math
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+
+from core.llm_backend import estimate_tokens
+from core.map_reduce import split_text_by_tokens
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Termo sintético para números: dimensões como "NÚMEROS E FÓRMULAS" o consultam
+NUMBER_TERM = "__num__"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+STOPWORDS = set("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas para pra com sem
+que se e ou mas como mais menos muito muita muitos muitas ja nao sim eu tu ele ela nos vos eles elas voce
+voces isso isto aquilo esse essa este esta esses essas estes estas aquele aquela ao aos sua seu suas seus
+meu minha tem ter ser foi era sao vai vou entao tambem aqui ali la quando onde porque qual quais
+the a an of to in on at for with without and or but is are was were be been it this that these those
+you your we our they their i my he she his her as by from so if then than there here what which who
+""".split())
+
+
+def retrieval_enabled(text: str) -> bool:
+    """Decide se as etapas devem receber apenas os trechos recuperados."""
+    mode = os.environ.get("RETRIEVAL_MODE", "off").strip().lower()
+    if mode == "on":
+        return True
+    if mode != "auto":
+        return False
+    return estimate_tokens(text) > int(os.environ.get("RETRIEVAL_MIN_TOKENS", "30000"))
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos normalizados (minúsculas, sem acentos, sem stopwords; números viram NUMBER_TERM também)."""
+    terms = []
+    for token in _TOKEN_RE.findall(_strip_accents(text.lower())):
+        if token.isdigit() or any(c.isdigit() for c in token):
+            terms.append(NUMBER_TERM)
+            terms.append(token)
+        elif len(token) > 2 and token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+def split_passages(text: str, passage_tokens: int) -> List[str]:
+    """Passagens de até `passage_tokens`, quebrando em fim de frase."""
+    return [p.strip() for p in split_text_by_tokens(_SENTENCE_END_RE.sub("\n", text), passage_tokens) if p.strip()]
+
+
+class BM25Index:
+    """
+    Índice BM25 esparso sobre as passagens de um texto.
+
+    Para cada termo: `doc_ids` (array de inteiros) e `tfs` (array de floats),
+    alinhados. O comprimento de cada passagem fica em `doc_lengths`.
+    """
+
+    def __init__(self, passages: List[str]):
+        self.passages = passages
+        self.doc_lengths = array("f")
+        postings: Dict[str, Dict[int, int]] = {}
+
+        for doc_id, passage in enumerate(passages):
+            terms = tokenize(passage)
+            self.doc_lengths.append(len(terms))
+            for term in terms:
+                counts = postings.setdefault(term, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        self.avg_length = (sum(self.doc_lengths) / len(passages)) if passages else 0.0
+        self.doc_ids: Dict[str, array] = {}
+        self.tfs: Dict[str, array] = {}
+        self.idf: Dict[str, float] = {}
+        total = len(passages)
+        for term, counts in postings.items():
+            self.doc_ids[term] = array("i", counts.keys())
+            self.tfs[term] = array("f", counts.values())
+            df = len(counts)
+            self.idf[term] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        """Pontuação BM25 de cada passagem para a consulta."""
+        query_terms = {}
+        for term in tokenize(query):
+            if term in self.idf:
+                query_terms[term] = query_terms.get(term, 0) + 1
+
+        if NUMPY_AVAILABLE:
+            return self._scores_numpy(query_terms).tolist()
+        return self._scores_python(query_terms)
+
+    def _scores_numpy(self, query_terms):
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(self.avg_length, 1e-9))
+        scores = np.zeros(len(self.passages), dtype=np.float64)
+        for term, weight in query_terms.items():
+            doc_ids = np.frombuffer(self.doc_ids[term], dtype=np.int32)
+            tfs = np.frombuffer(self.tfs[term], dtype=np.float32)
+            # Termos repetidos na consulta pesam mais (perfil com ênfase)
+            scores[doc_ids] += weight * self.idf[term] * tfs * (BM25_K1 + 1) / (tfs + norm[doc_ids])
+        return scores
+
+    def _scores_python(self, query_terms):
+        scores = [0.0] * len(self.passages)
+        avg = max(self.avg_length, 1e-9)
+        for term, weight in query_terms.items():
+            idf = self.idf[term]
+            for doc_id, tf in zip(self.doc_ids[term], self.tfs[term]):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg)
+                scores[doc_id] += weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+
+class TranscriptRetriever:
+    """
+    Seleciona, para cada etapa, as passagens mais relevantes dentro de um
+    orçamento de tokens (índice construído uma vez por transcrição).
+    """
+
+    def __init__(
+        self,
+        text: str,
+        passage_tokens: Optional[int] = None,
+        budget_tokens: Optional[int] = None,
+        top_k: Optional[int] = None,
+    ):
+        env = os.environ.get
+        self.passage_tokens = passage_tokens or int(env("RETRIEVAL_PASSAGE_TOKENS", "500"))
+        self.budget_tokens = budget_tokens or int(env("RETRIEVAL_BUDGET_TOKENS", "12000"))
+        self.top_k = top_k or int(env("RETRIEVAL_TOP_K", "30"))
+        self.total_tokens = estimate_tokens(text)
+        self.index = BM25Index(split_passages(text, self.passage_tokens))
+
+    def select(self, query: str) -> List[int]:
+        """Índices das passagens escolhidas (ordem original do texto)."""
+        scores = self.index.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+        chosen, used = [], 0
+        for doc_id in ranked[:self.top_k]:
+            if scores[doc_id] <= 0 and chosen:
+                break
+            tokens = estimate_tokens(self.index.passages[doc_id])
+            if used + tokens > self.budget_tokens and chosen:
+                continue
+            chosen.append(doc_id)
+            used += tokens
+        return sorted(chosen)
+
+    def context_for(self, query: str, label: str = "") -> str:
+        """Texto com as passagens recuperadas, separadas por [...] onde há lacunas."""
+        chosen = self.select(query)
+        parts = []
+        previous = None
+        for doc_id in chosen:
+            if previous is not None and doc_id != previous + 1:
+                parts.append("[...]")
+            parts.append(self.index.passages[doc_id])
+            previous = doc_id
+
+        context = "\n\n".join(parts)
+        print(
+            f"🔎 {label or 'Recuperação'}: {len(chosen)}/{len(self.index.passages)} trechos, "
+            f"~{estimate_tokens(context)} de {self.total_tokens} tokens"
+        )
+        return context
+
+
+def with_excerpt_note(prompt: str) -> str:
+    """Avisa o modelo de que o conteúdo são trechos selecionados, não o material inteiro."""
+    note = (
+        "**ATENÇÃO**: o conteúdo para análise abaixo são TRECHOS SELECIONADOS do material "
+        "(os mais relevantes para esta tarefa, na ordem original; [...] indica partes omitidas). "
+        "Extraia o que está nesses trechos e NÃO invente o que foi omitido.\n"
+    )
+    return note + prompt
@@ -0,0 +1,146 @@
+"""
+Execução de etapas (stages) como um pequeno DAG.
+
+Usado pelos processadores multi-stage: as dimensões/blocos independentes rodam em
+paralelo (limitados pelo rate limiter global do backend de LLM) e a síntese roda
+quando todas as suas dependências terminam. O tempo de cada etapa é registrado.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from core.events import submit_with_context
+from core.usage import stage_scope
+
+
+@dataclass
+class Stage:
+    """
+    Uma etapa do DAG.
+
+    Args:
+        stage_id: Identificador único da etapa
+        func: Função sem argumentos executada pela etapa
+        depends_on: IDs das etapas que precisam terminar antes (com sucesso ou não)
+    """
+    stage_id: str
+    func: Callable[[], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageResult:
+    """Resultado e tempos de uma etapa."""
+    stage_id: str
+    status: str = "pending"  # pending, done, failed, cancelled
+    result: Any = None
+    error: Optional[BaseException] = None
+    started_at: Optional[str] = None
+    duration: float = 0.0
+
+    def timing(self) -> Dict:
+        """Resumo serializável (para metadados em JSON)."""
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration, 3),
+            "error": str(self.error) if self.error else None,
+        }
+
+
+class StageScheduler:
+    """
+    Executa etapas respeitando dependências, com até `max_workers` em paralelo.
+
+    Erros de uma etapa ficam registrados no seu StageResult e não impedem as
+    etapas dependentes. Exceções dos tipos em `abort_on` (ex.: RuntimeError de API
+    key inválida) cancelam tudo o que ainda não começou e são relançadas.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        abort_on: Tuple[Type[BaseException], ...] = (RuntimeError,),
+        on_stage_done: Optional[Callable[[StageResult], None]] = None,
+    ):
+        self.max_workers = max_workers or int(os.environ.get("STAGE_MAX_WORKERS", "7"))
+        self.abort_on = abort_on
+        self.on_stage_done = on_stage_done
+
+    @staticmethod
+    def _validate(stages: List[Stage]):
+        ids = [stage.stage_id for stage in stages]
+        if len(ids) != len(set(ids)):
+            raise ValueError("IDs de etapa duplicados no DAG")
+        known = set(ids)
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in known]
+            if missing:
+                raise ValueError(f"Etapa '{stage.stage_id}' depende de etapas inexistentes: {missing}")
+
+    def _run_stage(self, stage: Stage, result: StageResult):
+        result.started_at = datetime.now().isoformat()
+        start = time.monotonic()
+        try:
+            with stage_scope(stage.stage_id):
+                result.result = stage.func()
+            result.status = "done"
+        except Exception as e:
+            result.error = e
+            result.status = "failed"
+        finally:
+            result.duration = time.monotonic() - start
+        return result
+
+    def run(self, stages: List[Stage]) -> Dict[str, StageResult]:
+        """
+        Executa o DAG e retorna os resultados por ID de etapa (na ordem declarada).
+        """
+        self._validate(stages)
+
+        results = {stage.stage_id: StageResult(stage.stage_id) for stage in stages}
+        pending = list(stages)
+        finished = set()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Dispara todas as etapas cujas dependências já terminaram
+                ready = [s for s in pending if all(dep in finished for dep in s.depends_on)]
+                for stage in ready:
+                    pending.remove(stage)
+                    # Propaga o contexto (ex.: job atual dos eventos) para a thread da etapa
+                    future = submit_with_context(executor, self._run_stage, stage, results[stage.stage_id])
+                    running[future] = stage
+
+                if not running:
+                    # Dependência cíclica: nada pode mais rodar
+                    raise ValueError(
+                        f"Dependências cíclicas entre etapas: {[s.stage_id for s in pending]}"
+                    )
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    result = future.result()
+                    finished.add(stage.stage_id)
+
+                    if self.on_stage_done:
+                        self.on_stage_done(result)
+
+                    if result.error is not None and isinstance(result.error, self.abort_on):
+                        for other in pending:
+                            results[other.stage_id].status = "cancelled"
+                        for other_future, other_stage in running.items():
+                            if other_future.cancel():
+                                results[other_stage.stage_id].status = "cancelled"
+                            elif self.on_stage_done:
+                                # Já em execução: espera terminar para não perder o resultado
+                                self.on_stage_done(other_future.result())
+                        raise result.error
+
+        return results
@@ -0,0 +1,139 @@
+"""
+Geração em streaming com saída parcial em disco.
+
+As etapas longas (dimensões, blocos, sínteses) não esperam mais a resposta
+completa: cada trecho recebido é acrescentado a um arquivo parcial (ao lado do
+checkpoint) e publicado como evento de progresso do job (core/events.py).
+
+Se o streaming cair no meio (timeout, 503, conexão), a geração continua a partir
+do texto parcial: o modelo recebe o prompt original + o que já foi escrito e
+completa apenas o restante. Como o parcial fica em disco, até uma retentativa em
+outro processo retoma do mesmo ponto.
+
+Configuração via .env:
+    LLM_STREAMING=true
+    STREAM_MAX_CONTINUATIONS=2     Continuações seguidas após quedas do streaming
+    STREAM_EVENT_INTERVAL=0.5      Intervalo mínimo (s) entre eventos de texto
+"""
+
+import os
+import time
+import threading
+from typing import Optional
+
+from google.api_core.exceptions import DeadlineExceeded, ServiceUnavailable
+
+from core.llm_backend import get_backend
+from core.events import publish
+
+# Quedas de streaming que valem uma continuação imediata
+STREAM_BREAK_ERRORS = (DeadlineExceeded, ServiceUnavailable, ConnectionError)
+
+CONTINUATION_TEMPLATE = """{prompt}
+
+---
+
+**ATENÇÃO**: a resposta abaixo foi interrompida no meio. Continue EXATAMENTE do ponto onde ela parou, sem repetir, resumir ou reiniciar o que já foi escrito.
+
+**RESPOSTA INTERROMPIDA**:
+
+{partial}"""
+
+
+def streaming_enabled() -> bool:
+    return os.environ.get("LLM_STREAMING", "true").strip().lower() in ("1", "true", "yes", "sim")
+
+
+class PartialOutput:
+    """
+    Texto parcial de uma etapa: arquivo em disco + eventos de progresso.
+
+    Os eventos de texto são agrupados (no máximo um a cada `event_interval`
+    segundos) para não gerar uma linha por token.
+    """
+
+    def __init__(self, path: str, stage: str, event_interval: Optional[float] = None):
+        self.path = path
+        self.stage = stage
+        self.event_interval = (
+            event_interval if event_interval is not None
+            else float(os.environ.get("STREAM_EVENT_INTERVAL", "0.5"))
+        )
+        self._lock = threading.Lock()
+        self._pending = ""
+        self._last_event = 0.0
+        self.text = self._load()
+
+    def _load(self) -> str:
+        if not os.path.exists(self.path):
+            return ""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def append(self, piece: str):
+        with self._lock:
+            if not self.text:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(piece)
+            self.text += piece
+            self._pending += piece
+            if time.monotonic() - self._last_event >= self.event_interval:
+                self._flush_event()
+
+    def _flush_event(self):
+        if self._pending:
+            publish("stream", stage=self.stage, text=self._pending, chars=len(self.text))
+            self._pending = ""
+        self._last_event = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_event()
+
+    def discard(self):
+        """Remove o parcial (a etapa terminou e o resultado já está no checkpoint)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def stream_generate(prompt: str, partial_path: str, stage: str, model: Optional[str] = None) -> str:
+    """
+    Gera a resposta do prompt em streaming, gravando o parcial em `partial_path`.
+
+    Um parcial já existente (queda anterior) é retomado por continuação. Quedas
+    do streaming com texto parcial geram até STREAM_MAX_CONTINUATIONS
+    continuações imediatas; depois disso o erro é repassado (o parcial fica em
+    disco para a próxima tentativa).
+
+    Returns:
+        str: Texto completo (parcial + continuação)
+    """
+    backend = get_backend()
+    if not streaming_enabled():
+        return backend.generate(prompt, model=model).text
+
+    partial = PartialOutput(partial_path, stage)
+    max_continuations = int(os.environ.get("STREAM_MAX_CONTINUATIONS", "2"))
+    publish("stage_started", stage=stage, resumed_chars=len(partial.text))
+    if partial.text:
+        print(f"↪️  {stage}: retomando de {len(partial.text)} caracteres já gerados")
+
+    continuations = 0
+    while True:
+        request = CONTINUATION_TEMPLATE.format(prompt=prompt, partial=partial.text) if partial.text else prompt
+        try:
+            backend.generate(request, model=model, on_text=partial.append)
+            break
+        except STREAM_BREAK_ERRORS as e:
+            partial.flush()
+            if not partial.text or continuations >= max_continuations:
+                raise
+            continuations += 1
+            print(f"↪️  {stage}: streaming interrompido ({e}); continuando de {len(partial.text)} caracteres")
+
+    partial.flush()
+    publish("stage_completed", stage=stage, chars=len(partial.text))
+    text = partial.text
+    partial.discard()
+    return text
@@ -0,0 +1,137 @@
+"""
+Respostas estruturadas (JSON) do LLM, com uma seção de texto por chave.
+
+Usado pelo modo lote (core/packing.py: uma chave por documento) e pelo modo de
+chamada única dos processadores de framework e de agent builder: para entradas
+curtas, as 7 dimensões/blocos e a síntese vêm numa só resposta
+(response_mime_type/response_schema) em vez de 8 chamadas. As seções inválidas
+(ausentes, vazias ou de tipo errado) são descartadas e refeitas pelo caminho
+normal, uma a uma. Seções com esquema próprio (`schemas`, ex.: blocos com itens
+tipados do agent builder) vêm como objeto JSON em vez de texto.
+
+Configuração via .env:
+    SINGLE_CALL_MODE=off            off ou on (vale só abaixo de SINGLE_CALL_MAX_TOKENS)
+    SINGLE_CALL_MAX_TOKENS=12000    Tamanho máximo (tokens) da entrada no modo de chamada única
+"""
+
+import os
+import json
+from typing import Dict, Iterable, Optional
+
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+
+from core.llm_backend import get_backend, estimate_tokens
+
+SINGLE_CALL_TEMPLATE = """{prompt}
+
+---
+
+**MODO CHAMADA ÚNICA**: produza TODAS as seções abaixo numa única resposta, em um objeto JSON com exatamente estas chaves. O valor de cada chave é o texto completo da seção (Markdown), ou o objeto JSON quando a descrição pedir, com o mesmo nível de detalhe que você teria se ela fosse pedida sozinha:
+
+{sections}
+
+---
+
+**CONTEÚDO PARA ANÁLISE**:
+
+{content}
+"""
+
+
+def single_call_enabled(text: str) -> bool:
+    """Modo de chamada única ligado e entrada abaixo do limite de tokens."""
+    mode = os.environ.get("SINGLE_CALL_MODE", "off").strip().lower()
+    if mode not in ("1", "on", "true", "yes", "sim"):
+        return False
+    return estimate_tokens(text) <= int(os.environ.get("SINGLE_CALL_MAX_TOKENS", "12000"))
+
+
+def sections_generation_config(sections: Dict[str, str], schemas: Optional[Dict[str, Dict]] = None) -> Dict:
+    """
+    Resposta JSON com uma propriedade obrigatória por seção (chave → descrição):
+    texto, ou o objeto de `schemas[chave]` quando houver.
+    """
+    schemas = schemas or {}
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": {
+            "type": "object",
+            "properties": {
+                key: {**schemas[key], "description": description} if key in schemas
+                else {"type": "string", "description": description}
+                for key, description in sections.items()
+            },
+            "required": list(sections),
+        },
+    }
+
+
+def parse_json_object(text: str) -> Optional[Dict]:
+    """Objeto JSON da resposta (tolera cercas ```json), ou None se inválido."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(cleaned)
+    except ValueError as e:
+        print(f"⚠️  Resposta não é um JSON válido: {e}")
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def valid_sections(data: Optional[Dict], keys: Iterable[str], schemas: Optional[Dict[str, Dict]] = None) -> Dict:
+    """Seções válidas entre as chaves pedidas: texto não vazio, ou objeto nas que têm esquema."""
+    if not data:
+        return {}
+    schemas = schemas or {}
+    valid = {}
+    for key in keys:
+        value = data.get(key)
+        if key in schemas:
+            if isinstance(value, dict):
+                valid[key] = value
+        elif isinstance(value, str) and value.strip():
+            valid[key] = value.strip()
+    return valid
+
+
+def generate_sections(
+    prompt: str,
+    sections: Dict[str, str],
+    model: Optional[str] = None,
+    max_retries: int = 2,
+    schemas: Optional[Dict[str, Dict]] = None,
+) -> Dict:
+    """
+    Gera todas as seções numa chamada com resposta JSON.
+
+    Args:
+        schemas: chave → esquema de objeto, para as seções que não são texto
+
+    Returns:
+        Dict: Apenas as seções válidas (as demais ficam para o caminho normal);
+        texto, ou o objeto nas seções com esquema
+    """
+    config = sections_generation_config(sections, schemas)
+    for attempt in range(max_retries):
+        try:
+            response = get_backend().generate(prompt, model=model, generation_config=config)
+            break
+        except (DeadlineExceeded, ResourceExhausted) as e:
+            # O controlador de concorrência já aplicou o recuo: a próxima chamada espera por ele
+            if attempt < max_retries - 1:
+                print(f"Erro temporário na chamada estruturada ({type(e).__name__}). Tentativa {attempt + 1} de {max_retries}...")
+            else:
+                raise
+
+    valid = valid_sections(parse_json_object(response.text), sections, schemas)
+    invalid = [key for key in sections if key not in valid]
+    if invalid:
+        print(f"⚠️  Seções inválidas na resposta (serão refeitas individualmente): {', '.join(invalid)}")
+    return valid
+
+
+def build_single_call_prompt(prompt: str, sections: Dict[str, str], content: str) -> str:
+    """Prompt da chamada única: instruções + lista de chaves esperadas + conteúdo."""
+    listing = "\n".join(f"- `{key}`: {description}" for key, description in sections.items())
+    return SINGLE_CALL_TEMPLATE.format(prompt=prompt, sections=listing, content=content)
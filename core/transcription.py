@@ -5,6 +5,8 @@ import requests
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 from urllib.parse import urlparse, parse_qs
 
+from .caption_cleanup import mark_caption_file
+
 try:
     from .proxy_manager import get_proxy_manager
 except ImportError:
@@ -224,6 +226,7 @@ def download_transcription(video_url, preferred_languages=None, max_retries=3):
     ]
     if existing_files:
         file_path = os.path.join(output_dir, existing_files[0])
+        mark_caption_file(file_path)
         logging.info(f"[{video_id}] Transcrição já existe -> {file_path} (pulando download)")
         return file_path  # 🚀 retorna direto, sem delay
 
@@ -341,6 +344,7 @@ def download_transcription(video_url, preferred_languages=None, max_retries=3):
             file_path = os.path.join(output_dir, f"{video_id}_{source_lang}.txt")
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(transcript_text)
+            mark_caption_file(file_path)
             logging.info(f"[{video_id}] [SUCCESS] Transcrição salva ({source}) [{source_lang}] -> {file_path}")
 
             time.sleep(5)  # Delay para evitar sobrecarregar APIs
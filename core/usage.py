@@ -0,0 +1,248 @@
+"""
+Contabilidade de uso do LLM: tokens, latência e custo estimado por chamada.
+
+Cada chamada ao backend (inclusive as que falham com 429/timeout) vira uma
+linha na tabela `llm_calls` de um SQLite local (data/usage.db), ligada ao job e
+ao vídeo em andamento e à etapa que a fez:
+
+- job: o mesmo ContextVar dos eventos de progresso (core/events.py);
+- vídeo e etapa: `video_scope(...)` e `stage_scope(...)` abaixo.
+
+Dentro de `models_scope(...)`, o modelo que respondeu cada chamada é anotado por
+etapa (mesmo com USAGE_TRACKING=false): os processadores registram nos
+metadados o modelo de fato usado, e não o LLM_MODEL (que pode ser "auto").
+
+Os ContextVars acompanham as threads do scheduler/map-reduce via
+`submit_with_context`. O custo usa a tabela de preços do roteador
+(core/model_router.py). Relatório: scripts/usage_report.py e
+GET /api/jobs/{id}/usage.
+
+Configuração via .env:
+    USAGE_TRACKING=true
+    USAGE_DB=data/usage.db
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from core.events import current_job_id
+from core.model_router import estimate_cost
+
+_current_video: contextvars.ContextVar = contextvars.ContextVar("video_id", default=None)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("llm_stage", default=None)
+_models_used: contextvars.ContextVar = contextvars.ContextVar("models_used", default=None)
+_models_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    job_id TEXT,
+    video_id TEXT,
+    stage TEXT,
+    backend TEXT,
+    model TEXT,
+    status TEXT NOT NULL,
+    retry INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    candidate_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_s REAL NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_job ON llm_calls (job_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_video ON llm_calls (video_id);
+"""
+
+# Agregações expostas no relatório e na API
+SUMMARY_COLUMNS = """
+    COUNT(*) AS calls,
+    SUM(status != 'ok') AS failed_calls,
+    SUM(retry > 0) AS retried_calls,
+    SUM(prompt_tokens) AS prompt_tokens,
+    SUM(candidate_tokens) AS candidate_tokens,
+    SUM(cached_tokens) AS cached_tokens,
+    ROUND(SUM(latency_s), 2) AS total_latency_s,
+    ROUND(AVG(CASE WHEN status = 'ok' THEN latency_s END), 2) AS avg_latency_s,
+    ROUND(SUM(cost_usd), 6) AS cost_usd
+"""
+
+GROUPINGS = ("stage", "model", "video_id", "job_id")
+
+
+def usage_enabled() -> bool:
+    return os.environ.get("USAGE_TRACKING", "true").strip().lower() in ("1", "true", "yes", "sim")
+
+
+@contextmanager
+def video_scope(video_id: Optional[str]):
+    """Associa as chamadas feitas dentro do bloco ao vídeo `video_id`."""
+    token = _current_video.set(video_id)
+    try:
+        yield
+    finally:
+        _current_video.reset(token)
+
+
+@contextmanager
+def stage_scope(stage: Optional[str]):
+    """Associa as chamadas feitas dentro do bloco à etapa `stage` (ex.: dimension_3)."""
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def current_stage() -> Optional[str]:
+    return _current_stage.get()
+
+
+@contextmanager
+def models_scope(models: Dict[str, set]):
+    """
+    Anota em `models` (etapa → modelos) o modelo de cada chamada bem-sucedida
+    feita dentro do bloco. Subetapas ("dimension_3/map") contam para a etapa.
+    """
+    token = _models_used.set(models)
+    try:
+        yield
+    finally:
+        _models_used.reset(token)
+
+
+def _note_model(model: str):
+    models = _models_used.get()
+    if models is None or not model:
+        return
+    stage = (_current_stage.get() or "").split("/", 1)[0]
+    with _models_lock:
+        models.setdefault(stage, set()).add(model)
+
+
+class UsageStore:
+    """
+    Tabela SQLite de chamadas ao LLM (modo WAL: CLI, workers e API podem ler e
+    gravar ao mesmo tempo).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("USAGE_DB", os.path.join("data", "usage.db"))
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(self, row: Dict):
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(f"INSERT INTO llm_calls ({columns}) VALUES ({placeholders})", tuple(row.values()))
+            conn.commit()
+
+    def summary(self, group_by: Optional[str] = None, **filters) -> List[Dict]:
+        """
+        Totais de uso, opcionalmente agrupados por etapa, modelo, vídeo ou job.
+
+        Filtros aceitos: job_id, video_id, since (timestamp).
+        """
+        if group_by is not None and group_by not in GROUPINGS:
+            raise ValueError(f"Agrupamento inválido: {group_by} (use {', '.join(GROUPINGS)})")
+
+        conditions, params = [], []
+        for column in ("job_id", "video_id"):
+            if filters.get(column):
+                conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get("since"):
+            conditions.append("created_at >= ?")
+            params.append(filters["since"])
+
+        select = f"{group_by}, {SUMMARY_COLUMNS}" if group_by else SUMMARY_COLUMNS
+        query = f"SELECT {select} FROM llm_calls"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if group_by:
+            query += f" GROUP BY {group_by} ORDER BY cost_usd DESC"
+
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store_lock = threading.Lock()
+_store: Optional[UsageStore] = None
+
+
+def get_usage_store() -> UsageStore:
+    """Retorna a tabela de uso global."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = UsageStore()
+    return _store
+
+
+def set_usage_store(store: Optional[UsageStore]):
+    """Substitui a tabela de uso global (None = recria a partir do .env)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def record_call(
+    backend: str,
+    model: str,
+    status: str,
+    latency: float,
+    usage=None,
+    retry: int = 0,
+    error: Optional[str] = None,
+):
+    """
+    Registra uma chamada ao LLM no job/vídeo/etapa atuais.
+
+    Falhas de gravação nunca interrompem o processamento.
+    """
+    if status == "ok":
+        _note_model(model)
+    if not usage_enabled():
+        return
+
+    prompt_tokens = getattr(usage, "prompt_tokens", 0)
+    candidate_tokens = getattr(usage, "candidate_tokens", 0)
+    try:
+        get_usage_store().record({
+            "created_at": time.time(),
+            "job_id": current_job_id(),
+            "video_id": _current_video.get(),
+            "stage": _current_stage.get(),
+            "backend": backend,
+            "model": model,
+            "status": status,
+            "retry": retry,
+            "prompt_tokens": prompt_tokens,
+            "candidate_tokens": candidate_tokens,
+            "cached_tokens": getattr(usage, "cached_tokens", 0),
+            "latency_s": round(latency, 3),
+            "cost_usd": estimate_cost(model, prompt_tokens, candidate_tokens),
+            "error": error[:300] if error else None,
+        })
+    except sqlite3.Error as e:
+        print(f"⚠️  Falha ao registrar uso do LLM: {e}")
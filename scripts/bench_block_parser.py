@@ -0,0 +1,229 @@
+"""
+Benchmark do leitor de blocos (core/block_parser.py) contra as regex antigas do AgentConsolidator.
+
+Gera blocos sintéticos no formato do Agent Builder (glossário, fatos, métricas,
+procedimentos, casos e Q&A) em tamanhos crescentes e mede o tempo das duas
+abordagens. Também mede um bloco "patológico" (itens truncados, sem os campos
+seguintes), onde as regex com `.*?` sob re.DOTALL voltam a varrer o resto do
+texto a cada início de item, e verifica que o tempo do leitor cresce linearmente
+com o tamanho.
+
+Exemplos:
+    python scripts/bench_block_parser.py
+    python scripts/bench_block_parser.py --items 200 400 800 1600 --repeat 3
+"""
+import sys
+import os
+import re
+import time
+import argparse
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.block_parser import parse_block
+
+# Regex dos extratores antigos (AgentConsolidator.extract_*_from_content)
+LEGACY_PATTERNS = {
+    "qa_items": [
+        r'qa_id:\s*(\w+)\s*\n.*?pergunta:\s*(.+?)(?:\n|$).*?(?:variacoes:.*?\n)?.*?resposta:\s*(.+?)(?=\nqa_id:|\nqa_\d+:|$)',
+        r'(?:pergunta|question|q):\s*(.+?)\n.*?(?:resposta|answer|a):\s*(.+?)(?=\n(?:pergunta|question|q):|\n##|\n---|\Z)',
+        r'\*\*(?:Q|Pergunta)\s*\d*[:.]\*\*\s*(.+?)\n.*?\*\*(?:A|Resposta)[:.]\*\*\s*(.+?)(?=\n\*\*(?:Q|Pergunta)|\n##|\Z)',
+        r'\*\s*\*\*(?:Pergunta|Question)[:.]\*\*\s*(.+?)\n.*?\*\s*\*\*(?:Resposta|Answer)[:.]\*\*\s*(.+?)(?=\n\*\s*\*\*(?:Pergunta|Question)|\n##|\Z)',
+    ],
+    "facts": [
+        r'fato_id:\s*(\w+)\s*\n.*?afirmacao:\s*(.+?)(?:\n|$).*?tipo:\s*(\w+)',
+        r'metrica:\s*(.+?)\n.*?valor:\s*(.+?)(?:\n|$)',
+    ],
+    "procedures": [
+        r'processo_id:\s*(\w+)\s*\n.*?nome:\s*(.+?)(?:\n|$).*?objetivo:\s*(.+?)(?:\n|$).*?passos:(.*?)(?=processo_id:|\Z)',
+    ],
+    "glossary": [
+        r'termo:\s*(.+?)(?:\n|$).*?definicao:\s*(.+?)(?=\ntermo:|\n##|\Z)',
+        r'\*\*(.+?):\*\*\s*(.+?)(?=\n\*\*|\n##|\Z)',
+    ],
+    "examples": [
+        r'caso_id:\s*(\w+)\s*\n.*?titulo:\s*(.+?)(?:\n|$).*?(?:contexto|situacao).*?:\s*(.+?)(?=\ncaso_id:|\n##|\Z)',
+    ],
+}
+LEGACY_STEPS = r'(\d+)\.\s*(.+?)(?=\n\d+\.|\n##|\Z)'
+
+
+def legacy_extract(content: str) -> dict:
+    """Uma varredura por padrão (como antes): número de itens por tipo."""
+    counts = {}
+    for item_type, patterns in LEGACY_PATTERNS.items():
+        found = set()
+        for pattern in patterns:
+            for match in re.findall(pattern, content, re.DOTALL | re.IGNORECASE):
+                if item_type == "procedures":
+                    re.findall(LEGACY_STEPS, match[3], re.DOTALL)
+                if item_type == "qa_items":
+                    # Os padrões de Q&A se sobrepõem; o extrator antigo removia as duplicatas assim
+                    found.add((match[-2].strip()[:100], match[-1].strip()[:100]))
+                else:
+                    found.add(match)
+        counts[item_type] = len(found)
+    return counts
+
+
+def parser_extract(content: str) -> dict:
+    parsed = parse_block(content)
+    counts = {item_type: len(parsed[item_type]) for item_type in LEGACY_PATTERNS}
+    counts["facts"] += len(parsed["metrics"])
+    return counts
+
+
+def synthetic_block(items: int) -> str:
+    """Bloco com `items` entradas de cada tipo, no formato YAML-like dos prompts."""
+    parts = ["## 1.1 GLOSSÁRIO"]
+    for i in range(items):
+        parts.append(
+            f"termo: Conceito {i}\n"
+            f"definicao: Definição detalhada do conceito {i}, como o autor explica no vídeo.\n"
+            f"  Continua com uma segunda linha de explicação.\n"
+            f"contexto: Usado quando o tema {i} aparece\n"
+            f"relacionados: [Conceito {i + 1}]"
+        )
+    parts.append("## 2.1 FATOS")
+    for i in range(items):
+        parts.append(
+            f"fato_id: F{i:04d}\n"
+            f"afirmacao: O autor afirma que a prática {i} aumenta o resultado de forma consistente\n"
+            f"tipo: principio\n"
+            f"evidencia: Exemplo citado no minuto {i}\n"
+            f"confianca: alta"
+        )
+    parts.append("## 2.2 MÉTRICAS")
+    for i in range(items):
+        parts.append(f"metrica: Taxa {i}\nvalor: {i}%\nunidade: porcentagem")
+    parts.append("## 3.1 PROCEDIMENTOS")
+    for i in range(items):
+        parts.append(
+            f"processo_id: P{i:04d}\n"
+            f"nome: Processo {i}\n"
+            f"objetivo: Alcançar o objetivo {i}\n"
+            f"passos:\n"
+            f"  1. Preparar o material {i}\n"
+            f"     - detalhes: conferir os itens\n"
+            f"  2. Executar a etapa principal\n"
+            f"  3. Revisar o resultado"
+        )
+    parts.append("## 4.1 CASOS")
+    for i in range(items):
+        parts.append(
+            f"caso_id: C{i:04d}\n"
+            f"titulo: Caso {i}\n"
+            f"contexto_inicial:\n"
+            f"  - situacao: Empresa {i} com problema de vendas\n"
+            f"  - problema: Baixa conversão\n"
+            f"intervencao: Mudou a oferta\n"
+            f"resultado: Dobrou a conversão"
+        )
+    parts.append("## 5.1 PERGUNTAS E RESPOSTAS")
+    for i in range(items):
+        parts.append(
+            f"qa_id: QA{i:04d}\n"
+            f"pergunta: Como aplicar a técnica número {i} no dia a dia?\n"
+            f"variacoes: [Como usar a técnica {i}?]\n"
+            f"resposta: Segundo o autor, a técnica {i} deve ser aplicada em três etapas curtas.\n"
+            f"  Primeiro, define-se o objetivo; depois, mede-se o resultado.\n"
+            f"categoria: procedimental"
+        )
+    return "\n\n".join(parts) + "\n"
+
+
+def pathological_block(items: int) -> str:
+    """
+    Itens truncados (qa_id/caso_id sem os campos seguintes, como numa resposta
+    cortada): cada início de item faz as regex varrerem o resto do bloco.
+    """
+    parts = []
+    for i in range(items):
+        parts.append(f"qa_id: QA{i:04d}\ncategoria: conceitual")
+        parts.append(f"caso_id: C{i:04d}\nresultado: Sem detalhes registrados")
+    return "\n".join(parts) + "\n"
+
+
+# Blocos mistos (formatos que as regex antigas também aceitavam): as contagens têm de bater
+MIXED_BLOCKS = {
+    "termo: + cerca + **Termo:**": (
+        "```yaml\n"
+        "termo: Funil\n"
+        "definicao: Etapas da jornada do cliente até a compra\n"
+        "```\n"
+        "- **Lead Magnet:** material gratuito oferecido em troca do contato\n"
+    ),
+    "termo: + linha em branco + **Termo:**": (
+        "termo: Funil\n"
+        "definicao: Etapas da jornada do cliente até a compra\n"
+        "\n"
+        "**Lead Magnet:** material gratuito oferecido em troca do contato\n"
+    ),
+    "fato + **Termo:**": (
+        "fato_id: F001\n"
+        "afirmacao: O autor afirma que ofertas com prazo convertem mais\n"
+        "tipo: principio\n"
+        "**Escassez:** limitação real de tempo ou quantidade da oferta\n"
+    ),
+}
+
+
+def check_equivalence() -> bool:
+    """Compara as contagens por tipo (regex antigas x leitor) nos blocos mistos e num sintético."""
+    cases = dict(MIXED_BLOCKS)
+    cases["sintético (10 itens)"] = synthetic_block(10)
+    ok = True
+    print("Equivalência (itens por tipo)")
+    for label, content in cases.items():
+        legacy, single = legacy_extract(content), parser_extract(content)
+        same = legacy == single
+        ok = ok and same
+        print(f"  {'✅' if same else '❌'} {label}: regex {legacy} | leitor {single}")
+    return ok
+
+
+def best_time(func, content: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do leitor de blocos contra as regex antigas")
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 200, 400, 800], help="Itens de cada tipo por bloco")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições (vale o melhor tempo)")
+    args = parser.parse_args()
+
+    if not check_equivalence():
+        print("❌ O leitor não encontrou os mesmos itens que as regex antigas")
+        sys.exit(1)
+
+    for label, build in (("Bloco sintético", synthetic_block), ("Bloco patológico", pathological_block)):
+        print(f"\n{label}")
+        print(f"{'Itens':>7} {'KB':>8} {'Regex (s)':>11} {'Leitor (s)':>11} {'Ganho':>8} {'Leitor µs/KB':>13}")
+        parser_rates = []
+        for items in args.items:
+            content = build(items)
+            size_kb = len(content.encode("utf-8")) / 1024
+            legacy = best_time(legacy_extract, content, args.repeat)
+            single = best_time(parser_extract, content, args.repeat)
+            parser_rates.append(single / size_kb)
+            print(
+                f"{items:>7} {size_kb:>8.0f} {legacy:>11.4f} {single:>11.4f} "
+                f"{legacy / max(single, 1e-9):>7.1f}x {single / size_kb * 1e6:>13.1f}"
+            )
+            if build is synthetic_block:
+                print(f"{'':>7} itens (regex): {legacy_extract(content)}")
+                print(f"{'':>7} itens (leitor): {parser_extract(content)}")
+
+        # Linear: o custo por KB do leitor não deve crescer com o tamanho do bloco
+        growth = parser_rates[-1] / parser_rates[0]
+        print(f"Leitor: custo por KB no maior bloco = {growth:.2f}x o do menor (linear ≈ 1)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Relatório de uso do LLM (tokens, latência, custo estimado) a partir de data/usage.db.
+
+Exemplos:
+    python scripts/usage_report.py                       # totais + por etapa
+    python scripts/usage_report.py --by model --days 7
+    python scripts/usage_report.py --job <job_id> --by video_id
+"""
+import sys
+import os
+import time
+import argparse
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.usage import GROUPINGS, UsageStore
+
+COLUMNS = [
+    ("calls", "Chamadas"),
+    ("failed_calls", "Falhas"),
+    ("prompt_tokens", "Tokens entrada"),
+    ("candidate_tokens", "Tokens saída"),
+    ("cached_tokens", "Tokens cache"),
+    ("avg_latency_s", "Latência média (s)"),
+    ("cost_usd", "Custo (USD)"),
+]
+
+
+def print_table(rows, group_by=None):
+    headers = ([group_by] if group_by else []) + [label for _, label in COLUMNS]
+    keys = ([group_by] if group_by else []) + [key for key, _ in COLUMNS]
+    table = [[("-" if row.get(key) is None else str(row.get(key))) for key in keys] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in table)) if table else len(h) for i, h in enumerate(headers)]
+
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in table:
+        print("  ".join(value.ljust(w) for value, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de uso do LLM")
+    parser.add_argument("--db", help="Caminho do banco (padrão: USAGE_DB ou data/usage.db)")
+    parser.add_argument("--job", help="Filtra por job")
+    parser.add_argument("--video", help="Filtra por vídeo")
+    parser.add_argument("--days", type=float, help="Apenas chamadas dos últimos N dias")
+    parser.add_argument("--by", choices=GROUPINGS, default="stage", help="Agrupamento (padrão: stage)")
+    args = parser.parse_args()
+
+    store = UsageStore(args.db)
+    if not os.path.exists(store.path):
+        print(f"❌ Nenhum registro de uso encontrado em {store.path}")
+        return
+
+    filters = {
+        "job_id": args.job,
+        "video_id": args.video,
+        "since": time.time() - args.days * 86400 if args.days else None,
+    }
+
+    print("📊 USO DO LLM - TOTAL")
+    print_table(store.summary(**filters))
+    print(f"\n📊 POR {args.by.upper()}")
+    print_table(store.summary(args.by, **filters), args.by)
+
+
+if __name__ == "__main__":
+    main()
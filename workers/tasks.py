@@ -21,6 +21,8 @@ from core.processing import process_transcription, load_prompt
 from core.framework_processor import process_transcription_framework
 from core.n8n_processor import process_n8n_framework
 from core.prd_processor import process_prd_framework
+from core.events import job_scope
+from core.usage import video_scope
 
 
 @celery_app.task(bind=True, name="workers.tasks.process_video")
@@ -115,34 +117,37 @@ def process_video_task(
             video.status = VideoStatus.PROCESSING
             db.commit()
             
-            if prompt_type == "framework":
-                # Processamento framework completo
-                output_path = process_transcription_framework(
-                    transcription_path,
-                    output_language
-                )
-            elif prompt_type == "prd":
-                # Processamento de PRD BMAD
-                output_path = process_prd_framework(
-                    transcription_path,
-                    output_language
-                )
-            else:
-                # Processamento normal (FAQ ou Copywriting)
-                process_transcription(
-                    transcription_path,
-                    prompt_type,
-                    output_language
-                )
-                # Determina caminho de saída
-                base_name = os.path.splitext(os.path.basename(transcription_path))[0]
-                output_path = os.path.join(
-                    'data', 'processed',
-                    f"{base_name}_{prompt_type}_{output_language}_processed.txt"
-                )
+            # Eventos de progresso (etapas e texto em streaming) vão para o WebSocket do job;
+            # o uso do LLM é registrado por job e vídeo
+            with job_scope(job_id), video_scope(video_id):
+                if prompt_type == "framework":
+                    # Processamento framework completo
+                    output_path = process_transcription_framework(
+                        transcription_path,
+                        output_language
+                    )
+                elif prompt_type == "prd":
+                    # Processamento de PRD BMAD
+                    output_path = process_prd_framework(
+                        transcription_path,
+                        output_language
+                    )
+                else:
+                    # Processamento normal (FAQ ou Copywriting)
+                    process_transcription(
+                        transcription_path,
+                        prompt_type,
+                        output_language
+                    )
+                    # Determina caminho de saída
+                    base_name = os.path.splitext(os.path.basename(transcription_path))[0]
+                    output_path = os.path.join(
+                        'data', 'processed',
+                        f"{base_name}_{prompt_type}_{output_language}_processed.txt"
+                    )
             
             # Salva resultado no banco
-            if os.path.exists(output_path):
+            if output_path and os.path.exists(output_path):
                 with open(output_path, 'r', encoding='utf-8') as f:
                     result_content = f.read()
                 
@@ -299,9 +304,10 @@ def process_job_task(self, job_id: str):
                 try:
                     from core.n8n_processor import process_n8n_framework
                     
-                    output_path = process_n8n_framework(job.source_id, job.output_language)
+                    with job_scope(job_id), video_scope(video_id):
+                        output_path = process_n8n_framework(job.source_id, job.output_language)
                     
-                    if os.path.exists(output_path):
+                    if output_path and os.path.exists(output_path):
                         with open(output_path, 'r', encoding='utf-8') as f:
                             result_content = f.read()
                         
@@ -337,20 +343,21 @@ def process_job_task(self, job_id: str):
                         temp_path = f.name
                     
                     # Processa
-                    if job.prompt_type == "framework":
-                        output_path = process_transcription_framework(temp_path, job.output_language)
-                    elif job.prompt_type == "prd":
-                        output_path = process_prd_framework(temp_path, job.output_language)
-                    else:
-                        process_transcription(temp_path, job.prompt_type, job.output_language)
-                        base_name = os.path.splitext(os.path.basename(temp_path))[0]
-                        output_path = os.path.join(
-                            'data', 'processed',
-                            f"{base_name}_{job.prompt_type}_{job.output_language}_processed.txt"
-                        )
+                    with job_scope(job_id), video_scope(video_id):
+                        if job.prompt_type == "framework":
+                            output_path = process_transcription_framework(temp_path, job.output_language)
+                        elif job.prompt_type == "prd":
+                            output_path = process_prd_framework(temp_path, job.output_language)
+                        else:
+                            process_transcription(temp_path, job.prompt_type, job.output_language)
+                            base_name = os.path.splitext(os.path.basename(temp_path))[0]
+                            output_path = os.path.join(
+                                'data', 'processed',
+                                f"{base_name}_{job.prompt_type}_{job.output_language}_processed.txt"
+                            )
                     
                     # Salva resultado
-                    if os.path.exists(output_path):
+                    if output_path and os.path.exists(output_path):
                         with open(output_path, 'r', encoding='utf-8') as f:
                             result_content = f.read()
                         